@@ -0,0 +1,183 @@
+"""
+Opt-in micro-batching for /predict.
+
+With EEG_MICROBATCH=1, concurrent /predict requests are not scored one by
+one. Each handler submits its recording to a MicroBatcher and awaits a
+future. A single collector task gathers everything that arrives within
+EEG_MICROBATCH_WINDOW_MS of the first request, up to EEG_MICROBATCH_MAX
+requests. It then runs the feature extraction and one predict_proba call
+for the whole batch on the inference pool and resolves each handler's future
+with its own row.
+
+Requests with the same shape and sampling rate share one
+extract_features_batch pass, so under a burst the cost grows with the
+number of batches rather than the number of requests.
+
+Callers validate each recording before submitting it (see
+validate_eeg_input in main). If a batch still fails, its requests are
+scored one by one, so a bad request fails only its own handler.
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .feature_extraction import DEFAULT_FEATURE_SET, extract_features_batch
+
+MICROBATCH_ENABLED = os.getenv("EEG_MICROBATCH", "0").lower() in ("1", "true", "yes")
+MICROBATCH_WINDOW_MS = float(os.getenv("EEG_MICROBATCH_WINDOW_MS", 3))
+MICROBATCH_MAX = int(os.getenv("EEG_MICROBATCH_MAX", 32))
+
+class BatchStats:
+    """Running batch-size and queue-delay metrics."""
+
+    def __init__(self):
+        self.batches = 0
+        self.requests = 0
+        self.max_batch_size = 0
+        self.last_batch_size = 0
+        self.batch_size_counts: Dict[int, int] = defaultdict(int)
+        self.total_queue_delay_ms = 0.0
+        self.max_queue_delay_ms = 0.0
+        self.total_inference_ms = 0.0
+
+    def record(self, queue_delays_ms: List[float], inference_ms: float):
+        size = len(queue_delays_ms)
+        self.batches += 1
+        self.requests += size
+        self.last_batch_size = size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.batch_size_counts[size] += 1
+        self.total_queue_delay_ms += sum(queue_delays_ms)
+        self.max_queue_delay_ms = max(self.max_queue_delay_ms, max(queue_delays_ms))
+        self.total_inference_ms += inference_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": round(self.requests / self.batches, 3) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "last_batch_size": self.last_batch_size,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+            "mean_queue_delay_ms": round(self.total_queue_delay_ms / self.requests, 3) if self.requests else 0.0,
+            "max_queue_delay_ms": round(self.max_queue_delay_ms, 3),
+            "mean_batch_inference_ms": round(self.total_inference_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+class MicroBatcher:
+    """
+    Collects (eeg_data, fs) requests and scores them in batches.
+
+    score_fn takes a stacked [n, n_features] matrix and returns [n, n_classes]
+    probabilities together with the model version that produced them (see
+    ModelRegistry.score); it runs on pool (an execution.ExecutionPool), off the
+    event loop, or on the loop's default executor if no pool is given.
+    feature_set_fn gives the feature set of the model score_fn will use.
+    """
+
+    def __init__(self, score_fn: Callable[[np.ndarray], Tuple[np.ndarray, Any]], pool=None,
+                 window_ms: float = MICROBATCH_WINDOW_MS, max_batch: int = MICROBATCH_MAX,
+                 feature_set_fn: Optional[Callable[[], int]] = None):
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self.score_fn = score_fn
+        self.feature_set_fn = feature_set_fn or (lambda: DEFAULT_FEATURE_SET)
+        self.pool = pool
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.stats = BatchStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+
+    async def submit(self, eeg_data: np.ndarray, fs: int) -> Tuple[np.ndarray, Any]:
+        """Queue one recording; resolves to its row of class probabilities and the model version."""
+        if self._collector is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((eeg_data, fs, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            dispatched = time.perf_counter()
+            queue_delays_ms = [(dispatched - enqueued) * 1000 for _, _, _, enqueued in batch]
+            try:
+                probas, served = await self._run(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch[0], e)
+                else:
+                    await self._score_each(batch)
+                continue
+
+            self.stats.record(queue_delays_ms, (time.perf_counter() - dispatched) * 1000)
+            for (_, _, future, _), proba in zip(batch, probas):
+                if not future.done(): # The handler may have gone away
+                    future.set_result((proba, served))
+
+    async def _score_each(self, batch: List[Tuple[np.ndarray, int, asyncio.Future, float]]):
+        """Fallback after a failed batch: score each request on its own."""
+        for request in batch:
+            started = time.perf_counter()
+            try:
+                probas, served = await self._run([request])
+            except Exception as e:
+                self._fail(request, e)
+            else:
+                self.stats.record([(started - request[3]) * 1000], (time.perf_counter() - started) * 1000)
+                if not request[2].done():
+                    request[2].set_result((probas[0], served))
+
+    async def _run(self, batch: List[Tuple[np.ndarray, int, asyncio.Future, float]]) -> Tuple[np.ndarray, Any]:
+        if self.pool is not None:
+            return await self.pool.run(self._score, batch)
+        return await asyncio.get_running_loop().run_in_executor(None, self._score, batch)
+
+    @staticmethod
+    def _fail(request: Tuple[np.ndarray, int, asyncio.Future, float], error: Exception):
+        if not request[2].done():
+            request[2].set_exception(error)
+
+    def _score(self, batch: List[Tuple[np.ndarray, int, asyncio.Future, float]]) -> Tuple[np.ndarray, Any]:
+        """Worker-side: features for every request (grouped by shape) and one predict_proba call."""
+        groups: Dict[Tuple[Tuple[int, ...], int], List[int]] = defaultdict(list)
+        for i, (eeg_data, fs, _, _) in enumerate(batch):
+            groups[(eeg_data.shape, fs)].append(i)
+
+        feature_set = self.feature_set_fn()
+        features = [None] * len(batch)
+        for (_, fs), indices in groups.items():
+            stacked = np.stack([batch[i][0] for i in indices])
+            for i, row in zip(indices, extract_features_batch(stacked, fs=fs, feature_set=feature_set)):
+                features[i] = row
+
+        return self.score_fn(np.stack(features))
@@ -0,0 +1,66 @@
+"""
+CPU-bound stages of the EEG endpoints, run on execution.cpu_pool.
+
+These are module-level functions so worker processes can import them;
+their inputs and outputs (raw bytes, float32 arrays, feature matrices)
+pickle cheaply. Model scoring stays in the server process, where the
+registry and the served version live.
+"""
+import numpy as np
+from fastapi import HTTPException
+
+from .data_processing import parse_csv, parse_edf
+from .feature_extraction import (DEFAULT_FEATURE_SET, MIN_KURTOSIS_SAMPLES, extract_features_batch,
+                                 extract_features_from_segment, sliding_windows)
+
+N_CHANNELS = 16
+# Shortest recording with finite features: the bias-corrected kurtosis
+# (moments_from_sums) is NaN below this many samples
+MIN_SAMPLES = MIN_KURTOSIS_SAMPLES
+
+def check_eeg_shape(eeg_data: np.ndarray):
+    if eeg_data.ndim != 2:
+        raise HTTPException(status_code=400, detail="EEG data must be 2D array [samples, channels]")
+
+    if eeg_data.shape[1] != N_CHANNELS:
+        raise HTTPException(status_code=400, detail=f"EEG data must have {N_CHANNELS} channels. Got {eeg_data.shape[1]}")
+
+    if eeg_data.shape[0] < MIN_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"EEG data must have at least {MIN_SAMPLES} samples. Got {eeg_data.shape[0]}")
+
+def check_eeg_values(eeg_data: np.ndarray, fs: int):
+    """Checks that would otherwise only fail (or give NaN features) inside feature extraction."""
+    if fs <= 0:
+        raise HTTPException(status_code=400, detail=f"sampling_rate must be positive. Got {fs}")
+    if not np.isfinite(eeg_data).all():
+        raise HTTPException(status_code=400, detail="EEG data contains NaN or infinite values")
+
+def eeg_features(eeg_data: np.ndarray, fs: int, windowed: bool = False, window_size_sec: int = 4,
+                 step_size_sec: int = 2, feature_set: int = DEFAULT_FEATURE_SET) -> np.ndarray:
+    """
+    Feature matrix for a recording: one row for the whole recording, or one
+    row per sliding window (see run_windowed_inference). feature_set must be
+    the one of the model that will score it.
+    """
+    check_eeg_shape(eeg_data)
+    if not windowed:
+        return extract_features_from_segment(eeg_data, fs=fs, feature_set=feature_set).reshape(1, -1)
+
+    # Strided view, no copy of the recording
+    windows = sliding_windows(eeg_data, window_size_sec, step_size_sec, fs)
+    if len(windows) == 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Recording too short for windowed inference. Need at least {window_size_sec}s of data"
+        )
+    return extract_features_batch(windows, fs=fs, feature_set=feature_set)
+
+def edf_features(file_content: bytes, fs: int, windowed: bool = False, window_size_sec: int = 4,
+                 step_size_sec: int = 2, feature_set: int = DEFAULT_FEATURE_SET) -> np.ndarray:
+    """Decode an EDF upload and extract its features in one worker round trip."""
+    return eeg_features(parse_edf(file_content), fs, windowed, window_size_sec, step_size_sec, feature_set)
+
+def csv_features(file_content: bytes, fs: int, windowed: bool = False, window_size_sec: int = 4,
+                 step_size_sec: int = 2, feature_set: int = DEFAULT_FEATURE_SET) -> np.ndarray:
+    """Parse a CSV upload and extract its features in one worker round trip."""
+    return eeg_features(parse_csv(file_content), fs, windowed, window_size_sec, step_size_sec, feature_set)
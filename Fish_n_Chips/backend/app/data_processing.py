@@ -2,8 +2,13 @@ import mne
 import numpy as np
 import pandas as pd
 import io
+import csv
+from typing import List, Optional, Union
 from fastapi import HTTPException
 
+from .edf_reader import EDFFormatError, read_edf
+from .resampling import resample
+
 REQUIRED_CHANNELS = [
     'Fp1', 'Fp2', 'F7', 'F3', 'Fz', 'F4', 'F8', 'T3',
     'C3', 'Cz', 'C4', 'T4', 'T5', 'P3', 'Pz', 'P4'
@@ -11,85 +16,256 @@ REQUIRED_CHANNELS = [
 
 TARGET_SFREQ = 256
 
+def match_required_channels(available_channels: List[str]) -> List[str]:
+    """
+    Map REQUIRED_CHANNELS onto the channel names found in a recording, in training order.
+    """
+    # MNE channel names might be case sensitive or have extra labels (e.g. "EEG Fp1-REF")
+    # We need a robust matching strategy.
+    picked_channels = []
+
+    for req_ch in REQUIRED_CHANNELS:
+        # Try exact match
+        if req_ch in available_channels:
+            picked_channels.append(req_ch)
+            continue
+
+        # Try case-insensitive or substring match
+        # This is a heuristic; might need refinement based on actual data
+        match = None
+        for av_ch in available_channels:
+            if req_ch.lower() in av_ch.lower():
+                match = av_ch
+                break
+
+        if match:
+            picked_channels.append(match)
+        else:
+            raise HTTPException(status_code=400, detail=f"Missing required channel: {req_ch}")
+
+    return picked_channels
+
+def _pick_required_indices(labels: List[str]) -> List[int]:
+    return [labels.index(ch) for ch in match_required_channels(labels)]
+
 def parse_edf(file_content: bytes) -> np.ndarray:
     """
     Parses an EDF file content and returns a 2D numpy array [samples, channels].
+
+    The header and the 16 required channels are decoded straight from the upload
+    buffer (see edf_reader); files the fast reader does not handle (e.g.
+    discontinuous EDF+) go through MNE instead.
     """
     try:
-        # MNE reads from a file path, so we need to write to a temp file or use a BytesIO wrapper if supported.
-        # MNE's read_raw_edf strictly requires a filename.
-        # We will write to a temp file.
-        import tempfile
-        import os
-
-        with tempfile.NamedTemporaryFile(suffix=".edf", delete=False) as tmp:
-            tmp.write(file_content)
-            tmp_path = tmp.name
-
         try:
-            raw = mne.io.read_raw_edf(tmp_path, preload=True, verbose=False)
-        finally:
-            os.remove(tmp_path)
-
-        # Pick channels
-        # MNE channel names might be case sensitive or have extra labels (e.g. "EEG Fp1-REF")
-        # We need a robust matching strategy.
-        available_channels = raw.ch_names
-        picked_channels = []
-
-        for req_ch in REQUIRED_CHANNELS:
-            # Try exact match
-            if req_ch in available_channels:
-                picked_channels.append(req_ch)
-                continue
-
-            # Try case-insensitive or substring match
-            # This is a heuristic; might need refinement based on actual data
-            match = None
-            for av_ch in available_channels:
-                if req_ch.lower() in av_ch.lower():
-                    match = av_ch
-                    break
-
-            if match:
-                picked_channels.append(match)
-            else:
-                raise HTTPException(status_code=400, detail=f"Missing required channel: {req_ch}")
-
-        raw.pick_channels(picked_channels)
-
-        # Reorder channels to match training order
-        raw.reorder_channels(picked_channels) # pick_channels might preserve order, but let's be safe if we mapped them
-
-        # Resample if necessary
-        if raw.info['sfreq'] != TARGET_SFREQ:
-            raw.resample(TARGET_SFREQ)
-
-        # Get data
-        data, times = raw.get_data(return_times=True)
-        # data is [channels, samples], we need [samples, channels]
-        return data.T
+            # Other rates are resampled to TARGET_SFREQ chunk by chunk while decoding
+            data, _ = read_edf(file_content, _pick_required_indices, target_sfreq=TARGET_SFREQ)
+        except EDFFormatError:
+            return _parse_edf_mne(file_content)
+
+        return data
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing EDF file: {str(e)}")
 
-def parse_csv(file_content: str) -> np.ndarray:
+def _parse_edf_mne(file_content: bytes) -> np.ndarray:
+    """
+    MNE-based EDF parsing, kept as a fallback for files edf_reader rejects.
+    """
+    # MNE reads from a file path, so we need to write to a temp file or use a BytesIO wrapper if supported.
+    # MNE's read_raw_edf strictly requires a filename.
+    # We will write to a temp file.
+    import tempfile
+    import os
+
+    with tempfile.NamedTemporaryFile(suffix=".edf", delete=False) as tmp:
+        tmp.write(file_content)
+        tmp_path = tmp.name
+
+    try:
+        raw = mne.io.read_raw_edf(tmp_path, preload=True, verbose=False)
+    finally:
+        os.remove(tmp_path)
+
+    # Pick channels
+    picked_channels = match_required_channels(raw.ch_names)
+
+    raw.pick_channels(picked_channels)
+
+    # Reorder channels to match training order
+    raw.reorder_channels(picked_channels) # pick_channels might preserve order, but let's be safe if we mapped them
+
+    # Get data
+    data, times = raw.get_data(return_times=True)
+    # data is [channels, samples], we need [samples, channels]
+    data = data.T
+
+    # Resample if necessary (same polyphase filter as the fast path)
+    if raw.info['sfreq'] != TARGET_SFREQ:
+        data = resample(data, raw.info['sfreq'], TARGET_SFREQ)
+
+    return data
+
+class CSVStreamParser:
+    """
+    Incremental CSV parser for EEG uploads.
+
+    feed() takes raw bytes as they arrive; the header line is validated against
+    REQUIRED_CHANNELS as soon as it is complete, and every complete row is parsed
+    straight into a float32 [samples, 16] buffer. finish() returns the filled part.
+    Nothing is decoded into one big str and no float64 DataFrame is built.
     """
-    Parses a CSV string and returns a 2D numpy array.
+
+    def __init__(self, expected_rows: int = 0):
+        self._pending = b""
+        self._columns: Optional[List[int]] = None
+        self._n_fields = 0
+        self._data = np.empty((max(expected_rows, 1024), len(REQUIRED_CHANNELS)), dtype=np.float32)
+        self.n_rows = 0
+
+    def _parse_header(self, line: bytes):
+        names = [name.strip() for name in next(csv.reader([line.decode("utf-8-sig")]))]
+        self._n_fields = len(names)
+
+        if all(ch in names for ch in REQUIRED_CHANNELS):
+            # Pick the channels by name, in training order
+            self._columns = [names.index(ch) for ch in REQUIRED_CHANNELS]
+        elif len(names) == len(REQUIRED_CHANNELS):
+            # Unnamed or differently named channels: take the columns as they are
+            self._columns = list(range(len(names)))
+        else:
+            missing = [ch for ch in REQUIRED_CHANNELS if ch not in names]
+            raise HTTPException(status_code=400, detail=f"CSV must have 16 channels. Found {len(names)}, missing: {', '.join(missing)}")
+
+    def _append(self, rows: bytes):
+        block = pd.read_csv(io.BytesIO(rows), header=None, names=range(self._n_fields), usecols=self._columns,
+                            dtype=np.float32, engine="c", skip_blank_lines=True)
+        values = block[self._columns].to_numpy()
+        if len(values) == 0:
+            return
+
+        needed = self.n_rows + len(values)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data)), self._data.shape[1]), dtype=np.float32)
+            grown[:self.n_rows] = self._data[:self.n_rows]
+            self._data = grown
+        self._data[self.n_rows:needed] = values
+        self.n_rows = needed
+
+    def feed(self, chunk: bytes):
+        buffer = self._pending + chunk
+        if self._columns is None:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                self._pending = buffer
+                return
+            self._parse_header(buffer[:newline])
+            buffer = buffer[newline + 1:]
+
+        # Only complete lines are parsed; the partial last line waits for the next chunk
+        cut = buffer.rfind(b"\n") + 1
+        if cut:
+            self._append(buffer[:cut])
+        self._pending = buffer[cut:]
+
+    def finish(self) -> np.ndarray:
+        if self._columns is None:
+            if not self._pending.strip():
+                raise HTTPException(status_code=400, detail="CSV file is empty")
+            self._parse_header(self._pending)
+            self._pending = b""
+        if self._pending.strip():
+            self._append(self._pending)
+            self._pending = b""
+        return self._data[:self.n_rows]
+
+CSV_CHUNK_SIZE = 1 << 20
+
+def parse_csv(file_content: Union[str, bytes], chunk_size: int = CSV_CHUNK_SIZE) -> np.ndarray:
+    """
+    Parses CSV text or raw upload bytes and returns a 2D float32 numpy array [samples, channels].
     Assumes columns are channels and rows are timepoints.
+
+    The content is fed to CSVStreamParser in chunk_size slices (zero-copy views),
+    so the parser's working copies stay the size of a chunk, not of the upload.
     """
+    if isinstance(file_content, str):
+        file_content = file_content.encode("utf-8")
     try:
-        df = pd.read_csv(io.StringIO(file_content))
-
-        # Basic validation: check if we have 16 columns
-        # In a real app, we'd check headers too
-        if df.shape[1] != 16:
-             # Try to select by name if headers exist
-            if all(ch in df.columns for ch in REQUIRED_CHANNELS):
-                df = df[REQUIRED_CHANNELS]
-            else:
-                raise HTTPException(status_code=400, detail=f"CSV must have 16 channels. Found {df.shape[1]}")
-
-        return df.values
+        # ~16 values of up to ~8 characters per row; grown on demand if the guess is low
+        parser = CSVStreamParser(len(file_content) // (len(REQUIRED_CHANNELS) * 8))
+        view = memoryview(file_content)
+        for start in range(0, len(view), chunk_size):
+            parser.feed(view[start:start + chunk_size])
+        return parser.finish()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing CSV file: {str(e)}")
+
+NPY_MAGIC = b"\x93NUMPY"
+NPY_CONTENT_TYPES = ("application/x-npy", "application/npy")
+RAW_CONTENT_TYPE = "application/octet-stream"
+
+def _parse_shape(shape: Optional[str], n_values: int) -> tuple:
+    """[samples, channels] from an X-EEG-Shape header ("samples,channels"), or 16 channels if absent."""
+    if not shape:
+        n_channels = len(REQUIRED_CHANNELS)
+        if n_values % n_channels:
+            raise HTTPException(status_code=400, detail=f"Body holds {n_values} float32 values, not a multiple of {n_channels} channels. Send X-EEG-Shape")
+        return n_values // n_channels, n_channels
+
+    try:
+        dims = tuple(int(d) for d in shape.replace("x", ",").split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid X-EEG-Shape '{shape}'. Use 'samples,channels'")
+    if len(dims) != 2 or min(dims) < 1:
+        raise HTTPException(status_code=400, detail=f"Invalid X-EEG-Shape '{shape}'. Use 'samples,channels'")
+    if dims[0] * dims[1] != n_values:
+        raise HTTPException(status_code=400, detail=f"X-EEG-Shape {dims[0]}x{dims[1]} does not match the body ({n_values} float32 values)")
+    return dims
+
+def _parse_npy(body: bytes) -> np.ndarray:
+    """Wrap a .npy body without copying: header parsed, data viewed in place."""
+    stream = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+        else:
+            raise ValueError(f"unsupported format version {version[0]}.{version[1]}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid .npy body: {str(e)}")
+
+    if dtype.kind != "f":
+        raise HTTPException(status_code=400, detail=f".npy data must be float32 or float64, got {dtype}")
+    count = int(np.prod(shape))
+    if len(body) - stream.tell() < count * dtype.itemsize:
+        raise HTTPException(status_code=400, detail="Truncated .npy body")
+
+    data = np.frombuffer(body, dtype=dtype, count=count, offset=stream.tell())
+    return data.reshape(shape[::-1]).T if fortran_order else data.reshape(shape)
+
+def parse_binary_eeg(body: bytes, content_type: Optional[str], shape: Optional[str] = None) -> np.ndarray:
+    """
+    Decode a binary EEG body into a [samples, channels] array without per-element parsing.
+
+    application/octet-stream: little-endian float32, row-major, shape from the
+    X-EEG-Shape header. application/x-npy (or any body starting with the .npy
+    magic): a float32/float64 .npy file. The result is a read-only view of body.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in NPY_CONTENT_TYPES or body[:len(NPY_MAGIC)] == NPY_MAGIC:
+        return _parse_npy(body)
+
+    if content_type not in (RAW_CONTENT_TYPE, ""):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type '{content_type}'. Use {RAW_CONTENT_TYPE} or application/x-npy")
+    if len(body) % 4:
+        raise HTTPException(status_code=400, detail="Body length must be a multiple of 4 bytes (float32)")
+
+    n_values = len(body) // 4
+    return np.frombuffer(body, dtype="<f4").reshape(_parse_shape(shape, n_values))
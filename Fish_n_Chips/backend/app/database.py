@@ -25,3 +25,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def in_session(fn, *args, **kwargs):
+    """
+    Call fn(db, *args, **kwargs) with a session of its own and close it afterwards.
+    Async endpoints run blocking queries as io_pool.run(in_session, fn, ...): a
+    Session is not thread-safe, so the worker thread opens one rather than
+    borrowing the request's.
+    """
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+def add_and_commit(db, record):
+    """Add a record, commit and refresh it. Blocking; see in_session for async endpoints."""
+    db.add(record)
+    db.commit()
+    db.refresh(record)
+    return record
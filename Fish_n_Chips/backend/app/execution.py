@@ -0,0 +1,184 @@
+"""
+Execution layer that keeps CPU-heavy and blocking work off the event loop.
+
+    cpu_pool  process pool for NumPy/SciPy/librosa/spaCy stages (parsing,
+              feature extraction, pitch and pause analysis). Workers are
+              started with EEG_CPU_START_METHOD (spawn by default, which is
+              safe with the server's threads).
+    io_pool   thread pool for blocking I/O: the Whisper API, database
+              commits, temp files and exports.
+    inference_pool
+              thread pool for in-process scoring that keeps per-connection
+              state: live ingest, /ws/simulate and /predict micro-batches.
+              NumPy's FFTs/reductions and the tree traversal release the
+              GIL, so threads run them in parallel without shipping the
+              state to another process.
+
+Each pool has a concurrency limit: requests beyond it wait on a semaphore
+rather than piling into the executor queue. It also records how long
+tasks waited before a worker picked them up (queue time) and how long
+they ran. Functions sent to cpu_pool must be importable module-level
+functions, and their arguments and results are pickled.
+
+    EEG_CPU_WORKERS / EEG_CPU_CONCURRENCY   processes / max tasks in flight
+    EEG_IO_WORKERS / EEG_IO_CONCURRENCY     threads / max tasks in flight
+    EEG_INFERENCE_WORKERS / EEG_INFERENCE_CONCURRENCY   threads / max tasks in flight
+        (EEG_INGEST_WORKERS is still read as the default worker count)
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+CPU_WORKERS = int(os.getenv("EEG_CPU_WORKERS", os.cpu_count() or 2))
+CPU_CONCURRENCY = int(os.getenv("EEG_CPU_CONCURRENCY", 2 * CPU_WORKERS))
+CPU_START_METHOD = os.getenv("EEG_CPU_START_METHOD", "spawn")
+IO_WORKERS = int(os.getenv("EEG_IO_WORKERS", 16))
+IO_CONCURRENCY = int(os.getenv("EEG_IO_CONCURRENCY", IO_WORKERS))
+INFERENCE_WORKERS = int(os.getenv("EEG_INFERENCE_WORKERS", os.getenv("EEG_INGEST_WORKERS", os.cpu_count() or 4)))
+INFERENCE_CONCURRENCY = int(os.getenv("EEG_INFERENCE_CONCURRENCY", INFERENCE_WORKERS))
+
+class WorkerHTTPError(Exception):
+    """HTTPException raised in a worker process (HTTPException itself does not pickle)."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    """Runs in the worker: returns (result, wall-clock start, run seconds)."""
+    started = time.time()
+    try:
+        result = fn(*args, **kwargs)
+    except HTTPException as e:
+        raise WorkerHTTPError(e.status_code, e.detail)
+    return result, started, time.time() - started
+
+class PoolStats:
+    """Queue-time and run-time metrics for one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_queue_ms = 0.0
+        self.max_queue_ms = 0.0
+        self.total_run_ms = 0.0
+        self.max_run_ms = 0.0
+
+    def record(self, queue_ms: float, run_ms: float):
+        with self._lock:
+            self.completed += 1
+            self.total_queue_ms += queue_ms
+            self.max_queue_ms = max(self.max_queue_ms, queue_ms)
+            self.total_run_ms += run_ms
+            self.max_run_ms = max(self.max_run_ms, run_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "mean_queue_ms": round(self.total_queue_ms / self.completed, 3) if self.completed else 0.0,
+                "max_queue_ms": round(self.max_queue_ms, 3),
+                "mean_run_ms": round(self.total_run_ms / self.completed, 3) if self.completed else 0.0,
+                "max_run_ms": round(self.max_run_ms, 3),
+            }
+
+class ExecutionPool:
+    """An executor behind a concurrency limit, with per-task queue-time metrics."""
+
+    def __init__(self, name: str, make_executor: Callable[[], Executor], workers: int, max_concurrency: int):
+        if max_concurrency < 1:
+            raise ValueError(f"{name} concurrency must be >= 1")
+        self.name = name
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.stats = PoolStats()
+        self._make_executor = make_executor
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    @property
+    def executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = self._make_executor()
+            return self._executor
+
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        # asyncio primitives belong to one loop; tests and reloads may run several
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        with self.stats._lock:
+            self.stats.submitted += 1
+            self.stats.waiting += 1
+
+        acquired = False
+        try:
+            async with self._semaphore(loop):
+                acquired = True
+                with self.stats._lock:
+                    self.stats.waiting -= 1
+                    self.stats.in_flight += 1
+                try:
+                    result, started, run_seconds = await loop.run_in_executor(
+                        self.executor, _timed_call, fn, args, kwargs)
+                finally:
+                    with self.stats._lock:
+                        self.stats.in_flight -= 1
+        except BaseException as e:
+            with self.stats._lock:
+                self.stats.failed += 1
+                if not acquired:
+                    self.stats.waiting -= 1
+            if isinstance(e, WorkerHTTPError):
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+            raise
+
+        self.stats.record((started - submitted) * 1000, run_seconds * 1000)
+        return result
+
+    def describe(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "max_concurrency": self.max_concurrency, **self.stats.as_dict()}
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+cpu_pool = ExecutionPool(
+    "cpu",
+    lambda: ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context(CPU_START_METHOD)),
+    CPU_WORKERS, CPU_CONCURRENCY,
+)
+io_pool = ExecutionPool(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="eeg-io"),
+    IO_WORKERS, IO_CONCURRENCY,
+)
+inference_pool = ExecutionPool(
+    "inference",
+    lambda: ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="eeg-inference"),
+    INFERENCE_WORKERS, INFERENCE_CONCURRENCY,
+)
@@ -1,7 +1,9 @@
+import math
 import numpy as np
 import pandas as pd
-from scipy.signal import welch
-from typing import List, Dict, Union
+from functools import lru_cache
+from scipy.signal import get_window, welch
+from typing import List, Dict, Tuple, Union
 
 # Frequency bands
 BANDS = {
@@ -47,43 +49,274 @@ def compute_bandpower(data: np.ndarray, fs: int, method: str = 'welch') -> Dict[
 
     return bandpowers
 
-def extract_features_from_segment(segment: np.ndarray, fs: int = 256, channel_names: List[str] = None) -> np.ndarray:
+# Per-channel feature order: 4 time-domain moments followed by the band powers
+# sorted by key (alpha_abs, alpha_rel, beta_abs, ...). The trained models depend on it.
+MOMENT_KEYS = ["mean", "std", "skew", "kurtosis"]
+# Fewer samples than this give NaN (bias-corrected, as in pandas)
+MIN_SKEW_SAMPLES = 3
+MIN_KURTOSIS_SAMPLES = 4
+BANDPOWER_KEYS = sorted([f"{band}_abs" for band in BANDS] + [f"{band}_rel" for band in BANDS])
+FEATURES_PER_CHANNEL = len(MOMENT_KEYS) + len(BANDPOWER_KEYS)
+
+# Feature-set versions. A model is trained on one of them and must be served with the
+# same one; 1 is the per-channel layout every existing model uses.
+#   1  per-channel moments and band powers
+#   2  1, followed by the correlation of every channel pair and the band coherence of
+#      every pair (one coherence block per band, in BANDS order)
+FEATURE_SETS = (1, 2)
+DEFAULT_FEATURE_SET = 1
+
+def _channel_pairs(n_channels: int) -> Tuple[np.ndarray, np.ndarray]:
+    return np.triu_indices(n_channels, k=1)
+
+def n_features(n_channels: int, feature_set: int = DEFAULT_FEATURE_SET) -> int:
+    """Length of the feature vector for n_channels under a feature set."""
+    check_feature_set(feature_set)
+    count = n_channels * FEATURES_PER_CHANNEL
+    if feature_set >= 2:
+        count += len(_channel_pairs(n_channels)[0]) * (1 + len(BANDS))
+    return count
+
+def feature_set_for(n_model_features: int, n_channels: int = 16) -> int:
+    """The feature set whose vector length matches a model's n_features_in_ (default if none does)."""
+    for feature_set in FEATURE_SETS:
+        if n_features(n_channels, feature_set) == n_model_features:
+            return feature_set
+    return DEFAULT_FEATURE_SET
+
+def check_feature_set(feature_set: int):
+    if feature_set not in FEATURE_SETS:
+        raise ValueError(f"Unknown feature set {feature_set}. Use one of {list(FEATURE_SETS)}")
+
+def feature_names(channel_names: List[str], feature_set: int = DEFAULT_FEATURE_SET) -> List[str]:
     """
-    Extract features from a multi-channel EEG segment.
+    Names of the features returned by extract_features_from_segment, in order.
+    """
+    check_feature_set(feature_set)
+    names = [f"{ch}_{key}" for ch in channel_names for key in MOMENT_KEYS + BANDPOWER_KEYS]
+    if feature_set >= 2:
+        first, second = _channel_pairs(len(channel_names))
+        pairs = [f"{channel_names[i]}-{channel_names[j]}" for i, j in zip(first, second)]
+        names += [f"{pair}_corr" for pair in pairs]
+        names += [f"{pair}_{band}_coh" for band in BANDS for pair in pairs]
+    return names
+
+@lru_cache(maxsize=None)
+def _band_masks(fs: int, nperseg: int) -> Tuple[float, Dict[str, np.ndarray]]:
+    """
+    Frequency resolution and per-band boolean masks for a Welch PSD of the given size.
+    Computed once per (fs, nperseg) instead of once per channel.
+    """
+    freqs = np.fft.rfftfreq(nperseg, 1.0 / fs)
+    freq_res = freqs[1] - freqs[0]
+    masks = {band: np.logical_and(freqs >= low, freqs <= high) for band, (low, high) in BANDS.items()}
+    return freq_res, masks
+
+def _scalar_pow(x: np.ndarray, p: float) -> np.ndarray:
+    """
+    Elementwise x ** p through libm pow.
+    np.power on arrays can take a SIMD path that rounds differently from the scalar
+    pow pandas ends up calling per channel; this keeps the moments bit-identical.
+    """
+    return np.array([math.pow(v, p) for v in x.flat]).reshape(x.shape)
+
+def _moments(x: np.ndarray) -> np.ndarray:
+    """
+    Mean, std, skew and kurtosis along the last axis of x.
+
+    Matches np.mean, np.std and pd.Series.skew/.kurtosis (bias-corrected,
+    excess kurtosis) for each 1D slice, so the batched path produces the same
+    values as the per-channel loop it replaced.
+    """
+    n = np.float64(x.shape[-1])
+    mean = x.sum(axis=-1) / n
+    adjusted = x - mean[..., None]
+    adjusted2 = adjusted * adjusted
+    m2 = adjusted2.sum(axis=-1)
+    m3 = (adjusted2 * adjusted).sum(axis=-1)
+    m4 = (adjusted2 * adjusted2).sum(axis=-1)
+    max_abs = np.abs(x).max(axis=-1, initial=0.0)
+    return moments_from_sums(n, mean, m2, m3, m4, max_abs)
+
+def moments_from_sums(n: float, mean: np.ndarray, m2: np.ndarray, m3: np.ndarray, m4: np.ndarray,
+                      max_abs: np.ndarray) -> np.ndarray:
+    """
+    Mean, std, skew and kurtosis from the sample count, mean and the sums of
+    2nd/3rd/4th powers of deviations from the mean (as pandas computes them).
+    Returns an array with a trailing axis of length 4, in MOMENT_KEYS order.
+    """
+    n = np.float64(n)
+    std = np.sqrt(m2 / n)
+
+    # Same floating point guard pandas applies for (near-)constant signals
+    eps = np.finfo(np.float64).eps
+    m2 = np.where(np.abs(m2) < ((eps * max_abs) ** 2) * n, 0, m2)
+    m3 = np.where(np.abs(m3) < ((eps * max_abs) ** 3) * n, 0, m3)
+    m4 = np.where(np.abs(m4) < ((eps * max_abs) ** 4) * n, 0, m4)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        skew = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / _scalar_pow(m2, 1.5))
+        adj = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        numerator = n * (n + 1) * (n - 1) * m4
+        denominator = (n - 2) * (n - 3) * _scalar_pow(m2, 2)
+        kurt = numerator / denominator - adj
+
+    skew = np.where(m2 == 0, 0, skew)
+    kurt = np.where(denominator == 0, 0, kurt)
+    if n < MIN_SKEW_SAMPLES:
+        skew[...] = np.nan
+    if n < MIN_KURTOSIS_SAMPLES:
+        kurt[...] = np.nan
+
+    return np.stack([mean, std, skew, kurt], axis=-1)
+
+def _bandpowers(x: np.ndarray, fs: int) -> np.ndarray:
+    """
+    Absolute and relative band powers along the last axis of x, in BANDPOWER_KEYS order.
+    One Welch call covers every channel (and window) in x.
+    """
+    nperseg = fs * 2 # 2 second window for Welch, as in compute_bandpower
+    _, psd = welch(x, fs, nperseg=nperseg, axis=-1)
+    return bandpowers_from_psd(psd, fs, min(nperseg, x.shape[-1]))
+
+def bandpowers_from_psd(psd: np.ndarray, fs: int, nperseg: int) -> np.ndarray:
+    """
+    Absolute and relative band powers from a Welch PSD (frequency on the last axis),
+    in BANDPOWER_KEYS order.
+    """
+    freq_res, masks = _band_masks(fs, nperseg)
+
+    abs_power = {}
+    total_power = 0
+    for band, mask in masks.items():
+        # Boolean indexing on the last axis returns an F-ordered array; make it
+        # contiguous so the sum reduces in the same order as the 1D case
+        abs_power[band] = np.sum(np.ascontiguousarray(psd[..., mask]), axis=-1) * freq_res
+        total_power = total_power + abs_power[band]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        powers = {}
+        for band in BANDS:
+            powers[f"{band}_abs"] = abs_power[band]
+            powers[f"{band}_rel"] = np.where(total_power > 0, abs_power[band] / total_power, 0)
+
+    return np.stack([powers[key] for key in BANDPOWER_KEYS], axis=-1)
+
+@lru_cache(maxsize=None)
+def _welch_taper(nperseg: int) -> Tuple[np.ndarray, float]:
+    """Welch's default periodic Hann taper and the density scaling that goes with it."""
+    taper = get_window("hann", nperseg)
+    return taper, 1.0 / np.sum(taper ** 2)
+
+def welch_spectra(x: np.ndarray, fs: int) -> Tuple[np.ndarray, int]:
+    """
+    FFTs of the tapered Welch segments along the last axis of x, with the same
+    segmentation as _bandpowers (2 s segments, 50% overlap, constant detrend).
+
+    Returns (spectra [..., n_segments, n_freqs], nperseg). Both the per-channel
+    PSD and the cross-spectra between channels are derived from this one pass.
+    """
+    nperseg = min(fs * 2, x.shape[-1])
+    taper, _ = _welch_taper(nperseg)
+    segments = np.lib.stride_tricks.sliding_window_view(x, nperseg, axis=-1)[..., ::nperseg // 2, :]
+    detrended = segments - segments.mean(axis=-1, keepdims=True)
+    return np.fft.rfft(detrended * taper, axis=-1), nperseg
+
+def psd_from_spectra(spectra: np.ndarray, fs: int, nperseg: int) -> np.ndarray:
+    """One-sided Welch PSD (as scipy.signal.welch) from welch_spectra output."""
+    _, scale = _welch_taper(nperseg)
+    periodograms = (spectra.real ** 2 + spectra.imag ** 2) * (scale / fs)
+    # Fold negative frequencies in, except DC (and Nyquist for even lengths)
+    periodograms[..., 1:-1 if nperseg % 2 == 0 else None] *= 2
+    return periodograms.mean(axis=-2)
+
+def correlation_features(x: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of every channel pair of x [n_windows, n_channels, n_samples],
+    as [n_windows, n_pairs]. Pairs involving a flat channel are 0.
+    """
+    centered = x - x.mean(axis=-1, keepdims=True)
+    covariance = centered @ centered.transpose(0, 2, 1)
+    variance = np.diagonal(covariance, axis1=1, axis2=2)
+    first, second = _channel_pairs(x.shape[1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = covariance[:, first, second] / np.sqrt(variance[:, first] * variance[:, second])
+    return np.nan_to_num(corr, nan=0.0, posinf=0.0, neginf=0.0)
+
+def coherence_from_spectra(spectra: np.ndarray, fs: int, nperseg: int) -> np.ndarray:
+    """
+    Band coherence of every channel pair from welch_spectra output
+    [n_windows, n_channels, n_segments, n_freqs], as [n_windows, n_bands * n_pairs].
+
+    For each band the cross-spectral density matrix is summed over the band's
+    frequencies and the Welch segments (one matrix product for all pairs), and
+    coherence is |S_xy|^2 / (S_xx * S_yy) of those sums.
+    """
+    _, masks = _band_masks(fs, nperseg)
+    n_windows, n_channels = spectra.shape[:2]
+    first, second = _channel_pairs(n_channels)
+
+    blocks = []
+    for mask in masks.values():
+        band = spectra[..., mask].reshape(n_windows, n_channels, -1)
+        csd = band @ band.conj().transpose(0, 2, 1)
+        power = np.diagonal(csd, axis1=1, axis2=2).real
+        with np.errstate(invalid="ignore", divide="ignore"):
+            coherence = np.abs(csd[:, first, second]) ** 2 / (power[:, first] * power[:, second])
+        blocks.append(np.nan_to_num(coherence, nan=0.0, posinf=0.0, neginf=0.0))
+    return np.concatenate(blocks, axis=-1)
+
+def extract_features_batch(segments: np.ndarray, fs: int = 256, feature_set: int = DEFAULT_FEATURE_SET) -> np.ndarray:
+    """
+    Extract features from many multi-channel EEG segments at once.
 
     Args:
-        segment: 2D array [n_samples, n_channels]
+        segments: 3D array [n_windows, n_samples, n_channels] (a strided window view is fine)
         fs: Sampling rate
-        channel_names: List of channel names (optional, for structured return if needed)
+        feature_set: Feature-set version (see FEATURE_SETS)
 
     Returns:
-        1D feature vector.
+        2D feature matrix [n_windows, n_features(n_channels, feature_set)], each row
+        identical to extract_features_from_segment on the corresponding window.
     """
-    n_samples, n_channels = segment.shape
+    check_feature_set(feature_set)
+    segments = np.asarray(segments, dtype=np.float64)
+    if segments.ndim != 3:
+        raise ValueError(f"Expected segments of shape [n_windows, n_samples, n_channels], got {segments.shape}")
+
+    n_windows, n_samples, n_channels = segments.shape
 
-    features = []
+    # [n_windows, n_channels, n_samples], contiguous so every reduction runs over the fast axis
+    x = np.ascontiguousarray(segments.transpose(0, 2, 1))
 
-    # Per-channel features
-    for ch in range(n_channels):
-        ch_data = segment[:, ch]
+    if feature_set == 1:
+        features = np.concatenate([_moments(x), _bandpowers(x, fs)], axis=-1)
+        return features.reshape(n_windows, n_channels * FEATURES_PER_CHANNEL)
 
-        # Time domain stats
-        features.append(np.mean(ch_data))
-        features.append(np.std(ch_data))
-        features.append(pd.Series(ch_data).skew())
-        features.append(pd.Series(ch_data).kurtosis())
+    # One FFT pass per Welch segment feeds both the band powers and the cross-spectra
+    spectra, nperseg = welch_spectra(x, fs)
+    per_channel = np.concatenate([_moments(x), bandpowers_from_psd(psd_from_spectra(spectra, fs, nperseg), fs, nperseg)], axis=-1)
+    return np.concatenate([
+        per_channel.reshape(n_windows, n_channels * FEATURES_PER_CHANNEL),
+        correlation_features(x),
+        coherence_from_spectra(spectra, fs, nperseg),
+    ], axis=-1)
 
-        # Frequency domain features
-        bp = compute_bandpower(ch_data, fs)
-        # Order: delta_abs, theta_abs, ..., delta_rel, ...
-        # We sort by keys to be deterministic
-        for key in sorted(bp.keys()):
-            features.append(bp[key])
+def extract_features_from_segment(segment: np.ndarray, fs: int = 256, channel_names: List[str] = None,
+                                  feature_set: int = DEFAULT_FEATURE_SET) -> np.ndarray:
+    """
+    Extract features from a multi-channel EEG segment.
 
-    # Global features (ratios, etc.) - Simplified for now
-    # TODO: Add cross-channel features if needed
+    Args:
+        segment: 2D array [n_samples, n_channels]
+        fs: Sampling rate
+        channel_names: List of channel names (optional, for structured return if needed)
+        feature_set: Feature-set version (see FEATURE_SETS)
 
-    return np.array(features)
+    Returns:
+        1D feature vector.
+    """
+    return extract_features_batch(np.asarray(segment)[np.newaxis], fs, feature_set)[0]
 
 def segment_data(df: pd.DataFrame, window_size_sec: int = 4, step_size_sec: int = 2, fs: int = 256):
     """
@@ -98,3 +331,53 @@ def segment_data(df: pd.DataFrame, window_size_sec: int = 4, step_size_sec: int
         end = start + window_size_samples
         segment = df.iloc[start:end]
         yield segment
+
+def sliding_windows(data: np.ndarray, window_size_sec: int = 4, step_size_sec: int = 2, fs: int = 256) -> np.ndarray:
+    """
+    Zero-copy sliding windows over a [n_samples, n_channels] array.
+
+    Same windows as segment_data, returned as a strided view of shape
+    [n_windows, window_size_samples, n_channels] that can be passed straight to
+    extract_features_batch.
+    """
+    window_size_samples = window_size_sec * fs
+    step_size_samples = step_size_sec * fs
+
+    n_samples, n_channels = data.shape
+    if n_samples < window_size_samples:
+        return np.empty((0, window_size_samples, n_channels), dtype=data.dtype)
+
+    # sliding_window_view puts the window axis last: [n_samples - W + 1, n_channels, W]
+    windows = np.lib.stride_tricks.sliding_window_view(data, window_size_samples, axis=0)
+    return windows[::step_size_samples].transpose(0, 2, 1)
+
+def window_labels(labels: np.ndarray, n_windows: int, window_size_samples: int, step_size_samples: int) -> np.ndarray:
+    """
+    Majority label of each window, ties going to the smallest label
+    (same as segment[status].mode()[0] in the feature engineering notebook).
+    """
+    classes = np.unique(labels)
+    starts = np.arange(n_windows) * step_size_samples
+    counts = np.empty((len(classes), n_windows), dtype=np.int64)
+    for i, cls in enumerate(classes):
+        cumulative = np.concatenate([[0], np.cumsum(labels == cls)])
+        counts[i] = cumulative[starts + window_size_samples] - cumulative[starts]
+    return classes[np.argmax(counts, axis=0)]
+
+def read_csv_chunks(csv_path: str, chunksize: int = 100_000, label_column: str = "status"):
+    """
+    Generator that reads a labelled EEG CSV in chunks and yields (data, labels),
+    where data is the float64 [n_rows, n_channels] array of every column except the label.
+    """
+    feature_cols = None
+    status_col = None
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        if feature_cols is None:
+            # Handle case sensitivity of the label column, as in the notebook
+            status_col = next((c for c in chunk.columns if c.lower() == label_column.lower()), None)
+            if status_col is None:
+                raise ValueError(f"Label column '{label_column}' not found in {csv_path}")
+            feature_cols = [c for c in chunk.columns if c != status_col]
+
+        yield chunk[feature_cols].to_numpy(dtype=np.float64), chunk[status_col].to_numpy()
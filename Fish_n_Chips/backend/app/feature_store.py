@@ -0,0 +1,184 @@
+"""
+On-disk feature store for EEG training builds.
+
+Windows are grouped into fixed-size blocks and each block's features are
+written to a content-addressed shard (shards/<sha256>.npz, float32) by a
+process pool. A manifest lists the shards in recording order. Re-running a
+build after an interruption or a partial change of the dataset only
+recomputes the blocks whose shard is missing.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .feature_extraction import DEFAULT_FEATURE_SET, read_csv_chunks, sliding_windows, window_labels, extract_features_batch
+
+MANIFEST_NAME = "manifest.json"
+SHARD_DIR = "shards"
+
+def iter_window_blocks(csv_path: str, windows_per_block: int = 512, window_size_sec: int = 4,
+                       step_size_sec: int = 2, fs: int = 256, chunksize: int = 100_000):
+    """
+    Generator that yields (rows, labels) blocks of a labelled EEG CSV, each holding
+    exactly the rows for windows_per_block consecutive windows (the last block may hold fewer).
+
+    Block boundaries depend only on the window index, not on chunksize, so the
+    same recording always produces the same blocks (and shard keys).
+    """
+    window_size_samples = window_size_sec * fs
+    step_size_samples = step_size_sec * fs
+    block_rows = (windows_per_block - 1) * step_size_samples + window_size_samples
+    block_step = windows_per_block * step_size_samples
+
+    buffer_data = None
+    buffer_labels = None
+
+    for data, labels in read_csv_chunks(csv_path, chunksize):
+        if buffer_data is not None:
+            data = np.concatenate([buffer_data, data])
+            labels = np.concatenate([buffer_labels, labels])
+
+        start = 0
+        while len(data) - start >= block_rows:
+            yield data[start:start + block_rows], labels[start:start + block_rows]
+            start += block_step
+
+        buffer_data = data[start:]
+        buffer_labels = labels[start:]
+
+    if buffer_data is not None and len(buffer_data) >= window_size_samples:
+        yield buffer_data, buffer_labels
+
+def shard_key(rows: np.ndarray, labels: np.ndarray, params: Dict) -> str:
+    """Content address of a block: hash of its rows, labels and the extraction parameters."""
+    h = hashlib.sha256()
+    h.update(json.dumps(params, sort_keys=True).encode())
+    h.update(str(rows.shape).encode())
+    h.update(np.ascontiguousarray(rows).tobytes())
+    h.update(np.asarray(labels).astype(str).tobytes())
+    return h.hexdigest()
+
+def _build_shard(shard_path: str, rows: np.ndarray, labels: np.ndarray, window_size_sec: int,
+                 step_size_sec: int, fs: int, feature_set: int = DEFAULT_FEATURE_SET) -> Tuple[int, int, float]:
+    """
+    Worker: extract features for one block and write its shard.
+    Returns (worker pid, windows processed, seconds spent).
+    """
+    start = time.perf_counter()
+
+    windows = sliding_windows(rows, window_size_sec, step_size_sec, fs)
+    X = extract_features_batch(windows, fs, feature_set).astype(np.float32)
+    y = window_labels(labels, len(windows), window_size_sec * fs, step_size_sec * fs)
+
+    # Write under a temporary name so an interrupted build never leaves a partial shard behind
+    tmp_path = shard_path + f".{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, X=X, y=y)
+    os.replace(tmp_path, shard_path)
+
+    return os.getpid(), len(windows), time.perf_counter() - start
+
+def build_feature_store(csv_path: str, out_dir: str, window_size_sec: int = 4, step_size_sec: int = 2,
+                        fs: int = 256, windows_per_block: int = 512, workers: int = None,
+                        chunksize: int = 100_000, feature_set: int = DEFAULT_FEATURE_SET) -> Dict:
+    """
+    Build (or resume) the feature store for csv_path in out_dir using a process pool.
+
+    Returns the manifest, which also records windows/sec per worker for this run.
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_dir = os.path.join(out_dir, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    params = {
+        "window_size_sec": window_size_sec,
+        "step_size_sec": step_size_sec,
+        "fs": fs,
+        "windows_per_block": windows_per_block,
+    }
+    if feature_set != DEFAULT_FEATURE_SET:
+        # Only recorded when set, so existing default stores keep their shard keys
+        params["feature_set"] = feature_set
+
+    shards = []
+    reused = 0
+    worker_stats = defaultdict(lambda: {"windows": 0, "seconds": 0.0})
+    start = time.perf_counter()
+
+    def collect(future):
+        pid, n_windows, seconds = future.result()
+        worker_stats[pid]["windows"] += n_windows
+        worker_stats[pid]["seconds"] += seconds
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bound the number of blocks in flight so memory stays flat on long recordings
+        pending = deque()
+        for rows, labels in iter_window_blocks(csv_path, windows_per_block, window_size_sec, step_size_sec, fs, chunksize):
+            key = shard_key(rows, labels, params)
+            n_windows = (len(rows) - window_size_sec * fs) // (step_size_sec * fs) + 1
+            shards.append({"key": key, "n_windows": int(n_windows)})
+
+            shard_path = os.path.join(shard_dir, f"{key}.npz")
+            if os.path.exists(shard_path):
+                reused += 1
+                continue
+
+            pending.append(pool.submit(_build_shard, shard_path, rows, labels, window_size_sec, step_size_sec, fs, feature_set))
+            if len(pending) >= 2 * workers:
+                collect(pending.popleft())
+
+        while pending:
+            collect(pending.popleft())
+
+    elapsed = time.perf_counter() - start
+
+    manifest = {
+        "source": os.path.abspath(csv_path),
+        "params": params,
+        "n_windows": sum(s["n_windows"] for s in shards),
+        "shards": shards,
+        "last_build": {
+            "seconds": round(elapsed, 3),
+            "shards_computed": len(shards) - reused,
+            "shards_reused": reused,
+            "workers": {
+                str(pid): {
+                    "windows": s["windows"],
+                    "windows_per_sec": round(s["windows"] / s["seconds"], 1) if s["seconds"] > 0 else 0.0,
+                }
+                for pid, s in worker_stats.items()
+            },
+        },
+    }
+
+    tmp_path = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST_NAME))
+
+    return manifest
+
+def load_feature_shards(out_dir: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load the feature store in out_dir into (X, y), in recording order.
+    """
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No feature store manifest found in {out_dir}")
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    X_parts, y_parts = [], []
+    for shard in manifest["shards"]:
+        with np.load(os.path.join(out_dir, SHARD_DIR, f"{shard['key']}.npz")) as data:
+            X_parts.append(data["X"])
+            y_parts.append(data["y"])
+
+    return np.concatenate(X_parts), np.concatenate(y_parts)
@@ -0,0 +1,220 @@
+"""
+Live EEG ingest from headsets over WebSocket.
+
+Each connection gets an IngestSession: a bounded queue of incoming sample
+blocks and a StreamingFeatureEngine. The event loop only moves bytes: one
+task receives blocks into the queue, another takes them off and hands the
+feature extraction and inference to execution.inference_pool, then sends the
+predictions back. When the queue is full the session applies its drop
+policy:
+
+    block        stop reading from the socket until there is room (TCP backpressure)
+    drop_oldest  discard the oldest queued block to make room
+    drop_newest  discard the incoming block
+
+Blocks are either binary little-endian float32 [n_samples, n_channels]
+row-major payloads or JSON text {"samples": [[...], ...]}. Bad blocks and
+hops that could not be scored (e.g. no model loaded) are answered with
+{"type": "error"} messages; if the consumer itself fails, the socket is
+closed with the error.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .cpu_tasks import N_CHANNELS
+from .execution import inference_pool
+from .feature_extraction import DEFAULT_FEATURE_SET
+from .streaming import StreamingFeatureEngine
+
+DROP_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+class IngestSession:
+    """State for one live headset connection."""
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], Dict[str, Any]], n_channels: int = 16, fs: int = 256,
+                 window_size_sec: int = 4, hop_sec: float = 1.0, queue_size: int = 32, policy: str = "drop_oldest",
+                 feature_set_fn: Optional[Callable[[], int]] = None):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{policy}'. Use one of {list(DROP_POLICIES)}")
+        if queue_size < 1:
+            raise ValueError("queue must be >= 1")
+        if n_channels != N_CHANNELS:
+            # The models are trained on the 16-channel montage
+            raise ValueError(f"n_channels must be {N_CHANNELS}, got {n_channels}")
+
+        self.predict_fn = predict_fn
+        # Asked on every prediction, so a model swap to another feature set applies mid-session
+        self.feature_set_fn = feature_set_fn or (lambda: DEFAULT_FEATURE_SET)
+        self.n_channels = n_channels
+        self.fs = fs
+        self.policy = policy
+        self.hop_samples = max(1, int(hop_sec * fs))
+        self.engine = StreamingFeatureEngine(n_channels=n_channels, fs=fs, window_size_sec=window_size_sec)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        self.samples_received = 0
+        self.samples_dropped = 0
+        self.blocks_dropped = 0
+        self._since_prediction = 0
+
+    @classmethod
+    def from_query(cls, params, predict_fn, feature_set_fn: Optional[Callable[[], int]] = None) -> "IngestSession":
+        return cls(
+            predict_fn,
+            feature_set_fn=feature_set_fn,
+            n_channels=int(params.get("n_channels", 16)),
+            fs=int(params.get("fs", 256)),
+            hop_sec=float(params.get("hop", 1.0)),
+            queue_size=int(params.get("queue", 32)),
+            policy=params.get("policy", "drop_oldest"),
+        )
+
+    def decode(self, message: Dict[str, Any]) -> np.ndarray:
+        """Turn a received WebSocket message into a [n_samples, n_channels] block."""
+        if message.get("bytes") is not None:
+            payload = message["bytes"]
+            if len(payload) % (4 * self.n_channels):
+                raise ValueError(f"Binary block size must be a multiple of {4 * self.n_channels} bytes")
+            block = np.frombuffer(payload, dtype="<f4").reshape(-1, self.n_channels)
+        else:
+            if not message.get("text"):
+                raise ValueError("Empty message: send binary float32 samples or JSON {\"samples\": [...]}")
+            block = np.asarray(json.loads(message["text"])["samples"], dtype=np.float64)
+            if block.ndim != 2 or block.shape[1] != self.n_channels:
+                raise ValueError(f"Expected samples of shape [n, {self.n_channels}], got {block.shape}")
+
+        # Rejected like the HTTP paths do (check_eeg_values): one NaN would poison the whole window
+        if not np.isfinite(block).all():
+            raise ValueError("EEG data contains NaN or infinite values")
+        return block
+
+    async def enqueue(self, block: np.ndarray):
+        """Queue a block according to the drop policy."""
+        if self.policy == "block":
+            await self.queue.put(block)
+            return
+
+        if self.queue.full():
+            if self.policy == "drop_newest":
+                self._record_drop(block)
+                return
+            self._record_drop(self.queue.get_nowait())
+
+        self.queue.put_nowait(block)
+
+    def _record_drop(self, block: np.ndarray):
+        self.blocks_dropped += 1
+        self.samples_dropped += len(block)
+
+    def process(self, block: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Worker-side: feed one block to the engine and run inference every hop.
+        Runs in the inference pool, never on the event loop.
+        """
+        predictions = []
+        # Split large blocks at hop boundaries so every hop gets its own prediction
+        start = 0
+        while start < len(block):
+            take = min(len(block) - start, self.hop_samples - self._since_prediction)
+            self.engine.push(block[start:start + take])
+            self._since_prediction += take
+            start += take
+
+            if self._since_prediction < self.hop_samples:
+                continue
+            self._since_prediction = 0
+
+            if self.engine.ready:
+                started = time.perf_counter()
+                try:
+                    result = self.predict_fn(self.engine.features(self.feature_set_fn()).reshape(1, -1))
+                except RuntimeError as e:
+                    # e.g. no model loaded yet; later hops may succeed
+                    predictions.append({"type": "error", "error": str(e),
+                                        "samples_received": self.engine.total_samples})
+                    continue
+                result.update({
+                    "type": "prediction",
+                    "samples_received": self.engine.total_samples,
+                    "inference_ms": round((time.perf_counter() - started) * 1000, 3),
+                })
+                predictions.append(result)
+        return predictions
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "type": "status",
+            "queued_blocks": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "policy": self.policy,
+            "samples_received": self.samples_received,
+            "samples_dropped": self.samples_dropped,
+            "blocks_dropped": self.blocks_dropped,
+        }
+
+async def run_ingest(websocket, session: IngestSession):
+    """
+    Drive one ingest connection: receive into the session queue and, concurrently,
+    process queued blocks on the inference pool and send predictions back.
+    """
+    async def consume():
+        while True:
+            block = await session.queue.get()
+            predictions = await inference_pool.run(session.process, block)
+            for prediction in predictions:
+                prediction["queued_blocks"] = session.queue.qsize()
+                await websocket.send_text(json.dumps(prediction))
+
+    consumer = asyncio.create_task(consume())
+
+    async def unless_consumer_stops(awaitable):
+        """
+        Await a receive/enqueue, but return early if the consumer has stopped,
+        so a dead consumer can't leave us blocked on a full queue or a quiet socket.
+        Returns (finished, result).
+        """
+        task = asyncio.ensure_future(awaitable)
+        await asyncio.wait({task, consumer}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return True, task.result()
+        task.cancel()
+        return False, None
+
+    try:
+        await websocket.send_text(json.dumps(session.status()))
+        while True:
+            finished, message = await unless_consumer_stops(websocket.receive())
+            if not finished:
+                break
+            if message["type"] == "websocket.disconnect":
+                return
+
+            try:
+                block = session.decode(message)
+            except (ValueError, TypeError, KeyError, json.JSONDecodeError) as e:
+                await websocket.send_text(json.dumps({"type": "error", "error": str(e)}))
+                continue
+
+            session.samples_received += len(block)
+            dropped_before = session.blocks_dropped
+            finished, _ = await unless_consumer_stops(session.enqueue(block))
+            if not finished:
+                break
+            if session.blocks_dropped > dropped_before:
+                # Tell the device it is sending faster than we can score
+                await websocket.send_text(json.dumps(session.status()))
+
+        # Only reached when the consumer stopped: report its error and close
+        error = consumer.exception() if not consumer.cancelled() else None
+        print(f"Ingest consumer stopped: {error!r}")
+        try:
+            await websocket.send_text(json.dumps({"type": "error", "error": f"Ingest worker failed: {error}"}))
+            await websocket.close(code=1011)
+        except Exception:
+            pass # The socket may be what failed
+    finally:
+        consumer.cancel()
@@ -1,6 +1,5 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket
+from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
 import numpy as np
 import os
 import asyncio
@@ -10,13 +9,21 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from .schemas import EEGSampleRequest, PredictionResponse, SaveEEGResultRequest
-from .feature_extraction import extract_features_from_segment
-from .data_processing import parse_edf, parse_csv
-from backend.app.routers import speech_analysis, cognitive_games, unified_analysis
-from backend.app.database import get_db
-from sqlalchemy.orm import Session
-from fastapi import Depends
+from typing import Optional, Union
+from .schemas import EEGSampleRequest, PredictionResponse, SaveEEGResultRequest, WindowPrediction, WindowedPredictionResponse
+from .data_processing import parse_binary_eeg
+from .streaming import StreamingFeatureEngine
+from .stream_protocol import StreamFormat, encode_frame, handshake_message
+from .ingest import IngestSession, run_ingest
+from .model_registry import eeg_registry
+from .feature_extraction import DEFAULT_FEATURE_SET
+from .batching import MICROBATCH_ENABLED, MicroBatcher
+from .result_cache import RESULT_CACHE_ENABLED, ResultCache, upload_digest
+from .execution import cpu_pool, inference_pool, io_pool
+from .cpu_tasks import check_eeg_shape, check_eeg_values, csv_features, edf_features, eeg_features
+from starlette.concurrency import run_in_threadpool
+from backend.app.routers import speech_analysis, cognitive_games, unified_analysis, model_admin
+from backend.app.database import add_and_commit, in_session
 
 # ... (existing code) ...
 
@@ -25,36 +32,52 @@ from fastapi import Depends
 # ... (existing code) ...
 
 
-# Global variables for model and scaler
-model = None
+# Global variables for scaler; the EEG model is served from eeg_registry (see model_registry)
 scaler = None
+# Set when EEG_MICROBATCH is enabled; /predict then scores concurrent requests together
+batcher = None
+# Responses of /predict_file keyed by upload content, model and parameters
+result_cache = ResultCache() if RESULT_CACHE_ENABLED else None
+if result_cache is not None:
+    # Cached predictions are only valid for the model that produced them
+    eeg_registry.add_listener(lambda served: result_cache.set_model(served.fingerprint[:16]))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Load model on startup
-    global model, scaler
-    model_path = os.path.join("models", "eeg_best_model.joblib")
+    global scaler, batcher
     # scaler_path = os.path.join("models", "eeg_scaler.joblib") # If scaler is separate
 
     try:
         # Check if model exists (it might not if notebooks haven't run)
-        if os.path.exists(model_path):
-            model = joblib.load(model_path)
-            print(f"Model loaded from {model_path}")
+        served = eeg_registry.ensure_loaded()
+        if served is not None:
+            print(f"Model {served.version} loaded from {served.path}")
         else:
-            print(f"Warning: Model not found at {model_path}. Inference will fail.")
+            print(f"Warning: Model not found in {eeg_registry.directory} or at {eeg_registry.legacy_path}. Inference will fail.")
 
     except Exception as e:
         print(f"Error loading model: {e}")
 
+    if MICROBATCH_ENABLED:
+        batcher = MicroBatcher(eeg_registry.score, pool=inference_pool, feature_set_fn=served_feature_set)
+        batcher.start()
+        print(f"Micro-batching /predict: {batcher.window * 1000:g} ms window, max batch {batcher.max_batch}")
+
     yield
     # Clean up if needed
+    if batcher is not None:
+        await batcher.stop()
+    cpu_pool.shutdown()
+    io_pool.shutdown()
+    inference_pool.shutdown()
 
 app = FastAPI(title="CogniSafe EEG Screener", lifespan=lifespan)
 
 app.include_router(speech_analysis.router)
 app.include_router(cognitive_games.router)
 app.include_router(unified_analysis.router)
+app.include_router(model_admin.router)
 
 # CORS
 app.add_middleware(
@@ -77,38 +100,61 @@ async def websocket_endpoint(websocket: WebSocket):
         window_size = 4 * fs # 4 seconds
         n_channels = 16
 
+        # JSON text frames by default; ?format=binary negotiates the binary frame protocol
+        try:
+            stream_format = StreamFormat.from_query(websocket.query_params, hop=fs)
+        except ValueError as e:
+            await websocket.send_text(json.dumps({"error": str(e)}))
+            return
+
+        if stream_format.binary:
+            await websocket.send_text(handshake_message(stream_format, fs, n_channels))
+
+        # Per-connection sliding window; each tick only adds the newest second of
+        # samples and the engine reuses the cached work for the overlapping 3 s
+        engine = StreamingFeatureEngine(n_channels=n_channels, fs=fs, window_size_sec=4)
+        engine.push(np.random.randn(window_size, n_channels))
+
+        # Samples not yet sent to the client (what a delta frame carries)
+        new_samples = window_size
+
         while True:
             # Generate dummy chunk (replace with real file reading logic if needed)
             # We generate slightly different noise to vary the probability
             noise_level = np.random.uniform(0.5, 2.0)
-            chunk = np.random.randn(window_size, n_channels) * noise_level
+            engine.push(np.random.randn(fs, n_channels) * noise_level)
+            new_samples = min(new_samples + fs, window_size)
+            chunk = engine.window()
 
             # Run inference on this chunk
             # We need to handle the potential errors gracefully inside the loop
             try:
-                features = extract_features_from_segment(chunk, fs=fs)
-                features_reshaped = features.reshape(1, -1)
-
-                if model:
-                    status_class = int(model.predict(features_reshaped)[0])
-                    probability = float(model.predict_proba(features_reshaped)[0][1])
-
-                    if probability < 0.3:
-                        risk_level = "Low"
-                    elif probability < 0.7:
-                        risk_level = "Medium"
+                if eeg_registry.active is not None:
+                    # Feature extraction and inference run on the worker pool, not the event loop
+                    result = await inference_pool.run(
+                        lambda: predict_stream_features(engine.features(served_feature_set()).reshape(1, -1))
+                    )
+                    status_class = result["status_class"]
+                    probability = result["probability"]
+                    risk_level = result["risk_level"]
+                    timestamp = np.random.randint(0, 10000) # Mock timestamp
+
+                    if stream_format.binary:
+                        await websocket.send_bytes(encode_frame(
+                            stream_format, chunk, new_samples, timestamp,
+                            status_class=status_class, probability=probability, risk_level=risk_level
+                        ))
                     else:
-                        risk_level = "High"
-
-                    response = {
-                        "timestamp": np.random.randint(0, 10000), # Mock timestamp
-                        "status_class": status_class,
-                        "probability": probability,
-                        "risk_level": risk_level,
-                        "raw_chunk": chunk.tolist() # Send raw data for visualization (careful with size)
-                    }
-
-                    await websocket.send_text(json.dumps(response))
+                        response = {
+                            "timestamp": timestamp,
+                            "status_class": status_class,
+                            "probability": probability,
+                            "risk_level": risk_level,
+                            "raw_chunk": chunk.tolist() # Send raw data for visualization (careful with size)
+                        }
+
+                        await websocket.send_text(json.dumps(response))
+                    new_samples = 0
                 else:
                     await websocket.send_text(json.dumps({"error": "Model not loaded"}))
 
@@ -124,73 +170,221 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close()
 
 
+def served_feature_set() -> int:
+    """Feature set of the EEG model being served; features must be extracted with it."""
+    served = eeg_registry.active
+    return served.feature_set if served is not None else DEFAULT_FEATURE_SET
+
+def predict_stream_features(features: np.ndarray) -> dict:
+    """Score one live-stream feature row. Called from the ingest worker pool."""
+    if eeg_registry.active is None:
+        raise RuntimeError("Model not loaded")
+
+    probas, served = eeg_registry.score(features)
+    probability = float(probas[0][1])
+    return {
+        "status_class": int(served.classes_[np.argmax(probas[0])]),
+        "probability": probability,
+        "risk_level": risk_level_from_probability(probability),
+        "model_version": served.version
+    }
+
+@app.websocket("/ws/ingest")
+async def ingest_endpoint(websocket: WebSocket):
+    """
+    Live ingest from a headset: the device pushes sample blocks, the server
+    answers with a prediction per hop of new data. See ingest.py for the protocol.
+    """
+    await websocket.accept()
+    try:
+        session = IngestSession.from_query(websocket.query_params, predict_stream_features, served_feature_set)
+    except ValueError as e:
+        await websocket.send_text(json.dumps({"type": "error", "error": str(e)}))
+        await websocket.close(code=1008)
+        return
+
+    try:
+        await run_ingest(websocket, session)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Ingest WebSocket error: {e}")
+        await websocket.close(code=1011)
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "model_loaded": model is not None}
+    served = eeg_registry.active
+    return {"status": "healthy", "model_loaded": served is not None, "model_version": served.version if served else None}
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "predict_batching": {"enabled": True, "window_ms": batcher.window * 1000, "max_batch": batcher.max_batch,
+                             **batcher.stats.as_dict()} if batcher is not None else {"enabled": False},
+        "result_cache": {"enabled": True, **result_cache.stats()} if result_cache is not None else {"enabled": False},
+        "execution": {"cpu": cpu_pool.describe(), "io": io_pool.describe(), "inference": inference_pool.describe()},
+    }
+
+def risk_level_from_probability(probability: float) -> str:
+    if probability < 0.3:
+        return "Low"
+    elif probability < 0.7:
+        return "Medium"
+    return "High"
 
-def run_inference(eeg_data: np.ndarray, fs: int):
-    if model is None:
+def check_model_loaded():
+    if eeg_registry.active is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
-    # Check shape
-    if eeg_data.ndim != 2:
-        raise HTTPException(status_code=400, detail="EEG data must be 2D array [samples, channels]")
-
-    if eeg_data.shape[1] != 16:
-        raise HTTPException(status_code=400, detail=f"EEG data must have 16 channels. Got {eeg_data.shape[1]}")
-
-    # Extract features
-    features = extract_features_from_segment(eeg_data, fs=fs)
+def validate_eeg_input(eeg_data: np.ndarray, fs: int):
+    check_model_loaded()
+    check_eeg_shape(eeg_data)
+    check_eeg_values(eeg_data, fs)
 
-    # Reshape for prediction (1, n_features)
-    features_reshaped = features.reshape(1, -1)
-
-    # Predict
-    status_class = int(model.predict(features_reshaped)[0])
-    probability = float(model.predict_proba(features_reshaped)[0][1])
+def run_inference(eeg_data: np.ndarray, fs: int):
+    validate_eeg_input(eeg_data, fs)
+    served = eeg_registry.active
+    return score_segment(eeg_features(eeg_data, fs, feature_set=served.feature_set), served)
+
+def score_segment(features: np.ndarray, served=None) -> PredictionResponse:
+    """
+    Score a (1, n_features) row; one pass over the trees, class = argmax of the probabilities.
+    `served` pins the model version the features were extracted for (default: the active one).
+    """
+    probas, served = eeg_registry.score(features, served)
+    return prediction_from_proba(probas[0], served)
+
+def prediction_from_proba(proba: np.ndarray, served) -> PredictionResponse:
+    """Response for one row of class probabilities from the served model version."""
+    probability = float(proba[1])
+    return PredictionResponse(
+        status_class=int(served.classes_[np.argmax(proba)]),
+        probability=probability,
+        risk_level=risk_level_from_probability(probability),
+        model_version=served.version
+    )
 
-    # Determine risk level
-    if probability < 0.3:
-        risk_level = "Low"
-    elif probability < 0.7:
-        risk_level = "Medium"
-    else:
-        risk_level = "High"
+def run_windowed_inference(eeg_data: np.ndarray, fs: int, window_size_sec: int = 4, step_size_sec: int = 2):
+    """
+    Score a recording window by window, the way the model was trained
+    (see segment_data), and aggregate the per-window probabilities.
+    """
+    validate_eeg_input(eeg_data, fs)
+    served = eeg_registry.active
+    features = eeg_features(eeg_data, fs, windowed=True, window_size_sec=window_size_sec, step_size_sec=step_size_sec,
+                            feature_set=served.feature_set)
+    return score_windows(features, window_size_sec, step_size_sec, served)
+
+def score_windows(features: np.ndarray, window_size_sec: int = 4, step_size_sec: int = 2,
+                  served=None) -> WindowedPredictionResponse:
+    """One model call for all window feature rows, aggregated into a timeline (see score_segment for `served`)."""
+    probas, served = eeg_registry.score(features, served)
+    classes = served.classes_[np.argmax(probas, axis=1)]
+    window_probabilities = probas[:, 1]
+
+    timeline = [
+        WindowPrediction(
+            start_sec=i * step_size_sec,
+            end_sec=i * step_size_sec + window_size_sec,
+            status_class=int(status_class),
+            probability=float(probability)
+        )
+        for i, (status_class, probability) in enumerate(zip(classes, window_probabilities))
+    ]
 
-    return PredictionResponse(
-        status_class=status_class,
+    probability = float(np.mean(window_probabilities))
+    return WindowedPredictionResponse(
+        status_class=int(served.classes_[np.argmax(np.mean(probas, axis=0))]),
         probability=probability,
-        risk_level=risk_level,
-        model_version="v1.0"
+        risk_level=risk_level_from_probability(probability),
+        model_version=served.version,
+        max_probability=float(np.max(window_probabilities)),
+        window_size_sec=window_size_sec,
+        step_size_sec=step_size_sec,
+        windows=timeline
     )
 
+async def predict_array(eeg_data: np.ndarray, fs: int) -> PredictionResponse:
+    """Score one in-memory recording (shared by /predict and /predict_binary)."""
+    # Validated here, before it can join a micro-batch
+    validate_eeg_input(eeg_data, fs)
+    if batcher is None:
+        # Feature extraction on the process pool, scoring on the in-process model
+        served = eeg_registry.active
+        features = await cpu_pool.run(eeg_features, eeg_data, fs, feature_set=served.feature_set)
+        return await run_in_threadpool(score_segment, features, served)
+
+    return prediction_from_proba(*await batcher.submit(eeg_data, fs))
+
 @app.post("/predict", response_model=PredictionResponse)
-def predict_eeg(request: EEGSampleRequest):
+async def predict_eeg(request: EEGSampleRequest):
     try:
-        eeg_data = np.array(request.eeg)
-        return run_inference(eeg_data, request.sampling_rate)
+        # Converting the nested JSON lists is O(samples) Python work; keep it off the event loop
+        eeg_data = await run_in_threadpool(np.array, request.eeg)
+        return await predict_array(eeg_data, request.sampling_rate)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/predict_file", response_model=PredictionResponse)
-async def predict_file(file: UploadFile = File(...)):
+@app.post(
+    "/predict_binary",
+    response_model=PredictionResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+        "application/x-npy": {"schema": {"type": "string", "format": "binary"}},
+    }}},
+)
+async def predict_eeg_binary(request: Request, sampling_rate: int = 256,
+                             x_eeg_shape: Optional[str] = Header(None)):
+    """
+    Same as /predict for a binary body: raw little-endian float32 [samples, channels]
+    (shape in the X-EEG-Shape header, "samples,channels"; 16 channels if omitted)
+    or a .npy file. The body is viewed with np.frombuffer, with no per-value parsing.
+    """
     try:
-        contents = await file.read()
-        filename = file.filename.lower()
+        eeg_data = parse_binary_eeg(await request.body(), request.headers.get("content-type"), x_eeg_shape)
+        return await predict_array(eeg_data, sampling_rate)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if filename.endswith(".edf"):
-            eeg_data = parse_edf(contents)
-            # EDFs usually have their own fs, but parse_edf resamples to 256
-            fs = 256
-        elif filename.endswith(".csv"):
-            # Decode bytes to string for CSV
-            eeg_data = parse_csv(contents.decode('utf-8'))
-            fs = 256 # Assumption for CSVs unless specified otherwise
-        else:
+@app.post("/predict_file", response_model=Union[WindowedPredictionResponse, PredictionResponse])
+async def predict_file(file: UploadFile = File(...), windowed: bool = False):
+    try:
+        filename = file.filename.lower()
+        file_type = os.path.splitext(filename)[1]
+        if file_type not in (".edf", ".csv"):
             raise HTTPException(status_code=400, detail="Unsupported file format. Use .csv or .edf")
 
-        return run_inference(eeg_data, fs)
+        # EDFs usually have their own fs, but parse_edf resamples to 256
+        fs = 256 # Assumption for CSVs unless specified otherwise
+        response_type = WindowedPredictionResponse if windowed else PredictionResponse
+
+        check_model_loaded()
+        served = eeg_registry.active
+        cache_key = None
+        if result_cache is not None:
+            cache_key = result_cache.key(await upload_digest(file), served.version, file_type=file_type, fs=fs, windowed=windowed,
+                                         window_size_sec=4 if windowed else None, step_size_sec=2 if windowed else None,
+                                         feature_set=served.feature_set)
+            cached = await io_pool.run(result_cache.get, cache_key)
+            if cached is not None:
+                return response_type(**cached)
+
+        # Decoding and feature extraction run in one process-pool round trip, off the
+        # event loop; only the upload's bytes and the feature matrix cross the pool
+        extract = edf_features if file_type == ".edf" else csv_features
+        features = await cpu_pool.run(extract, await file.read(), fs, windowed, feature_set=served.feature_set)
+
+        # Scored by the version the features were extracted for, even if a hot-swap
+        # to another feature set landed meanwhile; the cache key names that version too
+        response = await run_in_threadpool(score_windows if windowed else score_segment, features, served=served)
+
+        if cache_key is not None:
+            await io_pool.run(result_cache.put, cache_key, response.model_dump())
+        return response
 
     except HTTPException as he:
         raise he
@@ -199,10 +393,7 @@ async def predict_file(file: UploadFile = File(...)):
 
 
 @app.post("/api/eeg/save_result")
-async def save_eeg_result(
-    request: SaveEEGResultRequest,
-    db: Session = Depends(get_db)
-):
+async def save_eeg_result(request: SaveEEGResultRequest):
     """Save EEG test result to database"""
     try:
         from backend.app.models.db_models import EEGTestResult
@@ -232,11 +423,9 @@ async def save_eeg_result(
             completed=True
         )
 
-        db.add(eeg_result)
-        db.commit()
-        db.refresh(eeg_result)
+        # Blocking database round trip on the I/O pool
+        await io_pool.run(in_session, add_and_commit, eeg_result)
 
         return {"success": True, "id": eeg_result.id}
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
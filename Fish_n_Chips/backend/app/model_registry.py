@@ -0,0 +1,350 @@
+"""
+Versioned model registry with hot-swap and shadow scoring.
+
+Each registry (EEG, speech) holds any number of loaded model versions and
+serves one of them. Versions live in models/registry/<name>/<version>.joblib;
+the ACTIVE file in that directory names the version served at startup. If
+there is no registry directory, the legacy single-file model (e.g.
+models/eeg_best_model.joblib) is served under a version derived from its
+content hash, so model_version in responses always identifies the model
+that produced them.
+
+Loading uses joblib's mmap_mode, so numpy arrays in uncompressed dumps are
+memory-mapped and processes forked after loading share those pages.
+sklearn trees copy their nodes on unpickling, so the compiled predictor
+(see tree_inference) is also written next to the model file once and
+memory-mapped from there; that is the copy used for scoring. A new version is
+warmed up (compiled and run once) before it is swapped in with a single
+reference assignment, so requests in flight finish on the version they
+started with.
+
+A candidate version can shadow the active one: every scored batch is also
+scored by the candidate on a background thread, off the request path.
+Agreement statistics are kept for comparison before promoting it.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from .feature_extraction import DEFAULT_FEATURE_SET, feature_set_for
+from .tree_inference import CompiledTreeEnsemble, compile_model
+
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join("models", "registry"))
+ACTIVE_FILE = "ACTIVE"
+MODEL_SUFFIX = ".joblib"
+MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r") or None
+
+# Shadow jobs beyond this many pending are skipped rather than queued
+SHADOW_MAX_PENDING = 64
+
+def _digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@dataclass
+class ModelVersion:
+    name: str
+    version: str
+    path: str
+    fingerprint: str
+    model: Any
+    predictor: Any
+    loaded_at: float
+    warmup_ms: float
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.predictor.classes_
+
+    @property
+    def feature_set(self) -> int:
+        """
+        Feature-set version the model was trained on: its feature_set_ attribute
+        if the training code set one, otherwise inferred from n_features_in_.
+        """
+        declared = getattr(self.model, "feature_set_", None)
+        if declared is not None:
+            return int(declared)
+        n_features = getattr(self.predictor, "n_features_in_", None)
+        return feature_set_for(n_features) if n_features is not None else DEFAULT_FEATURE_SET
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return self.predictor.predict_proba(features)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "fingerprint": self.fingerprint[:16],
+            "model_type": type(self.model).__name__,
+            "compiled": self.predictor is not self.model,
+            "feature_set": self.feature_set,
+            "loaded_at": self.loaded_at,
+            "warmup_ms": round(self.warmup_ms, 3),
+        }
+
+@dataclass
+class ShadowStats:
+    version: str
+    compared: int = 0
+    agreed: int = 0
+    total_abs_diff: float = 0.0
+    max_abs_diff: float = 0.0
+    skipped: int = 0
+    errors: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, active: np.ndarray, candidate: np.ndarray, active_classes, candidate_classes):
+        diff = np.abs(candidate[:, -1] - active[:, -1])
+        agreed = active_classes[np.argmax(active, axis=1)] == candidate_classes[np.argmax(candidate, axis=1)]
+        with self.lock:
+            self.compared += len(diff)
+            self.agreed += int(agreed.sum())
+            self.total_abs_diff += float(diff.sum())
+            self.max_abs_diff = max(self.max_abs_diff, float(diff.max()))
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "version": self.version,
+                "compared": self.compared,
+                "agreement": round(self.agreed / self.compared, 4) if self.compared else None,
+                "mean_abs_prob_diff": round(self.total_abs_diff / self.compared, 6) if self.compared else None,
+                "max_abs_prob_diff": round(self.max_abs_diff, 6),
+                "skipped": self.skipped,
+                "errors": self.errors,
+            }
+
+class ModelRegistry:
+    """Loaded versions of one model, the one being served, and an optional shadow."""
+
+    def __init__(self, name: str, legacy_path: Optional[str] = None, registry_dir: str = REGISTRY_DIR):
+        self.name = name
+        self.legacy_path = legacy_path
+        self.directory = os.path.join(registry_dir, name)
+        self.versions: Dict[str, ModelVersion] = {}
+        self._active: Optional[ModelVersion] = None
+        self._shadow: Optional[ModelVersion] = None
+        self._shadow_stats: Optional[ShadowStats] = None
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-shadow")
+        self._shadow_pending = 0
+        self._shadow_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._ensure_lock = threading.Lock()
+        # (mtime_ns, size, sha256) of the legacy file, so listing versions does not re-hash it
+        self._legacy_digest: Optional[Tuple[int, int, str]] = None
+        self._listeners: List[Callable[[ModelVersion], None]] = []
+
+    # ---- discovery and loading ----
+
+    def available(self) -> Dict[str, str]:
+        """version -> path of every model file this registry can serve."""
+        found = {}
+        if os.path.isdir(self.directory):
+            for filename in sorted(os.listdir(self.directory)):
+                if filename.endswith(MODEL_SUFFIX):
+                    found[filename[:-len(MODEL_SUFFIX)]] = os.path.join(self.directory, filename)
+        if not found and self.legacy_path and os.path.exists(self.legacy_path):
+            found[self._legacy_version()] = self.legacy_path
+        return found
+
+    def _legacy_version(self) -> str:
+        stem = os.path.splitext(os.path.basename(self.legacy_path))[0]
+        stat = os.stat(self.legacy_path)
+        cached = self._legacy_digest
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            cached = (stat.st_mtime_ns, stat.st_size, _digest(self.legacy_path))
+            self._legacy_digest = cached
+        return f"{stem}@{cached[2][:12]}"
+
+    def default_version(self) -> Optional[str]:
+        """The ACTIVE version if set, otherwise the newest model file."""
+        available = self.available()
+        active_file = os.path.join(self.directory, ACTIVE_FILE)
+        if os.path.exists(active_file):
+            with open(active_file) as f:
+                version = f.read().strip()
+            if version in available:
+                return version
+        if not available:
+            return None
+        return max(available, key=lambda v: os.path.getmtime(available[v]))
+
+    def load(self, version: str) -> ModelVersion:
+        """Load, compile and warm up a version (once); does not change what is served."""
+        with self._load_lock:
+            if version in self.versions:
+                return self.versions[version]
+
+            path = self.available().get(version)
+            if path is None:
+                raise KeyError(f"Unknown {self.name} model version '{version}'")
+
+            fingerprint = _digest(path)
+            model = joblib.load(path, mmap_mode=MMAP_MODE)
+            predictor = self._load_predictor(path, fingerprint, model)
+            warmup_ms = self._warm_up(model, predictor)
+            loaded = ModelVersion(self.name, version, path, fingerprint, model, predictor, time.time(), warmup_ms)
+            self.versions[version] = loaded
+            return loaded
+
+    @staticmethod
+    def _load_predictor(path: str, fingerprint: str, model):
+        """Compiled predictor for model, memory-mapped from a cache file next to it when possible."""
+        compiled_path = f"{os.path.splitext(path)[0]}.{fingerprint[:16]}.compiled"
+        if os.path.exists(compiled_path):
+            try:
+                return joblib.load(compiled_path, mmap_mode=MMAP_MODE)
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable compiled model {compiled_path}: {e}")
+
+        predictor = compile_model(model)
+        if not isinstance(predictor, CompiledTreeEnsemble):
+            return predictor
+        try:
+            tmp_path = f"{compiled_path}.{os.getpid()}.tmp"
+            joblib.dump(predictor, tmp_path)
+            os.replace(tmp_path, compiled_path)
+            return joblib.load(compiled_path, mmap_mode=MMAP_MODE)
+        except OSError:
+            # Read-only model directory: serve the in-process copy
+            return predictor
+
+    @staticmethod
+    def _warm_up(model, predictor) -> float:
+        """Run a few rows through the model so the first real request pays no first-call costs."""
+        n_features = getattr(predictor, "n_features_in_", None)
+        if n_features is None:
+            return 0.0
+        rows = np.zeros((4, n_features))
+        started = time.perf_counter()
+        predictor.predict_proba(rows)
+        predictor.predict_proba(rows[:1])
+        if predictor is not model:
+            model.predict_proba(rows[:1])
+        return (time.perf_counter() - started) * 1000
+
+    def ensure_loaded(self) -> Optional[ModelVersion]:
+        """Activate the default version if nothing is served yet (lazy loading)."""
+        if self._active is None:
+            # Concurrent first requests load the model once
+            with self._ensure_lock:
+                if self._active is None:
+                    version = self.default_version()
+                    if version is not None:
+                        self.activate(version)
+        return self._active
+
+    # ---- serving ----
+
+    @property
+    def active(self) -> Optional[ModelVersion]:
+        return self._active
+
+    def add_listener(self, listener: Callable[[ModelVersion], None]):
+        """Called with the new version after every swap."""
+        self._listeners.append(listener)
+
+    def activate(self, version: str, persist: bool = False) -> ModelVersion:
+        """Load and warm up version, then swap it in atomically."""
+        loaded = self.load(version)
+        self._active = loaded
+        if self._shadow is not None and self._shadow.version == version:
+            self.clear_shadow()
+        if persist:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = os.path.join(self.directory, ACTIVE_FILE + ".tmp")
+            with open(tmp_path, "w") as f:
+                f.write(version)
+            os.replace(tmp_path, os.path.join(self.directory, ACTIVE_FILE))
+        for listener in self._listeners:
+            listener(loaded)
+        return loaded
+
+    def set_shadow(self, version: str) -> ModelVersion:
+        candidate = self.load(version)
+        self._shadow_stats = ShadowStats(version)
+        self._shadow = candidate
+        return candidate
+
+    def clear_shadow(self):
+        self._shadow = None
+        self._shadow_stats = None
+
+    def score(self, features: np.ndarray, version: Optional[ModelVersion] = None) -> Tuple[np.ndarray, ModelVersion]:
+        """
+        Probabilities from the active version (or from `version`, when the caller
+        pinned one, e.g. because its features were extracted for that version's
+        feature set), and the version that produced them.
+        If a shadow is set, it scores the same rows from the active version in the background.
+        """
+        active = self._active
+        served = version or active
+        if served is None:
+            raise RuntimeError(f"No {self.name} model loaded")
+        proba = served.predict_proba(features)
+        if self._shadow is not None and served is active:
+            self._submit_shadow(features, proba, served)
+        return proba, served
+
+    def _submit_shadow(self, features: np.ndarray, proba: np.ndarray, active: ModelVersion):
+        shadow, stats = self._shadow, self._shadow_stats
+        if shadow is None or stats is None:
+            return
+        with self._shadow_lock:
+            if self._shadow_pending >= SHADOW_MAX_PENDING:
+                with stats.lock:
+                    stats.skipped += 1
+                return
+            self._shadow_pending += 1
+
+        def run():
+            try:
+                stats.record(proba, shadow.predict_proba(features), active.classes_, shadow.classes_)
+            except Exception:
+                with stats.lock:
+                    stats.errors += 1
+            finally:
+                with self._shadow_lock:
+                    self._shadow_pending -= 1
+
+        self._shadow_pool.submit(run)
+
+    # ---- publishing ----
+
+    def publish(self, model, version: str, activate: bool = False) -> str:
+        """
+        Write a model as a new version (uncompressed, so it can be memory-mapped).
+        Returns the path; optionally makes it the active version.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, version + MODEL_SUFFIX)
+        tmp_path = path + ".tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+        if activate:
+            self.activate(version, persist=True)
+        return path
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "active": self._active.describe() if self._active else None,
+            "loaded": sorted(self.versions),
+            "available": sorted(self.available()),
+            "shadow": self._shadow_stats.as_dict() if self._shadow_stats else None,
+        }
+
+eeg_registry = ModelRegistry("eeg", legacy_path=os.path.join("models", "eeg_best_model.joblib"))
+speech_registry = ModelRegistry("speech", legacy_path=os.path.join("models", "speech_ml_model.joblib"))
+REGISTRIES = {registry.name: registry for registry in (eeg_registry, speech_registry)}
@@ -0,0 +1,102 @@
+"""
+Rational-ratio polyphase resampling for EEG recordings.
+
+Replaces the FFT-based raw.resample over the whole recording: the rate
+change src -> dst is reduced to up/down integers and applied with a
+polyphase FIR filter (the same Kaiser-windowed design scipy.signal.resample_poly
+uses). The filter design is cached per (src, dst) pair.
+
+StreamingResampler applies the same filter chunk by chunk, carrying the
+filter history between chunks, so it composes with chunked parsing and its
+concatenated output equals resample() on the whole signal.
+"""
+from fractions import Fraction
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+from scipy.signal import firwin, resample_poly, upfirdn
+
+def rational_ratio(src: float, dst: float) -> Tuple[int, int]:
+    """(up, down) in lowest terms with dst / src == up / down."""
+    ratio = Fraction(dst).limit_denominator(10_000) / Fraction(src).limit_denominator(10_000)
+    return ratio.numerator, ratio.denominator
+
+@lru_cache(maxsize=32)
+def design_filter(src: float, dst: float) -> Tuple[int, int, np.ndarray]:
+    """
+    (up, down, taps) for resampling src -> dst.
+    Same low-pass design as resample_poly's default: cutoff at the lower Nyquist,
+    10 zero crossings per side, Kaiser window with beta 5.
+    """
+    up, down = rational_ratio(src, dst)
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    taps.setflags(write=False)
+    return up, down, taps
+
+def resample(data: np.ndarray, src: float, dst: float, axis: int = 0) -> np.ndarray:
+    """Resample a whole array along axis with the cached polyphase filter."""
+    if src == dst:
+        return data
+    up, down, taps = design_filter(src, dst)
+    return resample_poly(data, up, down, axis=axis, window=taps)
+
+class StreamingResampler:
+    """
+    Chunk-wise polyphase resampler for [n_samples, n_channels] blocks.
+
+    push() returns every output sample that is fully determined by the input seen
+    so far; flush() returns the tail (treating the signal as zero past the end,
+    like resample_poly). Each chunk is filtered together with the short history
+    the filter still needs, so work per chunk is proportional to its length.
+    """
+
+    def __init__(self, src: float, dst: float, n_channels: int):
+        up, down, taps = design_filter(src, dst)
+        self.up, self.down, self.n_channels = up, down, n_channels
+
+        # Filter alignment identical to resample_poly, so outputs line up sample for sample
+        half_len = (len(taps) - 1) // 2
+        n_pre_pad = down - half_len % down
+        self._n_pre_remove = (half_len + n_pre_pad) // down
+        self._h = np.concatenate([np.zeros(n_pre_pad), taps * up])
+
+        # Input history; _history[k] is input sample _history_start + k. The start is
+        # kept at a multiple of down so upfirdn's output grid matches the global one.
+        self._history = np.empty((0, n_channels))
+        self._history_start = 0
+        self.n_in = 0
+        self.n_out = 0
+
+    def _emit(self, last: int) -> np.ndarray:
+        """Outputs n_out..last, filtered from the current history."""
+        if last < self.n_out:
+            return np.empty((0, self.n_channels))
+
+        # Output j sits at (j + n_pre_remove) * down on the upsampled grid
+        offset = self._n_pre_remove - self._history_start * self.up // self.down
+        filtered = upfirdn(self._h, self._history, self.up, self.down, axis=0)
+        out = filtered[self.n_out + offset:last + 1 + offset]
+        self.n_out = last + 1
+
+        # Keep only the history the next output still needs
+        next_n = (self.n_out + self._n_pre_remove) * self.down
+        needed = -(-(next_n - len(self._h) + 1) // self.up)
+        start = max(self._history_start, needed // self.down * self.down)
+        self._history = self._history[start - self._history_start:]
+        self._history_start = start
+        return out
+
+    def push(self, chunk: np.ndarray) -> np.ndarray:
+        chunk = np.asarray(chunk, dtype=np.float64)
+        self._history = np.concatenate([self._history, chunk])
+        self.n_in += len(chunk)
+        # Output j needs inputs up to (j + n_pre_remove) * down // up
+        return self._emit((self.n_in * self.up - 1) // self.down - self._n_pre_remove)
+
+    def flush(self) -> np.ndarray:
+        """Remaining outputs, up to ceil(n_in * up / down) in total."""
+        total = -(-self.n_in * self.up // self.down)
+        return self._emit(total - 1)
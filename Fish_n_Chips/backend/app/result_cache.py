@@ -0,0 +1,199 @@
+"""
+Content-addressed cache of /predict_file results.
+
+Re-uploading the same EDF/CSV (page reloads, comparing users) returns the
+stored response instead of parsing and scoring the file again. Entries are
+keyed by the sha256 of the upload together with the model fingerprint and
+the request parameters (file type, sampling rate, windowing). A change to
+any of them gives a new key.
+
+Two tiers:
+    memory  LRU of the most recent responses (EEG_RESULT_CACHE_ENTRIES)
+    disk    one JSON file per entry under EEG_RESULT_CACHE_DIR, bounded to
+            EEG_RESULT_CACHE_DISK_MB; least recently used files are evicted first
+
+The disk tier's sizes and recency are tracked in memory: the cache
+directory is scanned once, on first use, and puts, hits and evictions keep
+the running byte and entry counts. Files written by other processes after
+that scan are not counted.
+
+Disk entries live in a directory per model fingerprint. When lifespan loads
+a different model, set_model() clears the memory tier and deletes the other
+fingerprints' directories, so stale predictions are never served.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+RESULT_CACHE_ENABLED = os.getenv("EEG_RESULT_CACHE", "1").lower() in ("1", "true", "yes")
+RESULT_CACHE_DIR = os.getenv("EEG_RESULT_CACHE_DIR", os.path.join("models", "result_cache"))
+RESULT_CACHE_ENTRIES = int(os.getenv("EEG_RESULT_CACHE_ENTRIES", 256))
+RESULT_CACHE_DISK_MB = float(os.getenv("EEG_RESULT_CACHE_DISK_MB", 256))
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def file_digest(path: str) -> str:
+    """sha256 of a file on disk, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ResultCache:
+    """Two-tier (memory LRU + size-bounded disk) cache of prediction responses."""
+
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, max_entries: int = RESULT_CACHE_ENTRIES,
+                 max_disk_bytes: int = int(RESULT_CACHE_DISK_MB * 1024 * 1024)):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.model_fingerprint = ""
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # path -> size of every disk entry, least recently used first (None until scanned)
+        self._disk: "Optional[OrderedDict[str, int]]" = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    @staticmethod
+    def key(content_hash: str, model_version: str, **params) -> str:
+        """Cache key for one upload under one model version and set of request parameters."""
+        described = json.dumps({"content": content_hash, "model": model_version, "params": params}, sort_keys=True)
+        return hashlib.sha256(described.encode()).hexdigest()
+
+    def set_model(self, fingerprint: str):
+        """Switch to a (possibly new) model; entries for any other model are dropped."""
+        with self._lock:
+            if fingerprint != self.model_fingerprint:
+                self._memory.clear()
+            self.model_fingerprint = fingerprint
+            if self._disk is not None:
+                kept = os.path.join(self.cache_dir, fingerprint) + os.sep
+                for path in [p for p in self._disk if not p.startswith(kept)]:
+                    self._disk_bytes -= self._disk.pop(path)
+
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name != fingerprint:
+                    shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def _model_dir(self) -> str:
+        return os.path.join(self.cache_dir, self.model_fingerprint or "unversioned")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._model_dir(), key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            os.utime(path) # Mark as recently used for eviction
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits["disk"] += 1
+        self._touch_disk(path)
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        self._remember(key, value)
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Atomic write so a concurrent reader never sees a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(value, f)
+            size = f.tell()
+        os.replace(tmp_path, path)
+        self._touch_disk(path, size)
+        self._evict_disk()
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _scan_disk(self) -> "OrderedDict[str, int]":
+        """The disk index, built from the cache directory on first use. Call with the lock held."""
+        if self._disk is None:
+            entries = []
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith(".json"):
+                        path = os.path.join(root, name)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, path))
+            # Least recently used first
+            self._disk = OrderedDict((path, size) for _, size, path in sorted(entries))
+            self._disk_bytes = sum(self._disk.values())
+        return self._disk
+
+    def _touch_disk(self, path: str, size: Optional[int] = None):
+        """Mark a disk entry as most recently used; with size, (re)count it."""
+        with self._lock:
+            disk = self._scan_disk()
+            if size is not None:
+                self._disk_bytes += size - disk.get(path, 0)
+                disk[path] = size
+            if path in disk:
+                disk.move_to_end(path)
+
+    def _evict_disk(self):
+        victims = []
+        with self._lock:
+            disk = self._scan_disk()
+            while self._disk_bytes > self.max_disk_bytes and disk:
+                path, size = disk.popitem(last=False)
+                self._disk_bytes -= size
+                victims.append(path)
+        for path in victims:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk = self._scan_disk()
+            return {
+                "model_fingerprint": self.model_fingerprint,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(disk),
+                "disk_bytes": self._disk_bytes,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+            }
+
+async def upload_digest(file) -> str:
+    """sha256 of an UploadFile's content; the file is rewound afterwards for parsing."""
+    digest = hashlib.sha256()
+    while True:
+        chunk = await file.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest()
@@ -0,0 +1,68 @@
+"""
+API endpoints for the model registry: list versions, hot-swap the served
+version and shadow-score a candidate on live traffic.
+
+Changing what is served needs the X-Admin-Token header to match
+MODEL_ADMIN_TOKEN. Without MODEL_ADMIN_TOKEN those endpoints are disabled
+(403); listing stays open.
+"""
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from backend.app.model_registry import REGISTRIES, ModelRegistry
+
+router = APIRouter(
+    prefix="/api/models",
+    tags=["models"]
+)
+
+ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN", "")
+
+def require_admin(x_admin_token: str = Header("")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model administration is disabled. Set MODEL_ADMIN_TOKEN to enable it")
+    if not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+
+def get_registry(name: str) -> ModelRegistry:
+    if name not in REGISTRIES:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{name}'. Use one of {list(REGISTRIES)}")
+    return REGISTRIES[name]
+
+@router.get("")
+async def list_models():
+    """Served, loaded and available versions of every model, with shadow stats"""
+    return {name: await run_in_threadpool(registry.status) for name, registry in REGISTRIES.items()}
+
+@router.post("/{name}/activate", dependencies=[Depends(require_admin)])
+async def activate_model(name: str, version: str, persist: bool = False):
+    """
+    Load and warm up a version, then swap it in. With persist=true it also
+    becomes the version served after a restart.
+    """
+    registry = get_registry(name)
+    try:
+        # Loading and warm-up happen off the event loop; the swap itself is instant
+        served = await run_in_threadpool(registry.activate, version, persist)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"name": name, "active": served.describe()}
+
+@router.post("/{name}/shadow", dependencies=[Depends(require_admin)])
+async def shadow_model(name: str, version: str):
+    """Score live traffic with a candidate version too, without serving its results"""
+    registry = get_registry(name)
+    try:
+        candidate = await run_in_threadpool(registry.set_shadow, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"name": name, "shadow": candidate.describe()}
+
+@router.delete("/{name}/shadow", dependencies=[Depends(require_admin)])
+async def clear_shadow(name: str):
+    registry = get_registry(name)
+    registry.clear_shadow()
+    return {"name": name, "shadow": None}
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from typing import Any, Dict, Optional
 from sqlalchemy.orm import Session
 import uuid
 import shutil
@@ -14,14 +14,18 @@ from backend.app.models.schemas import (
     AudiometryRequest, AudiometryResponse, SpeechResultsResponse
 )
 
+from backend.app.services.speech import whisper_service
 from backend.app.services.speech.whisper_service import transcribe_with_timestamps
-from backend.app.services.speech.vad_service import detect_speech_start
-from backend.app.services.speech.feature_extractor import extract_acoustic_features, extract_linguistic_features
+from backend.app.services.speech.feature_extractor import extract_linguistic_features
 from backend.app.services.speech.pause_analyzer import analyze_pauses
 from backend.app.services.speech.audiometry_service import adaptive_threshold_test
 from backend.app.services.speech.speech_scorer import calculate_ml_risk_score
 from backend.app.utils.audio_utils import convert_audio_format
-from backend.app.database import get_db
+from backend.app.services.speech.audio_pipeline import analyze_audio
+from backend.app.services.speech.stimuli import STIMULUS_SENTENCES
+from backend.app.database import add_and_commit, in_session
+from backend.app.execution import cpu_pool, io_pool
+from backend.app.stage_graph import StageGraph
 from backend.app.models.db_models import SpeechTestResult, SentenceRecording
 
 router = APIRouter(
@@ -29,20 +33,25 @@ router = APIRouter(
     tags=["speech"]
 )
 
+class TimedSpeechAnalysisResponse(SpeechAnalysisResponse):
+    debug: Optional[Dict[str, Any]] = None  # StageGraph timings and how the reaction time was measured
+
+# "vad": reaction time from server-side VAD on the recording, for clients that send
+# recording_offset_ms (older clients don't, and keep their speech_start_timestamp);
+# "client": always trust speech_start_timestamp
+REACTION_TIME_SOURCE = os.getenv("SPEECH_REACTION_TIME_SOURCE", "vad")
+
 # In-memory session store (replace with DB in production)
 sessions = {}
 
-STIMULUS_SENTENCES = [
-    "There sits an old man",
-    "The cat is on the mat",
-    "I went to the store yesterday",
-    "The quick brown fox jumps",
-    "She sells seashells by the seashore",
-    "Today is a beautiful day"
-]
+def _save_upload(upload_file) -> str:
+    """Copy an upload into a temp .wav file and return its path."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        shutil.copyfileobj(upload_file, tmp)
+        return tmp.name
 
 @router.post("/start-test", response_model=SpeechTestResponse)
-async def start_test(request: SpeechTestRequest, db: Session = Depends(get_db)):
+async def start_test(request: SpeechTestRequest):
     session_id = str(uuid.uuid4())
     sessions[session_id] = {
         "user_id": request.user_id,
@@ -57,8 +66,7 @@ async def start_test(request: SpeechTestRequest, db: Session = Depends(get_db)):
         test_type=request.test_type,
         user_consented=True  # Assuming consent for now
     )
-    db.add(db_test)
-    db.commit()
+    await io_pool.run(in_session, add_and_commit, db_test)
 
     return SpeechTestResponse(
         session_id=session_id,
@@ -66,71 +74,76 @@ async def start_test(request: SpeechTestRequest, db: Session = Depends(get_db)):
         initial_volume=0.3
     )
 
-@router.post("/analyze", response_model=SpeechAnalysisResponse)
+@router.post("/analyze", response_model=TimedSpeechAnalysisResponse)
 async def analyze_speech(
     session_id: str = Form(...),
     stimulus_sentence: str = Form(...),
     audio_end_timestamp: float = Form(...), # Client-side timestamp when recording stopped
     speech_start_timestamp: float = Form(...), # Client-side timestamp when user started speaking (optional fallback)
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    recording_offset_ms: Optional[float] = Form(None), # Time from the end of the stimulus to the start of the recording
+    file: UploadFile = File(...)
 ):
+    # Blocking I/O (temp file, Whisper API, database) runs on io_pool and the
+    # librosa/spaCy stages on cpu_pool, so the event loop keeps serving other requests
+
     # 1. Save temp file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
+    tmp_path = await io_pool.run(_save_upload, file.file)
 
     try:
+        # Transcription and the audio stages don't depend on each other, so the
+        # graph starts both at once and joins them only where a stage needs both
+
+        def reaction_time_stage(audio):
+            # 3. Calculate Reaction Time
+            # VAD onset in the recording (found by analyze_audio on its 16 kHz PCM),
+            # shifted by the gap between the end of the stimulus and the start of
+            # the recording. Uses the client's value when the client did not send
+            # that gap (the onset alone is not a reaction time) or no speech is found.
+            onset_ms = audio["speech_onset_ms"]
+            if REACTION_TIME_SOURCE == "vad" and recording_offset_ms is not None and onset_ms >= 0:
+                return {"reaction_time_ms": onset_ms + recording_offset_ms, "source": "vad", "vad_onset_ms": onset_ms}
+            return {"reaction_time_ms": speech_start_timestamp, "source": "client", "vad_onset_ms": onset_ms}
+
+        def accuracy_stage(transcribe):
+            # 4. Accuracy (Levenshtein)
+            # Normalize strings
+            ref = stimulus_sentence.lower().strip(".,!?")
+            hyp = transcribe["text"].lower().strip(".,!?")
+            return ratio(ref, hyp) * 100
+
+        def scoring_stage(audio, accuracy, reaction_time):
+            # 7. ML-Based Scoring (with improved pause analysis)
+            # On an io_pool thread: the first call loads the model, and it must be the
+            # speech_registry of this process (a cpu_pool worker would miss hot-swaps)
+            return io_pool.run(
+                calculate_ml_risk_score,
+                reaction_time_ms=reaction_time["reaction_time_ms"],
+                speech_rate_wpm=audio["acoustic_features"].get("speech_rate_wpm", 120),
+                pause_analysis=audio["pause_analysis"],  # Now using audio-based pauses!
+                word_accuracy=accuracy
+            )
+
+        graph = StageGraph()
         # 2. Transcribe (Whisper)
-        transcription_result = transcribe_with_timestamps(tmp_path)
-        transcription_text = transcription_result["text"]
-        word_timestamps = transcription_result["words"]
-
-        # 3. Calculate Reaction Time
-        # Option A: Use VAD on server
-        with open(tmp_path, "rb") as f:
-            audio_bytes = f.read()
-
-        # We need raw PCM for VAD, but file is likely WAV/WebM.
-        # For simplicity, let's rely on client-side timestamps or VAD if format allows.
-        # Assuming client sends a rough timestamp, we can refine it or just use it.
-        # Let's use the client provided timestamp for now as VAD on compressed web audio is tricky without conversion.
-        # Ideally: convert to PCM -> VAD.
-
-        # Placeholder for VAD logic if we had PCM
-        # vad_start = detect_speech_start(pcm_bytes, 16000)
-
-        # Reaction time = (Time user started speaking) - (Time audio stimulus ended)
-        # This requires client to send both.
-        # Let's assume the client sends the calculated reaction time or we calculate it here.
-        # Actually, the prompt says "detect_speech_start" is in VAD service.
-        # Let's assume we use the client's speech_start_timestamp for now to be safe,
-        # as converting WebM/WAV to 16k mono PCM for webrtcvad requires ffmpeg/pydub which we have.
-
-        # Simple fallback:
-        reaction_time_ms = speech_start_timestamp # Client calculated or passed raw
-
-        # 4. Accuracy (Levenshtein)
-        # Normalize strings
-        ref = stimulus_sentence.lower().strip(".,!?")
-        hyp = transcription_text.lower().strip(".,!?")
-        accuracy = ratio(ref, hyp) * 100
-
-        # 5. Features
-        acoustic_features = extract_acoustic_features(tmp_path)
-        linguistic_features = extract_linguistic_features(transcription_text)
-
-        # 6. Pauses - Use AUDIO-BASED detection (more accurate than Whisper timestamps)
-        from backend.app.services.speech.pause_analyzer import detect_pauses_from_audio
-        pause_analysis = detect_pauses_from_audio(tmp_path, min_silence_duration=0.3)
-
-        # 7. ML-Based Scoring (with improved pause analysis)
-        scores = calculate_ml_risk_score(
-            reaction_time_ms=reaction_time_ms,
-            speech_rate_wpm=acoustic_features.get("speech_rate_wpm", 120),
-            pause_analysis=pause_analysis,  # Now using audio-based pauses!
-            word_accuracy=accuracy
-        )
+        graph.add("transcribe", lambda: io_pool.run(transcribe_with_timestamps, tmp_path))
+        # 5. Features + 6. Pauses - Use AUDIO-BASED detection (more accurate than Whisper timestamps)
+        # Both audio stages run in one worker on a single decode of the upload
+        graph.add("audio", lambda: cpu_pool.run(analyze_audio, tmp_path, min_silence_duration=0.3))
+        graph.add("reaction_time", reaction_time_stage, "audio")
+        graph.add("accuracy", accuracy_stage, "transcribe")
+        graph.add("linguistic",
+                  lambda transcribe: cpu_pool.run(extract_linguistic_features, transcribe["text"]),
+                  "transcribe")
+        graph.add("scoring", scoring_stage, "audio", "accuracy", "reaction_time")
+        stages = await graph.run()
+
+        transcription_text = stages["transcribe"]["text"]
+        accuracy = stages["accuracy"]
+        acoustic_features = stages["audio"]["acoustic_features"]
+        pause_analysis = stages["audio"]["pause_analysis"]
+        linguistic_features = stages["linguistic"]
+        scores = stages["scoring"]
+        reaction_time_ms = stages["reaction_time"]["reaction_time_ms"]
 
         # Store result in memory
         if session_id in sessions:
@@ -161,11 +174,10 @@ async def analyze_speech(
             risk_score=scores["overall_risk"],
             risk_level=scores["risk_level"]
         )
-        db.add(db_recording)
-        db.commit()
+        await io_pool.run(in_session, add_and_commit, db_recording)
         print(f"✅ Saved sentence {sentence_index + 1} to database")
 
-        return SpeechAnalysisResponse(
+        return TimedSpeechAnalysisResponse(
             reaction_time_ms=reaction_time_ms,
             transcription=transcription_text,
             word_accuracy=accuracy,
@@ -183,7 +195,8 @@ async def analyze_speech(
             features=SpeechFeatures(
                 acoustic_features=acoustic_features,
                 linguistic_features=linguistic_features
-            )
+            ),
+            debug={**graph.debug(), "reaction_time": stages["reaction_time"]}
         )
 
     finally:
@@ -201,8 +214,17 @@ async def audiometry_test(request: AudiometryRequest):
     )
     return AudiometryResponse(**result)
 
+def _save_final_results(db: Session, session_id: str, **fields):
+    """Set fields on the session's SpeechTestResult row, if there is one. Blocking; run via in_session."""
+    db_test = db.query(SpeechTestResult).filter(SpeechTestResult.session_id == session_id).first()
+    if db_test:
+        for name, value in fields.items():
+            setattr(db_test, name, value)
+        db.commit()
+        print(f"✅ Saved final results for session {session_id}")
+
 @router.get("/results/{session_id}", response_model=SpeechResultsResponse)
-async def get_results(session_id: str, db: Session = Depends(get_db)):
+async def get_results(session_id: str):
     print(f"🔍 Looking for session: {session_id}")
     print(f"📋 Available sessions: {list(sessions.keys())}")
 
@@ -247,17 +269,16 @@ async def get_results(session_id: str, db: Session = Depends(get_db)):
         risk_level = "High"
 
     # Update database with final aggregated results
-    db_test = db.query(SpeechTestResult).filter(SpeechTestResult.session_id == session_id).first()
-    if db_test:
-        db_test.completed = True
-        db_test.overall_risk_score = avg_risk
-        db_test.risk_level = risk_level
-        db_test.reaction_time_score = avg_rt_score
-        db_test.accuracy_score = avg_acc_score
-        db_test.avg_word_accuracy = avg_accuracy
-        db_test.sentence_results = results  # Store all results as JSON
-        db.commit()
-        print(f"✅ Saved final results for session {session_id}")
+    await io_pool.run(
+        in_session, _save_final_results, session_id,
+        completed=True,
+        overall_risk_score=avg_risk,
+        risk_level=risk_level,
+        reaction_time_score=avg_rt_score,
+        accuracy_score=avg_acc_score,
+        avg_word_accuracy=avg_accuracy,
+        sentence_results=results  # Store all results as JSON
+    )
 
     return SpeechResultsResponse(
         overall_risk_score=avg_risk,
@@ -267,23 +288,25 @@ async def get_results(session_id: str, db: Session = Depends(get_db)):
         recommendations=recommendations
     )
 
+@router.get("/transcription")
+async def transcription_status():
+    """Active transcription backend and transcript cache statistics"""
+    return await io_pool.run(whisper_service.describe)
+
 # Data Export Endpoints for ML Training
 from backend.app.services.data_export import get_statistics, export_to_csv, export_detailed_json
 
 @router.get("/data/statistics")
-async def data_statistics(db: Session = Depends(get_db)):
+async def data_statistics():
     """Get statistics about collected speech test data"""
-    stats = get_statistics(db)
+    stats = await io_pool.run(in_session, get_statistics)
     return stats
 
 @router.get("/data/export/csv")
-async def export_data_csv(
-    include_unlabeled: bool = True,
-    db: Session = Depends(get_db)
-):
+async def export_data_csv(include_unlabeled: bool = True):
     """Export test data to CSV format"""
     output_path = "speech_test_data.csv"
-    count = export_to_csv(db, output_path, include_unlabeled)
+    count = await io_pool.run(in_session, export_to_csv, output_path, include_unlabeled)
     return {
         "message": f"Exported {count} test results to {output_path}",
         "file_path": output_path,
@@ -291,13 +314,10 @@ async def export_data_csv(
     }
 
 @router.get("/data/export/json")
-async def export_data_json(
-    include_unlabeled: bool = True,
-    db: Session = Depends(get_db)
-):
+async def export_data_json(include_unlabeled: bool = True):
     """Export detailed test data to JSON format"""
     output_path = "speech_test_data.json"
-    count = export_detailed_json(db, output_path, include_unlabeled)
+    count = await io_pool.run(in_session, export_detailed_json, output_path, include_unlabeled)
     return {
         "message": f"Exported {count} test results to {output_path}",
         "file_path": output_path,
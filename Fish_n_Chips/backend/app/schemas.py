@@ -11,6 +11,19 @@ class PredictionResponse(BaseModel):
     risk_level: str
     model_version: str
 
+class WindowPrediction(BaseModel):
+    start_sec: float
+    end_sec: float
+    status_class: int
+    probability: float
+
+class WindowedPredictionResponse(PredictionResponse):
+    # Aggregated over all windows: probability is the mean, max_probability the peak
+    max_probability: float
+    window_size_sec: int
+    step_size_sec: int
+    windows: List[WindowPrediction]
+
 
 class SaveEEGResultRequest(BaseModel):
     user_id: str
@@ -0,0 +1,70 @@
+"""
+Decode-once audio shared by the speech analysis stages.
+
+An AudioContext decodes a recording a single time into mono float32 at
+CANONICAL_SAMPLE_RATE (16 kHz, the rate webrtcvad accepts, so no second
+resample is needed for VAD) and lazily caches what the stages derive from
+it: 16-bit PCM for VAD, magnitude STFTs, mel spectrograms and RMS envelopes,
+keyed by their parameters. Stages take an AudioContext instead of a path,
+so a sentence is decoded once no matter how many stages look at it.
+"""
+import os
+from functools import cached_property
+from typing import Dict, Tuple, Union
+
+import librosa
+import numpy as np
+
+CANONICAL_SAMPLE_RATE = int(os.getenv("SPEECH_SAMPLE_RATE", 16000))
+
+class AudioContext:
+    """One decoded recording and the products derived from it."""
+
+    def __init__(self, y: np.ndarray, sr: int, path: str = None):
+        self.y = np.ascontiguousarray(y, dtype=np.float32)
+        self.sr = sr
+        self.path = path
+        self._stft: Dict[Tuple[int, int], np.ndarray] = {}
+        self._mel: Dict[Tuple[int, int, int], np.ndarray] = {}
+        self._rms: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_file(cls, path: str, sr: int = CANONICAL_SAMPLE_RATE) -> "AudioContext":
+        y, sr = librosa.load(path, sr=sr, mono=True, dtype=np.float32)
+        return cls(y, sr, path)
+
+    @classmethod
+    def ensure(cls, audio: Union[str, "AudioContext"]) -> "AudioContext":
+        """Stages accept either a context or a path (decoded here, for callers that have only a file)."""
+        return audio if isinstance(audio, AudioContext) else cls.from_file(audio)
+
+    @property
+    def duration(self) -> float:
+        return len(self.y) / self.sr
+
+    @cached_property
+    def pcm16(self) -> bytes:
+        """16-bit little-endian mono PCM at self.sr, as webrtcvad expects."""
+        return (np.clip(self.y, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    def stft(self, n_fft: int = 2048, hop_length: int = 512) -> np.ndarray:
+        """Magnitude STFT (librosa defaults: centered, Hann window)."""
+        key = (n_fft, hop_length)
+        if key not in self._stft:
+            self._stft[key] = np.abs(librosa.stft(self.y, n_fft=n_fft, hop_length=hop_length))
+        return self._stft[key]
+
+    def melspectrogram(self, n_fft: int = 2048, hop_length: int = 512, n_mels: int = 128) -> np.ndarray:
+        """Power mel spectrogram built on the cached STFT (same as librosa.feature.melspectrogram(y=...))."""
+        key = (n_fft, hop_length, n_mels)
+        if key not in self._mel:
+            power = self.stft(n_fft, hop_length) ** 2
+            self._mel[key] = librosa.feature.melspectrogram(S=power, sr=self.sr, n_fft=n_fft, n_mels=n_mels)
+        return self._mel[key]
+
+    def rms(self, frame_length: int = 2048, hop_length: int = 512) -> np.ndarray:
+        """Time-domain RMS envelope, shape [1, n_frames] (as librosa.feature.rms(y=...))."""
+        key = (frame_length, hop_length)
+        if key not in self._rms:
+            self._rms[key] = librosa.feature.rms(y=self.y, frame_length=frame_length, hop_length=hop_length)
+        return self._rms[key]
@@ -0,0 +1,24 @@
+"""
+Audio stages of /api/speech/analyze, run together on one decoded recording.
+
+analyze_audio decodes the upload once into an AudioContext and hands it to
+every audio stage, so acoustic features, pause detection and the VAD
+speech onset share the decode, the resample and any derived products. It is a module-level
+function so it can run on execution.cpu_pool; only the path goes to the
+worker and only the stage results come back.
+"""
+from typing import Any, Dict
+
+from backend.app.services.speech.audio_context import AudioContext
+from backend.app.services.speech.feature_extractor import extract_acoustic_features
+from backend.app.services.speech.pause_analyzer import detect_pauses_from_audio
+from backend.app.services.speech.vad_service import detect_speech_start
+
+def analyze_audio(audio_path: str, min_silence_duration: float = 0.3) -> Dict[str, Any]:
+    """Decode audio_path once and run the acoustic, pause and speech-onset stages on it."""
+    audio = AudioContext.from_file(audio_path)
+    return {
+        "acoustic_features": extract_acoustic_features(audio),
+        "pause_analysis": detect_pauses_from_audio(audio, min_silence_duration=min_silence_duration),
+        "speech_onset_ms": detect_speech_start(audio),
+    }
@@ -1,41 +1,51 @@
+import os
+import threading
+import time
 import librosa
 import numpy as np
-import spacy
-from typing import Dict, Any
-
-# Load spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model...")
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
-
-def extract_acoustic_features(audio_path: str) -> Dict[str, Any]:
+from typing import Dict, Any, List, Union
+
+from backend.app.services.speech.audio_context import AudioContext
+from backend.app.services.speech.pitch import estimate_pitch
+
+# spaCy is imported and loaded on first use (see get_nlp), not at import time:
+# the audio stages and the API workers that never score text skip the cost
+SPACY_MODEL = os.getenv("SPEECH_SPACY_MODEL", "en_core_web_sm")
+# extract_linguistic_features only reads tokens and POS tags (tok2vec, tagger
+# and attribute_ruler in en_core_web_sm), so the rest of the pipeline is not loaded
+SPACY_EXCLUDE = ["parser", "ner", "lemmatizer", "senter", "textcat"]
+SPACY_BATCH_SIZE = int(os.getenv("SPEECH_SPACY_BATCH_SIZE", 64))
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def extract_acoustic_features(audio: Union[str, AudioContext], pitch_engine: str = None) -> Dict[str, Any]:
     """
     Extract acoustic features using librosa.
+    Takes the shared AudioContext of the recording (or a path, decoded here).
+    pitch_engine: "yin" (fast) or "pyin" (see pitch.py); SPEECH_PITCH_ENGINE by default.
     """
     try:
-        y, sr = librosa.load(audio_path, sr=None)
+        audio = AudioContext.ensure(audio)
+        sr = audio.sr
 
-        # Pitch (F0)
-        f0, voiced_flag, voiced_probs = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
+        # Pitch (F0), C2 to C7
+        f0, voiced_flag = estimate_pitch(audio, pitch_engine)
         f0_clean = f0[~np.isnan(f0)]
 
         pitch_mean = float(np.mean(f0_clean)) if len(f0_clean) > 0 else 0.0
         pitch_std = float(np.std(f0_clean)) if len(f0_clean) > 0 else 0.0
 
         # Energy (RMS)
-        rms = librosa.feature.rms(y=y)
+        rms = audio.rms()
         energy_mean = float(np.mean(rms))
 
-        # MFCCs
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        # MFCCs, from the context's cached mel spectrogram
+        mfccs = librosa.feature.mfcc(S=librosa.power_to_db(audio.melspectrogram()), sr=sr, n_mfcc=13)
         mfcc_means = np.mean(mfccs, axis=1).tolist()
 
         # Speech Rate (approximate based on duration and non-silent segments)
-        duration = librosa.get_duration(y=y, sr=sr)
+        duration = audio.duration
 
         return {
             "pitch_mean": pitch_mean,
@@ -48,15 +58,25 @@ def extract_acoustic_features(audio_path: str) -> Dict[str, Any]:
         print(f"Error extracting acoustic features: {e}")
         return {}
 
-def extract_linguistic_features(text: str) -> Dict[str, Any]:
-    """
-    Extract linguistic features using spaCy.
-    """
-    if not text:
-        return {}
-
-    doc = nlp(text)
+def get_nlp():
+    """The trimmed spaCy pipeline, loaded on first use (once per process)."""
+    global _nlp
+    with _nlp_lock:
+        if _nlp is None:
+            started = time.perf_counter()
+            import spacy
+            try:
+                _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+            except OSError:
+                # No download at runtime (air-gapped sites); tokens still work, POS tags don't
+                print(f"Warning: spaCy model '{SPACY_MODEL}' not installed "
+                      f"(python -m spacy download {SPACY_MODEL}). Linguistic features will have no POS tags.")
+                _nlp = spacy.blank("en")
+            print(f"✅ spaCy pipeline loaded in {(time.perf_counter() - started) * 1000:.0f} ms "
+                  f"(components: {', '.join(_nlp.pipe_names) or 'tokenizer only'})")
+        return _nlp
 
+def _doc_features(doc) -> Dict[str, Any]:
     word_count = len([token for token in doc if not token.is_punct])
     unique_words = len(set([token.text.lower() for token in doc if not token.is_punct]))
 
@@ -65,8 +85,11 @@ def extract_linguistic_features(text: str) -> Dict[str, Any]:
 
     lexical_diversity = unique_words / word_count if word_count > 0 else 0
 
-    pos_counts = doc.count_by(spacy.attrs.POS)
-    pos_distribution = {doc.vocab[pos].text: count for pos, count in pos_counts.items()}
+    pos_distribution = {}
+    if doc.has_annotation("POS"):
+        from spacy.attrs import POS
+        pos_counts = doc.count_by(POS)
+        pos_distribution = {doc.vocab[pos].text: count for pos, count in pos_counts.items()}
 
     return {
         "word_count": word_count,
@@ -75,3 +98,25 @@ def extract_linguistic_features(text: str) -> Dict[str, Any]:
         "lexical_diversity": lexical_diversity,
         "pos_distribution": pos_distribution
     }
+
+def extract_linguistic_features(text: str) -> Dict[str, Any]:
+    """
+    Extract linguistic features using spaCy.
+    """
+    if not text:
+        return {}
+
+    return _doc_features(get_nlp()(text))
+
+def extract_linguistic_features_batch(texts: List[str], batch_size: int = SPACY_BATCH_SIZE,
+                                      n_process: int = 1) -> List[Dict[str, Any]]:
+    """
+    extract_linguistic_features for many texts (exports, re-scoring), through
+    nlp.pipe so the tagger runs on batches instead of one text at a time.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in texts]
+    indices = [i for i, text in enumerate(texts) if text]
+    docs = get_nlp().pipe((texts[i] for i in indices), batch_size=batch_size, n_process=n_process)
+    for i, doc in zip(indices, docs):
+        results[i] = _doc_features(doc)
+    return results
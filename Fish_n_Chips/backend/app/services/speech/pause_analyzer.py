@@ -1,131 +1,110 @@
 """
 Improved pause detection using audio analysis instead of relying on Whisper timestamps.
 Uses librosa to detect actual silence/pauses in the audio waveform.
+
+detect_pauses_from_audio analyses a whole recording. StreamingPauseDetector
+does the same on audio fed in chunks, for long recordings that should not
+be held in memory at once.
 """
 import numpy as np
 import librosa
-from typing import Dict, Any, List
+import soundfile as sf
+from typing import Dict, Any, List, Optional, Union
+
+from backend.app.services.speech.audio_context import CANONICAL_SAMPLE_RATE, AudioContext
+
+FRAME_SEC = 0.025   # 25ms frames
+HOP_SEC = 0.010     # 10ms hop
+NOISE_FLOOR_PERCENTILE = 10
+SILENCE_MARGIN_DB = 10
+LONG_PAUSE_SEC = 0.8
+
+def _silent_runs(is_silent: np.ndarray):
+    """Start and (exclusive) end frame indices of each run of silent frames."""
+    padded = np.concatenate(([False], is_silent, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges[::2], edges[1::2]
+
+def _summarize(pauses: List[Dict[str, float]]) -> Dict[str, Any]:
+    if not pauses:
+        return {
+            "avg_pause_duration": 0.0,
+            "max_pause": 0.0,
+            "long_pause_count": 0,
+            "pause_count": 0,
+            "pause_locations": [],
+            "total_pause_time": 0.0
+        }
+
+    pause_durations = [p['duration'] for p in pauses]
+    return {
+        "avg_pause_duration": float(np.mean(pause_durations)),
+        "max_pause": float(np.max(pause_durations)),
+        "long_pause_count": len([p for p in pause_durations if p > LONG_PAUSE_SEC]),
+        "pause_count": len(pauses),
+        # Calculate pause variability
+        "pause_variability": float(np.std(pause_durations)) if len(pause_durations) > 1 else 0.0,
+        "pause_locations": pauses,
+        "total_pause_time": float(sum(pause_durations))
+    }
+
+def _log_summary(summary: Dict[str, Any], silence_threshold: float):
+    print(f"🎵 Pauses: {summary['pause_count']} ({summary['total_pause_time']:.2f}s total, "
+          f"longest {summary['max_pause']:.2f}s, {summary['long_pause_count']} > {LONG_PAUSE_SEC}s; "
+          f"silence < {silence_threshold:.1f}dB)")
 
-def detect_pauses_from_audio(audio_path: str, min_silence_duration: float = 0.3) -> Dict[str, Any]:
+def detect_pauses_from_audio(audio: Union[str, AudioContext], min_silence_duration: float = 0.3) -> Dict[str, Any]:
     """
     Detect pauses by analyzing the audio waveform directly.
 
     Args:
-        audio_path: Path to audio file
+        audio: The recording's shared AudioContext (or a path to the audio file)
         min_silence_duration: Minimum duration (seconds) to consider as a pause
 
     Returns:
         Dictionary with pause statistics
     """
-    print(f"\n{'='*70}")
-    print(f"🎵 AUDIO-BASED PAUSE DETECTION STARTING...")
-    print(f"   Audio file: {audio_path}")
-    print(f"   Min silence duration: {min_silence_duration}s")
-    print(f"{'='*70}")
-
     try:
         # Load audio
-        print("   Loading audio...")
-        y, sr = librosa.load(audio_path, sr=None)
-        print(f"   ✅ Audio loaded: {len(y)} samples at {sr}Hz ({len(y)/sr:.2f}s)")
+        audio = AudioContext.ensure(audio)
+        sr = audio.sr
 
         # Calculate RMS energy (volume) over time
-        frame_length = int(sr * 0.025)  # 25ms frames
-        hop_length = int(sr * 0.010)    # 10ms hop
-
-        print("   Calculating energy...")
-        rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
+        frame_length = int(sr * FRAME_SEC)
+        hop_length = int(sr * HOP_SEC)
+        rms = audio.rms(frame_length=frame_length, hop_length=hop_length)[0]
 
         # Convert to dB
         rms_db = librosa.amplitude_to_db(rms, ref=np.max)
 
         # ADAPTIVE threshold based on audio content
         # Find the noise floor (10th percentile of energy)
-        noise_floor = np.percentile(rms_db, 10)
+        noise_floor = np.percentile(rms_db, NOISE_FLOOR_PERCENTILE)
         # Set threshold 10dB above noise floor
-        silence_threshold = noise_floor + 10
-
-        print(f"   Noise floor: {noise_floor:.1f}dB")
-        print(f"   Adaptive silence threshold: {silence_threshold:.1f}dB")
-        print(f"   Max energy: {np.max(rms_db):.1f}dB")
+        silence_threshold = noise_floor + SILENCE_MARGIN_DB
 
         # Find silent frames
         is_silent = rms_db < silence_threshold
-        silent_frame_count = np.sum(is_silent)
-        print(f"   Silent frames: {silent_frame_count}/{len(is_silent)} ({silent_frame_count/len(is_silent)*100:.1f}%)")
 
         # Convert frame indices to time
         times = librosa.frames_to_time(np.arange(len(is_silent)), sr=sr, hop_length=hop_length)
 
-        # Find continuous silent regions
-        pauses = []
-        pause_start = None
-
-        for i, (silent, time) in enumerate(zip(is_silent, times)):
-            if silent and pause_start is None:
-                # Start of pause
-                pause_start = time
-            elif not silent and pause_start is not None:
-                # End of pause
-                pause_duration = time - pause_start
-                if pause_duration >= min_silence_duration:
-                    pauses.append({
-                        'start': pause_start,
-                        'end': time,
-                        'duration': pause_duration
-                    })
-                pause_start = None
-
-        # Handle pause at end of audio
-        if pause_start is not None:
-            pause_duration = times[-1] - pause_start
-            if pause_duration >= min_silence_duration:
-                pauses.append({
-                    'start': pause_start,
-                    'end': times[-1],
-                    'duration': pause_duration
-                })
-
-        if not pauses:
-            return {
-                "avg_pause_duration": 0.0,
-                "max_pause": 0.0,
-                "long_pause_count": 0,
-                "pause_count": 0,
-                "pause_locations": [],
-                "total_pause_time": 0.0
-            }
-
-        pause_durations = [p['duration'] for p in pauses]
-        avg_pause = np.mean(pause_durations)
-        max_pause = np.max(pause_durations)
-        long_pause_count = len([p for p in pause_durations if p > 0.8])
-        total_pause_time = sum(pause_durations)
-
-        # Calculate pause variability
-        pause_variability = np.std(pause_durations) if len(pause_durations) > 1 else 0.0
-
-        print(f"\n🎵 AUDIO-BASED PAUSE DETECTION:")
-        print(f"   Total pauses detected: {len(pauses)}")
-        print(f"   Avg pause: {avg_pause:.2f}s")
-        print(f"   Max pause: {max_pause:.2f}s")
-        print(f"   Long pauses (>0.8s): {long_pause_count}")
-        print(f"   Pause variability: {pause_variability:.2f}s")
-        print(f"   Total pause time: {total_pause_time:.2f}s")
-
-        # Print each pause
-        for i, pause in enumerate(pauses[:5]):  # Show first 5
-            print(f"   Pause {i+1}: {pause['start']:.2f}s - {pause['end']:.2f}s ({pause['duration']:.2f}s)")
-
-        return {
-            "avg_pause_duration": float(avg_pause),
-            "max_pause": float(max_pause),
-            "long_pause_count": int(long_pause_count),
-            "pause_count": len(pauses),
-            "pause_variability": float(pause_variability),
-            "pause_locations": pauses,
-            "total_pause_time": float(total_pause_time)
-        }
+        # Find continuous silent regions; a pause still open at the end of
+        # the audio closes at the last frame
+        starts, ends = _silent_runs(is_silent)
+        start_times = times[starts]
+        end_times = times[np.minimum(ends, len(times) - 1)]
+        durations = end_times - start_times
+        keep = durations >= min_silence_duration
+        pauses = [
+            {'start': start, 'end': end, 'duration': duration}
+            for start, end, duration in zip(start_times[keep].tolist(), end_times[keep].tolist(),
+                                            durations[keep].tolist())
+        ]
+
+        summary = _summarize(pauses)
+        _log_summary(summary, silence_threshold)
+        return summary
 
     except Exception as e:
         print(f"❌ Error in audio-based pause detection: {e}")
@@ -139,6 +118,175 @@ def detect_pauses_from_audio(audio_path: str, min_silence_duration: float = 0.3)
             "total_pause_time": 0.0
         }
 
+class StreamingPauseDetector:
+    """
+    Pause detection over audio fed in chunks, in constant memory (apart
+    from the list of pauses found).
+
+    Framing and RMS match detect_pauses_from_audio (centered 25ms frames,
+    10ms hop). Frames are classified in fixed blocks, whatever the chunk
+    size, so the result does not depend on how the audio is chunked:
+
+    - warm-up: the first warmup_sec of frames are held back and classified
+      together once they are all in (or at finish()). Their noise floor is
+      their exact 10th percentile, as in the batch detector, so a recording
+      that opens with speech doesn't have it taken for silence. Recordings
+      no longer than the warm-up get the same pauses as
+      detect_pauses_from_audio.
+    - after that, every BLOCK_SEC of frames is classified with the 10th
+      percentile of a histogram of all frame energies so far. The histogram
+      decays with a half-life of noise_floor_halflife seconds, so the floor
+      follows changing background noise over a long conversation.
+
+    A pause that spans blocks is carried over. check_pause_parity.py checks
+    the parity with the batch detector.
+
+        detector = StreamingPauseDetector(sr)
+        for chunk in chunks:
+            detector.feed(chunk)   # returns the pauses completed so far
+        summary = detector.finish()
+    """
+
+    DB_BINS = np.arange(-100.0, 0.05, 0.1)
+    BLOCK_SEC = 1.0
+
+    def __init__(self, sr: int = CANONICAL_SAMPLE_RATE, min_silence_duration: float = 0.3,
+                 noise_floor_halflife: float = 30.0, warmup_sec: float = 10.0):
+        self.sr = sr
+        self.min_silence_duration = min_silence_duration
+        self.noise_floor_halflife = noise_floor_halflife
+        self.frame_length = int(sr * FRAME_SEC)
+        self.hop_length = int(sr * HOP_SEC)
+        self.warmup_frames = max(1, int(round(warmup_sec / HOP_SEC)))
+        self.block_frames = max(1, int(round(self.BLOCK_SEC / HOP_SEC)))
+
+        # Samples not yet framed; starts with the centering pad
+        self._pending = np.zeros(self.frame_length // 2, dtype=np.float32)
+        # Frame energies (dB) not yet classified
+        self._pending_db: List[np.ndarray] = []
+        self._pending_count = 0
+        self._frame_index = 0
+        self._histogram = np.zeros(len(self.DB_BINS) - 1)
+        self._max_db = -np.inf
+        self._pause_start: Optional[float] = None
+        self._last_time: Optional[float] = None
+        self.silence_threshold = 0.0
+        self.pauses: List[Dict[str, float]] = []
+        self._finished = False
+
+    def _histogram_floor(self) -> float:
+        cumulative = np.cumsum(self._histogram)
+        target = cumulative[-1] * NOISE_FLOOR_PERCENTILE / 100
+        index = min(int(np.searchsorted(cumulative, target)), len(cumulative) - 1)
+        # Interpolate within the bin
+        below = cumulative[index - 1] if index > 0 else 0.0
+        fraction = (target - below) / self._histogram[index] if self._histogram[index] > 0 else 0.0
+        return float(self.DB_BINS[index] + fraction * (self.DB_BINS[1] - self.DB_BINS[0]))
+
+    def _classify(self, rms_db: np.ndarray) -> List[Dict[str, float]]:
+        n = len(rms_db)
+        # Same 80 dB range as librosa.amplitude_to_db, below the loudest frame so far
+        self._max_db = max(self._max_db, float(rms_db.max()))
+        rms_db = np.maximum(rms_db, self._max_db - 80.0)
+        if np.isfinite(self.noise_floor_halflife):
+            self._histogram *= 0.5 ** (n * HOP_SEC / self.noise_floor_halflife)
+        self._histogram += np.histogram(np.clip(rms_db, self.DB_BINS[0], self.DB_BINS[-1]), bins=self.DB_BINS)[0]
+
+        if self._frame_index == 0:
+            # Warm-up block: the exact percentile of its frames, as in the batch detector
+            noise_floor = float(np.percentile(rms_db, NOISE_FLOOR_PERCENTILE))
+        else:
+            noise_floor = self._histogram_floor()
+        self.silence_threshold = noise_floor + SILENCE_MARGIN_DB
+
+        is_silent = rms_db < self.silence_threshold
+        times = (self._frame_index + np.arange(n)) * self.hop_length / self.sr
+        self._frame_index += n
+        self._last_time = float(times[-1])
+
+        completed = []
+        starts, ends = _silent_runs(is_silent)
+        if self._pause_start is not None and not is_silent[0]:
+            # The pause carried from the previous block ended at this block's first frame
+            completed.append((self._pause_start, float(times[0])))
+            self._pause_start = None
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            start_time = self._pause_start if start == 0 and self._pause_start is not None else float(times[start])
+            if end == n:
+                self._pause_start = start_time
+            else:
+                completed.append((start_time, float(times[end])))
+                self._pause_start = None
+        return self._keep(completed)
+
+    def _drain(self, final: bool = False) -> List[Dict[str, float]]:
+        """Classify every complete block of pending frames (and the remainder when final)."""
+        found = []
+        while self._pending_count:
+            needed = self.warmup_frames if self._frame_index == 0 else self.block_frames
+            if self._pending_count < needed and not final:
+                break
+            pending = np.concatenate(self._pending_db)
+            block, rest = pending[:needed], pending[needed:]
+            self._pending_db, self._pending_count = ([rest], len(rest)) if len(rest) else ([], 0)
+            found.extend(self._classify(block))
+        return found
+
+    def _keep(self, runs) -> List[Dict[str, float]]:
+        found = [{'start': start, 'end': end, 'duration': end - start}
+                 for start, end in runs if end - start >= self.min_silence_duration]
+        self.pauses.extend(found)
+        return found
+
+    def _frames(self, samples: np.ndarray) -> np.ndarray:
+        """Whole frames in samples; the unframed tail is kept for the next chunk."""
+        if len(samples) < self.frame_length:
+            self._pending = samples
+            return samples[:0].reshape(0, self.frame_length)
+        n = 1 + (len(samples) - self.frame_length) // self.hop_length
+        self._pending = samples[n * self.hop_length:]
+        windows = np.lib.stride_tricks.sliding_window_view(samples, self.frame_length)
+        return windows[::self.hop_length][:n]
+
+    def _add_frames(self, frames: np.ndarray):
+        if len(frames):
+            rms = np.sqrt(np.mean(frames ** 2, axis=1))
+            self._pending_db.append(20 * np.log10(np.maximum(rms, 1e-5)))
+            self._pending_count += len(frames)
+
+    def feed(self, chunk: np.ndarray) -> List[Dict[str, float]]:
+        """Add mono float samples at self.sr; returns the pauses completed so far (up to a block behind)."""
+        if self._finished:
+            raise RuntimeError("StreamingPauseDetector.feed() called after finish()")
+        self._add_frames(self._frames(np.concatenate([self._pending, np.asarray(chunk, dtype=np.float32)])))
+        return self._drain()
+
+    def finish(self) -> Dict[str, Any]:
+        """Flush the last frames, close an open pause and return the pause statistics."""
+        if not self._finished:
+            self._finished = True
+            tail = np.concatenate([self._pending, np.zeros(self.frame_length // 2, dtype=np.float32)])
+            self._add_frames(self._frames(tail))
+            self._drain(final=True)
+            if self._pause_start is not None:
+                self._keep([(self._pause_start, self._last_time)])
+                self._pause_start = None
+        summary = _summarize(self.pauses)
+        _log_summary(summary, self.silence_threshold)
+        return summary
+
+def detect_pauses_streaming(audio_path: str, min_silence_duration: float = 0.3, chunk_seconds: float = 10.0,
+                            noise_floor_halflife: float = 30.0, warmup_sec: float = 10.0) -> Dict[str, Any]:
+    """
+    Pause statistics of a long recording read in chunks (formats soundfile
+    can read, at the file's own sample rate), in constant memory.
+    """
+    sr = sf.info(audio_path).samplerate
+    detector = StreamingPauseDetector(sr, min_silence_duration, noise_floor_halflife, warmup_sec)
+    for block in sf.blocks(audio_path, blocksize=int(chunk_seconds * sr), dtype="float32", always_2d=True):
+        detector.feed(block.mean(axis=1))
+    return detector.finish()
+
 
 def analyze_pauses(word_timestamps: List[Any]) -> Dict[str, Any]:
     """
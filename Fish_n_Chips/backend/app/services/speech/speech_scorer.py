@@ -2,21 +2,32 @@
 ML-based speech scoring with IMPROVED pause analysis.
 Now properly considers pause duration, variability, and hesitations.
 """
-import joblib
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import os
 
-# Load the trained model
-MODEL_PATH = "models/speech_ml_model.joblib"
+from backend.app.model_registry import ModelVersion, speech_registry
 
-try:
-    ml_model = joblib.load(MODEL_PATH)
-    print(f"✅ Loaded IMPROVED ML model from {MODEL_PATH}")
-    print(f"   Model now emphasizes PAUSE PATTERNS!")
-except FileNotFoundError:
-    print(f"⚠️ ML model not found at {MODEL_PATH}. Please train the model first.")
-    ml_model = None
+# The trained model is served from the speech registry (models/registry/speech/,
+# or models/speech_ml_model.joblib) and loaded on first use rather than at import time
+
+_missing_reported = False
+
+def get_speech_model() -> Optional[ModelVersion]:
+    """The served speech model version, loading it on first use; None if no model exists."""
+    global _missing_reported
+    served = speech_registry.active
+    if served is not None:
+        return served
+
+    served = speech_registry.ensure_loaded()
+    if served is not None:
+        print(f"✅ Loaded IMPROVED ML model {served.version} from {served.path}")
+        print(f"   Model now emphasizes PAUSE PATTERNS!")
+    elif not _missing_reported:
+        print(f"⚠️ ML model not found at {speech_registry.legacy_path}. Please train the model first.")
+        _missing_reported = True
+    return served
 
 def calculate_pause_features(pause_analysis: Dict[str, Any]) -> Dict[str, float]:
     """
@@ -71,7 +82,8 @@ def calculate_ml_risk_score(
         Dictionary with risk score, level, probability, and detailed analysis
     """
 
-    if ml_model is None:
+    served = get_speech_model()
+    if served is None:
         return fallback_scoring(reaction_time_ms, speech_rate_wpm,
                                pause_analysis.get("avg_pause_duration", 0), word_accuracy)
 
@@ -90,9 +102,10 @@ def calculate_ml_risk_score(
         pause_features['hesitation_count']
     ]])
 
-    # Get prediction and probability
-    prediction = ml_model.predict(features)[0]
-    probability = ml_model.predict_proba(features)[0]
+    # Get probability and prediction in one pass
+    probas, served = speech_registry.score(features)
+    probability = probas[0]
+    prediction = served.classes_[np.argmax(probability)]
 
     # Risk probability (probability of cognitive decline)
     risk_probability = probability[1]
@@ -115,7 +128,7 @@ def calculate_ml_risk_score(
         'long_pause_count', 'hesitation_count'
     ]
 
-    feature_importances = ml_model.feature_importances_
+    feature_importances = served.model.feature_importances_
 
     # Calculate normalized component scores for display
     component_scores = {
@@ -146,6 +159,7 @@ def calculate_ml_risk_score(
             for name, imp in zip(feature_names, feature_importances)
         },
         "model_type": "RandomForest_PauseFocused",
+        "model_version": served.version,
         "features_used": {
             "reaction_time_ms": reaction_time_ms,
             "speech_rate_wpm": speech_rate_wpm,
@@ -0,0 +1,10 @@
+"""Stimulus sentences read aloud in the speech test."""
+
+STIMULUS_SENTENCES = [
+    "There sits an old man",
+    "The cat is on the mat",
+    "I went to the store yesterday",
+    "The quick brown fox jumps",
+    "She sells seashells by the seashore",
+    "Today is a beautiful day"
+]
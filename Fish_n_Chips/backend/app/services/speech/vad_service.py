@@ -1,22 +1,97 @@
-import webrtcvad
+"""
+Speech onset detection with WebRTC VAD, for server-side reaction times.
+
+webrtcvad takes 16-bit mono PCM at 8/16/32/48 kHz in 10, 20 or 30 ms
+frames. An AudioContext already holds the recording at 16 kHz, and its
+pcm16 is cached, so onset detection needs no decode of its own. Frames
+are zero-copy memoryview slices of that buffer.
+
+WebRTC VAD calls the first couple of hundred milliseconds speech while its
+noise model settles, and it reacts to clicks. So a frame only counts as
+speech if the VAD says so and the frame is within ENERGY_GATE_DB of the
+recording's loudest frame, and an onset needs MIN_SPEECH_FRAMES such
+frames in a row.
+"""
+from typing import Iterable, List, Union
+
+import librosa
 import numpy as np
+import webrtcvad
 
-def detect_speech_start(audio_bytes: bytes, sample_rate: int = 16000) -> float:
-    """
-    Detect the start time of speech in milliseconds using WebRTC VAD.
-    Assumes audio is 16-bit mono PCM.
-    """
-    vad = webrtcvad.Vad(3) # Aggressiveness mode 3 (high)
+from backend.app.services.speech.audio_context import AudioContext
+
+VAD_SAMPLE_RATES = (8000, 16000, 32000, 48000)
+VAD_AGGRESSIVENESS = 3  # Aggressiveness mode 3 (high)
+FRAME_DURATION_MS = 30  # Frame duration in ms (10, 20, or 30ms supported by webrtcvad)
+# Consecutive speech frames needed before an onset is accepted, so a click
+# or a breath right after the stimulus is not taken as the response
+MIN_SPEECH_FRAMES = 3
+# Frames quieter than this (dB relative to the loudest frame) are never speech
+ENERGY_GATE_DB = -35.0
 
-    # Frame duration in ms (10, 20, or 30ms supported by webrtcvad)
-    frame_duration_ms = 30
-    frame_size = int(sample_rate * frame_duration_ms / 1000) * 2 # 2 bytes per sample
+def _pcm16(audio: Union[bytes, str, AudioContext], sample_rate: int):
+    """16-bit PCM and its rate for webrtcvad, reusing the context's decode when there is one."""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return audio, sample_rate
+    audio = AudioContext.ensure(audio)
+    if audio.sr in VAD_SAMPLE_RATES:
+        return audio.pcm16, audio.sr
+    # SPEECH_SAMPLE_RATE set to a rate webrtcvad can't take
+    y = librosa.resample(audio.y, orig_sr=audio.sr, target_sr=16000)
+    return (np.clip(y, -1.0, 1.0) * 32767).astype("<i2").tobytes(), 16000
 
-    offset = 0
-    while offset + frame_size < len(audio_bytes):
-        frame = audio_bytes[offset:offset + frame_size]
-        if vad.is_speech(frame, sample_rate):
-            return (offset / 2 / sample_rate) * 1000 # Convert bytes offset to ms
-        offset += frame_size
+def _loud_frames(pcm, frame_samples: int) -> np.ndarray:
+    """Per-frame flags: frame energy within ENERGY_GATE_DB of the loudest frame."""
+    samples = np.frombuffer(pcm, dtype="<i2")  # A view, no copy
+    n_frames = len(samples) // frame_samples
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+    frames = samples[:n_frames * frame_samples].reshape(n_frames, frame_samples).astype(np.float32)
+    energy = np.mean(frames ** 2, axis=1)
+    if energy.max() <= 0:
+        return np.zeros(n_frames, dtype=bool)
+    return 10 * np.log10(np.maximum(energy, 1e-10) / energy.max()) > ENERGY_GATE_DB
+
+def _onset_ms(pcm, sample_rate: int, aggressiveness: int, frame_duration_ms: int, min_speech_frames: int) -> float:
+    if sample_rate not in VAD_SAMPLE_RATES:
+        raise ValueError(f"webrtcvad needs a sample rate in {VAD_SAMPLE_RATES}, got {sample_rate}")
+    # A fresh VAD per recording: its noise model adapts to what it has seen
+    vad = webrtcvad.Vad(aggressiveness)
+    frame_samples = int(sample_rate * frame_duration_ms / 1000)
+    frame_size = frame_samples * 2 # 2 bytes per sample
+    buffer = memoryview(pcm)
+    loud = _loud_frames(buffer, frame_samples)
+
+    run_start, run_length = 0, 0
+    for index, offset in enumerate(range(0, len(buffer) - frame_size + 1, frame_size)):
+        # Every frame goes through the VAD so its noise model keeps adapting
+        if vad.is_speech(buffer[offset:offset + frame_size], sample_rate) and loud[index]:
+            if run_length == 0:
+                run_start = offset
+            run_length += 1
+            if run_length >= min_speech_frames:
+                return (run_start / 2 / sample_rate) * 1000 # Convert bytes offset to ms
+        else:
+            run_length = 0
 
     return -1.0 # No speech detected
+
+def detect_speech_start(audio: Union[bytes, str, AudioContext], sample_rate: int = 16000,
+                        aggressiveness: int = VAD_AGGRESSIVENESS, frame_duration_ms: int = FRAME_DURATION_MS,
+                        min_speech_frames: int = MIN_SPEECH_FRAMES) -> float:
+    """
+    Detect the start time of speech in milliseconds using WebRTC VAD.
+
+    audio is either 16-bit mono PCM at sample_rate, or a recording (AudioContext
+    or path) whose own rate is used. Returns -1.0 when no speech is found.
+    """
+    pcm, sample_rate = _pcm16(audio, sample_rate)
+    return _onset_ms(pcm, sample_rate, aggressiveness, frame_duration_ms, min_speech_frames)
+
+def detect_speech_starts(recordings: Iterable[Union[str, AudioContext]], aggressiveness: int = VAD_AGGRESSIVENESS,
+                         frame_duration_ms: int = FRAME_DURATION_MS,
+                         min_speech_frames: int = MIN_SPEECH_FRAMES) -> List[float]:
+    """Speech onsets (ms, -1.0 when none) of several recordings, for re-processing stored audio."""
+    return [detect_speech_start(recording, aggressiveness=aggressiveness, frame_duration_ms=frame_duration_ms,
+                                min_speech_frames=min_speech_frames)
+            for recording in recordings]
@@ -1,46 +1,239 @@
+"""
+Speech transcription with word timestamps, behind pluggable backends.
+
+    openai  OpenAI Whisper API (whisper-1). Set OPENAI_BASE_URL to point it at
+            another OpenAI-compatible server, e.g. whisper_standin_server.py in tests.
+    local   faster-whisper on the CPU (no network; for air-gapped sites).
+            Several sentences are decoded in one batched pass.
+    dummy   fixed text, for development without a key or a model.
+
+SPEECH_TRANSCRIBER picks the backend. The default is openai when
+OPENAI_API_KEY is set, and dummy otherwise (the old behaviour).
+
+Transcripts are cached by the sha256 of the audio plus the backend and
+model (see result_cache.ResultCache), so re-analysing stored audio never
+transcribes it again. Failed transcriptions are not cached.
+
+    SPEECH_TRANSCRIPT_CACHE / _DIR / _ENTRIES / _DISK_MB   cache settings
+    SPEECH_WHISPER_MODEL / _DEVICE / _COMPUTE_TYPE / _BATCH_SIZE   local engine
+"""
+import copy
 import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 from openai import OpenAI
-import io
-
-# Initialize OpenAI client
-# Ensure OPENAI_API_KEY is set in environment
-api_key = os.getenv("OPENAI_API_KEY")
-if api_key:
-    client = OpenAI(api_key=api_key)
-else:
-    print("Warning: OPENAI_API_KEY not found. Whisper service will use dummy data.")
-    client = None
-
-def transcribe_with_timestamps(audio_file_path: str):
-    """
-    Transcribe audio file using OpenAI Whisper API and return text with word timestamps.
-    """
-    if not client:
-        return {
+
+from backend.app.result_cache import ResultCache, file_digest
+from backend.app.services.speech.audio_context import CANONICAL_SAMPLE_RATE, AudioContext
+
+TRANSCRIBERS = ("openai", "local", "dummy")
+
+TRANSCRIPT_CACHE_ENABLED = os.getenv("SPEECH_TRANSCRIPT_CACHE", "1").lower() in ("1", "true", "yes")
+TRANSCRIPT_CACHE_DIR = os.getenv("SPEECH_TRANSCRIPT_CACHE_DIR", os.path.join("models", "transcript_cache"))
+TRANSCRIPT_CACHE_ENTRIES = int(os.getenv("SPEECH_TRANSCRIPT_CACHE_ENTRIES", 1024))
+TRANSCRIPT_CACHE_DISK_MB = float(os.getenv("SPEECH_TRANSCRIPT_CACHE_DISK_MB", 64))
+
+LOCAL_MODEL = os.getenv("SPEECH_WHISPER_MODEL", "small.en")
+LOCAL_DEVICE = os.getenv("SPEECH_WHISPER_DEVICE", "cpu")
+LOCAL_COMPUTE_TYPE = os.getenv("SPEECH_WHISPER_COMPUTE_TYPE", "int8")
+LOCAL_BATCH_SIZE = int(os.getenv("SPEECH_WHISPER_BATCH_SIZE", 8))
+# Silence between sentences when they are decoded together
+BATCH_GAP_SEC = 1.0
+
+def _words(words) -> List[Dict[str, Any]]:
+    """Word timestamps as plain dicts (the API returns objects)."""
+    return [
+        {"word": w["word"] if isinstance(w, dict) else w.word,
+         "start": float(w["start"] if isinstance(w, dict) else w.start),
+         "end": float(w["end"] if isinstance(w, dict) else w.end)}
+        for w in words or []
+    ]
+
+class TranscriptionBackend(ABC):
+    """Turns audio files into {"text": str, "words": [{"word", "start", "end"}]}."""
+
+    name = "base"
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the backend and model in cache keys."""
+        return self.name
+
+    def transcribe(self, audio_file_path: str) -> Dict[str, Any]:
+        return self.transcribe_batch([audio_file_path])[0]
+
+    @abstractmethod
+    def transcribe_batch(self, audio_file_paths: List[str]) -> List[Dict[str, Any]]:
+        """One transcript per path, in order."""
+
+class DummyBackend(TranscriptionBackend):
+    name = "dummy"
+
+    def transcribe_batch(self, audio_file_paths):
+        return [{
             "text": "Dummy transcription (API Key missing)",
             "words": [
                 {"word": "Dummy", "start": 0.0, "end": 0.5},
                 {"word": "transcription", "start": 0.6, "end": 1.5}
             ]
-        }
-
-    try:
-        with open(audio_file_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json",
-                timestamp_granularities=["word"]
-            )
-
-        return {
-            "text": transcript.text,
-            "words": transcript.words
-        }
-    except Exception as e:
-        print(f"Whisper API error: {e}")
-        # Return dummy data for testing if API fails or key is missing
-        return {
-            "text": "Error in transcription",
-            "words": []
-        }
+        } for _ in audio_file_paths]
+
+class OpenAIBackend(TranscriptionBackend):
+    name = "openai"
+    model = "whisper-1"
+
+    def __init__(self, client: OpenAI = None, max_parallel: int = 4):
+        # Ensure OPENAI_API_KEY is set in environment (OPENAI_BASE_URL is honoured too)
+        self.client = client or OpenAI()
+        self.max_parallel = max_parallel
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.name}:{self.model}:{self.client.base_url}"
+
+    def transcribe(self, audio_file_path):
+        try:
+            with open(audio_file_path, "rb") as audio_file:
+                transcript = self.client.audio.transcriptions.create(
+                    model=self.model,
+                    file=audio_file,
+                    response_format="verbose_json",
+                    timestamp_granularities=["word"]
+                )
+            return {"text": transcript.text, "words": _words(transcript.words)}
+        except Exception as e:
+            print(f"Whisper API error: {e}")
+            # Return placeholder data so the rest of the analysis still runs
+            return {"text": "Error in transcription", "words": [], "error": str(e)}
+
+    def transcribe_batch(self, audio_file_paths):
+        # One request per file; send them in parallel
+        if len(audio_file_paths) <= 1:
+            return [self.transcribe(path) for path in audio_file_paths]
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(audio_file_paths))) as executor:
+            return list(executor.map(self.transcribe, audio_file_paths))
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    faster-whisper (CTranslate2) on the CPU. The sentences of a batch are
+    joined with BATCH_GAP_SEC of silence and decoded in one batched pass.
+    The words are then split back out by their timestamps. CTranslate2
+    releases the GIL, so this runs well on io_pool threads.
+    """
+
+    name = "local"
+
+    def __init__(self, model_size: str = LOCAL_MODEL, device: str = LOCAL_DEVICE,
+                 compute_type: str = LOCAL_COMPUTE_TYPE, batch_size: int = LOCAL_BATCH_SIZE):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.batch_size = batch_size
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.name}:{self.model_size}:{self.compute_type}"
+
+    @property
+    def pipeline(self):
+        # Loaded on first use, so importing this module stays cheap
+        with self._lock:
+            if self._pipeline is None:
+                try:
+                    from faster_whisper import BatchedInferencePipeline, WhisperModel
+                except ImportError:
+                    raise RuntimeError("SPEECH_TRANSCRIBER=local needs faster-whisper (pip install faster-whisper)")
+                print(f"🔄 Loading local Whisper model '{self.model_size}' ({self.device}, {self.compute_type})...")
+                model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
+                self._pipeline = BatchedInferencePipeline(model=model)
+            return self._pipeline
+
+    def transcribe_batch(self, audio_file_paths):
+        if not audio_file_paths:
+            return []
+        clips = [AudioContext.from_file(path, sr=CANONICAL_SAMPLE_RATE).y for path in audio_file_paths]
+
+        gap = np.zeros(int(BATCH_GAP_SEC * CANONICAL_SAMPLE_RATE), dtype=np.float32)
+        offsets = np.cumsum([0] + [len(clip) + len(gap) for clip in clips[:-1]]) / CANONICAL_SAMPLE_RATE
+        joined = np.concatenate([part for clip in clips for part in (clip, gap)][:-1])
+
+        segments, _ = self.pipeline.transcribe(joined, batch_size=self.batch_size,
+                                               word_timestamps=True, language="en")
+        results = [{"text": "", "words": []} for _ in clips]
+        for segment in segments:
+            for w in segment.words or []:
+                # A word belongs to the sentence whose span holds its midpoint
+                index = int(np.searchsorted(offsets, (w.start + w.end) / 2, side="right")) - 1
+                results[index]["words"].append({
+                    "word": w.word.strip(),
+                    "start": round(max(float(w.start - offsets[index]), 0.0), 3),
+                    "end": round(max(float(w.end - offsets[index]), 0.0), 3),
+                })
+        for result in results:
+            result["text"] = " ".join(w["word"] for w in result["words"])
+        return results
+
+BACKENDS = {"openai": OpenAIBackend, "local": LocalWhisperBackend, "dummy": DummyBackend}
+
+def _default_transcriber() -> str:
+    if os.getenv("SPEECH_TRANSCRIBER"):
+        return os.getenv("SPEECH_TRANSCRIBER")
+    if os.getenv("OPENAI_API_KEY"):
+        return "openai"
+    print("Warning: OPENAI_API_KEY not found and SPEECH_TRANSCRIBER not set. Whisper service will use dummy data.")
+    return "dummy"
+
+def make_backend(name: str) -> TranscriptionBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcriber '{name}'. Use one of {list(TRANSCRIBERS)}")
+    return BACKENDS[name]()
+
+backend = make_backend(_default_transcriber())
+transcript_cache = ResultCache(
+    cache_dir=TRANSCRIPT_CACHE_DIR,
+    max_entries=TRANSCRIPT_CACHE_ENTRIES,
+    max_disk_bytes=int(TRANSCRIPT_CACHE_DISK_MB * 1024 * 1024),
+) if TRANSCRIPT_CACHE_ENABLED else None
+
+def transcribe_batch(audio_file_paths: List[str],
+                     transcriber: Optional[TranscriptionBackend] = None) -> List[Dict[str, Any]]:
+    """
+    Transcribe several audio files. Cached transcripts are returned without
+    calling the backend; the rest go to it in one batch. Callers get their own
+    copies, so changing a result never changes the cached transcript.
+    """
+    transcriber = transcriber or backend
+    results: List[Optional[Dict[str, Any]]] = [None] * len(audio_file_paths)
+    keys = [None] * len(audio_file_paths)
+
+    if transcript_cache is not None:
+        for i, path in enumerate(audio_file_paths):
+            keys[i] = ResultCache.key(file_digest(path), transcriber.fingerprint)
+            cached = transcript_cache.get(keys[i])
+            results[i] = copy.deepcopy(cached) if cached is not None else None
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        for i, result in zip(pending, transcriber.transcribe_batch([audio_file_paths[i] for i in pending])):
+            results[i] = result
+            if transcript_cache is not None and "error" not in result:
+                transcript_cache.put(keys[i], copy.deepcopy(result))
+    return results
+
+def transcribe_with_timestamps(audio_file_path: str, transcriber: Optional[TranscriptionBackend] = None):
+    """
+    Transcribe an audio file with the configured backend and return text with word timestamps.
+    """
+    return transcribe_batch([audio_file_path], transcriber)[0]
+
+def describe() -> Dict[str, Any]:
+    return {
+        "backend": backend.fingerprint,
+        "cache": transcript_cache.stats() if transcript_cache is not None else {"enabled": False},
+    }
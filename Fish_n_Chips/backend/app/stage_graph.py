@@ -0,0 +1,79 @@
+"""
+Small async stage graph for request pipelines.
+
+Stages are async callables with named dependencies. Running the graph
+starts every stage as soon as the stages it depends on have finished, so
+independent stages overlap (e.g. a Whisper round trip on io_pool and the
+audio analysis on cpu_pool) and a request takes roughly its critical path
+instead of the sum of its stages. Each stage receives its dependencies'
+results as keyword arguments. Stage timings are kept for the response's
+debug block.
+
+    graph = StageGraph()
+    graph.add("transcribe", lambda: io_pool.run(transcribe, path))
+    graph.add("audio", lambda: cpu_pool.run(analyze_audio, path))
+    graph.add("score", score, "transcribe", "audio")
+    results = await graph.run()
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+class StageGraph:
+    """Named async stages with dependencies, run concurrently where the graph allows."""
+
+    def __init__(self):
+        self._stages: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.total_ms = 0.0
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], *depends_on: str) -> "StageGraph":
+        """Add a stage; fn(**{dep: result}) may return an awaitable or a plain value."""
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' already added")
+        missing = [dep for dep in depends_on if dep not in self._stages]
+        if missing:
+            # Dependencies must be added first, which also rules out cycles
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s) {missing}")
+        self._stages[name] = (fn, depends_on)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all stages and return {stage: result}. The first failure cancels the rest."""
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str, fn: Callable[..., Any], depends_on: Tuple[str, ...]):
+            inputs = {dep: await tasks[dep] for dep in depends_on}
+            ready = time.perf_counter()
+            result = fn(**inputs)
+            if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                result = await result
+            finished = time.perf_counter()
+            self.timings[name] = {
+                "start_ms": round((ready - started) * 1000, 3),
+                "duration_ms": round((finished - ready) * 1000, 3),
+            }
+            return result
+
+        for name, (fn, depends_on) in self._stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, fn, depends_on))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            # Let cancelled stages unwind before the caller cleans up what they use
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.total_ms = round((time.perf_counter() - started) * 1000, 3)
+        return {name: task.result() for name, task in tasks.items()}
+
+    def debug(self) -> Dict[str, Any]:
+        """Per-stage timings, the wall time and the time a sequential run would have taken."""
+        return {
+            "stages": self.timings,
+            "total_ms": self.total_ms,
+            "sequential_ms": round(sum(t["duration_ms"] for t in self.timings.values()), 3),
+        }
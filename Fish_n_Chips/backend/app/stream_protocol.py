@@ -0,0 +1,182 @@
+"""
+Binary frame protocol for EEG WebSocket streaming.
+
+Clients opt in when connecting, e.g. /ws/simulate?format=binary&dtype=int16&decimate=4&delta=true&compress=true
+Without format=binary the stream stays JSON text, as before.
+
+In binary mode the server first sends one JSON text message describing the
+stream (see StreamFormat.handshake), then one binary message per tick:
+
+    header (little-endian, HEADER_SIZE bytes)
+        magic         2s   b"EG"
+        version       B    PROTOCOL_VERSION
+        dtype         B    0 = float32, 1 = int16 (scaled)
+        flags         B    bit 0 = delta frame, bit 1 = zlib-compressed payload
+        status_class  b    -1 if no prediction
+        risk_level    B    index into RISK_LEVELS
+        reserved      B
+        timestamp     I
+        n_samples     I    rows in the payload (after decimation)
+        n_channels    H
+        decimation    H
+        probability   f    NaN if no prediction
+        scale         f    int16 payloads: value = sample * scale
+    payload         n_samples x n_channels samples, row-major
+
+A delta frame carries only the samples appended since the previous frame
+instead of the full window; the client appends them to its own buffer. A
+tick with nothing new gives a delta frame with n_samples = 0. Delta frames
+are decimated on their own, so decimate must divide the samples added per
+tick (from_query checks this against the stream's hop).
+
+int16 payloads are scaled by the largest finite sample; NaN is sent as 0
+and +/-inf as +/-32767.
+"""
+import json
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+
+PROTOCOL_VERSION = 1
+MAGIC = b"EG"
+
+HEADER = struct.Struct("<2sBBBbBBIIHHff")
+HEADER_SIZE = HEADER.size
+
+DTYPES = {"float32": 0, "int16": 1}
+RISK_LEVELS = ["", "Low", "Medium", "High"]
+
+FLAG_DELTA = 1
+FLAG_ZLIB = 2
+
+@dataclass
+class StreamFormat:
+    """Per-connection frame settings negotiated from the WebSocket query string."""
+    binary: bool = False
+    dtype: str = "float32"
+    decimation: int = 1
+    delta: bool = False
+    compress: bool = False
+
+    @classmethod
+    def from_query(cls, params: Mapping[str, str], hop: int = 1) -> "StreamFormat":
+        """hop is the number of samples the stream appends per tick."""
+        def flag(name: str) -> bool:
+            return params.get(name, "false").lower() in ("1", "true", "yes")
+
+        fmt = cls(
+            binary=params.get("format", "json").lower() == "binary",
+            dtype=params.get("dtype", "float32").lower(),
+            decimation=int(params.get("decimate", 1)),
+            delta=flag("delta"),
+            compress=flag("compress"),
+        )
+        if fmt.dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{fmt.dtype}'. Use one of {list(DTYPES)}")
+        if fmt.decimation < 1:
+            raise ValueError("decimate must be >= 1")
+        if fmt.delta and hop % fmt.decimation:
+            # A delta frame is decimated on its own; a partial block would be lost every tick
+            raise ValueError(f"decimate must divide the {hop} samples sent per tick when delta=true")
+        return fmt
+
+    def handshake(self, fs: int, n_channels: int) -> Dict[str, Any]:
+        return {
+            "protocol": f"eeg-frame/{PROTOCOL_VERSION}",
+            "dtype": self.dtype,
+            "decimation": self.decimation,
+            "delta": self.delta,
+            "compress": self.compress,
+            "sampling_rate": fs / self.decimation,
+            "n_channels": n_channels,
+            "header_size": HEADER_SIZE,
+        }
+
+def decimate_for_display(samples: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Block-average every `factor` samples. Cheap anti-aliasing that is good
+    enough for plotting; leading samples that do not fill a block are dropped.
+    """
+    if factor == 1:
+        return samples
+    n_blocks = len(samples) // factor
+    trimmed = samples[len(samples) - n_blocks * factor:]
+    return trimmed.reshape(n_blocks, factor, samples.shape[1]).mean(axis=1)
+
+def encode_frame(fmt: StreamFormat, window: np.ndarray, new_samples: int, timestamp: int = 0,
+                 status_class: Optional[int] = None, probability: Optional[float] = None,
+                 risk_level: str = "") -> bytes:
+    """
+    Encode one tick as a binary frame.
+
+    window is the current [n_samples, n_channels] window; new_samples is how many of its
+    trailing rows were appended since the previous frame (used for delta frames).
+    """
+    if fmt.delta:
+        if new_samples % fmt.decimation:
+            raise ValueError(f"new_samples ({new_samples}) is not a multiple of decimate ({fmt.decimation})")
+        samples = window[len(window) - new_samples:]  # window[-0:] would be the whole window
+    else:
+        samples = window
+    samples = decimate_for_display(samples, fmt.decimation)
+
+    scale = 1.0
+    if fmt.dtype == "int16":
+        finite = np.isfinite(samples)
+        max_abs = float(np.max(np.abs(samples), where=finite, initial=0.0))
+        scale = max_abs / 32767 if max_abs > 0 else 1.0
+        payload = np.clip(np.nan_to_num(samples / scale, nan=0.0), -32767, 32767).round().astype("<i2")
+    else:
+        payload = samples.astype("<f4")
+
+    payload = payload.tobytes()
+    flags = 0
+    if fmt.delta:
+        flags |= FLAG_DELTA
+    if fmt.compress:
+        payload = zlib.compress(payload, 1)
+        flags |= FLAG_ZLIB
+
+    header = HEADER.pack(
+        MAGIC, PROTOCOL_VERSION, DTYPES[fmt.dtype], flags,
+        -1 if status_class is None else status_class,
+        RISK_LEVELS.index(risk_level) if risk_level in RISK_LEVELS else 0,
+        0,
+        timestamp,
+        samples.shape[0], samples.shape[1], fmt.decimation,
+        float("nan") if probability is None else probability,
+        scale,
+    )
+    return header + payload
+
+def decode_frame(frame: bytes) -> Dict[str, Any]:
+    """Decode a binary frame back into its header fields and a float32 [n_samples, n_channels] array."""
+    (magic, version, dtype_code, flags, status_class, risk_code, _, timestamp,
+     n_samples, n_channels, decimation, probability, scale) = HEADER.unpack_from(frame)
+    if magic != MAGIC or version != PROTOCOL_VERSION:
+        raise ValueError("Not an EEG stream frame or unsupported protocol version")
+
+    payload = frame[HEADER_SIZE:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+
+    if dtype_code == DTYPES["int16"]:
+        samples = np.frombuffer(payload, dtype="<i2").astype(np.float32) * np.float32(scale)
+    else:
+        samples = np.frombuffer(payload, dtype="<f4")
+
+    return {
+        "timestamp": timestamp,
+        "status_class": None if status_class == -1 else status_class,
+        "probability": None if np.isnan(probability) else float(probability),
+        "risk_level": RISK_LEVELS[risk_code],
+        "delta": bool(flags & FLAG_DELTA),
+        "decimation": decimation,
+        "samples": samples.reshape(n_samples, n_channels),
+    }
+
+def handshake_message(fmt: StreamFormat, fs: int, n_channels: int) -> str:
+    return json.dumps(fmt.handshake(fs, n_channels))
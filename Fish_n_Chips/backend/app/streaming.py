@@ -0,0 +1,171 @@
+"""
+Incremental feature extraction for live EEG streams.
+
+A StreamingFeatureEngine keeps the last window of samples for one connection
+and caches the pieces of extract_features_from_segment that do not change as
+the window slides: the FFT of each 2 s Welch segment and the moment sums of
+each 1 s block. When a tick adds one second of data, only the newest segment
+and block are computed; the window features are combined from the cached
+ones. Per-tick cost is therefore proportional to the new data rather than
+the window size. The cached segment FFTs also give the cross-spectra for the
+band coherence of feature set 2.
+"""
+import numpy as np
+from scipy.signal import get_window
+from typing import Dict, Tuple
+
+from .feature_extraction import (
+    DEFAULT_FEATURE_SET, FEATURES_PER_CHANNEL, bandpowers_from_psd, check_feature_set, coherence_from_spectra,
+    correlation_features, moments_from_sums, psd_from_spectra
+)
+
+# (count, mean, m2, m3, m4, max_abs) per channel
+BlockMoments = Tuple[float, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+def _block_moments(block: np.ndarray) -> BlockMoments:
+    """Moment sums of a [n_samples, n_channels] block, per channel."""
+    x = np.ascontiguousarray(block.T)
+    n = float(x.shape[-1])
+    mean = x.sum(axis=-1) / n
+    adjusted = x - mean[:, None]
+    adjusted2 = adjusted * adjusted
+    return (
+        n,
+        mean,
+        adjusted2.sum(axis=-1),
+        (adjusted2 * adjusted).sum(axis=-1),
+        (adjusted2 * adjusted2).sum(axis=-1),
+        np.abs(x).max(axis=-1),
+    )
+
+def _combine_moments(a: BlockMoments, b: BlockMoments) -> BlockMoments:
+    """
+    Merge the moment sums of two adjacent blocks (pairwise update of
+    Chan et al. / Pebay), so window moments never revisit old samples.
+    """
+    n_a, mean_a, m2_a, m3_a, m4_a, max_a = a
+    n_b, mean_b, m2_b, m3_b, m4_b, max_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    delta2 = delta * delta
+
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta2 * n_a * n_b / n
+    m3 = (m3_a + m3_b
+          + delta2 * delta * n_a * n_b * (n_a - n_b) / n ** 2
+          + 3 * delta * (n_a * m2_b - n_b * m2_a) / n)
+    m4 = (m4_a + m4_b
+          + delta2 * delta2 * n_a * n_b * (n_a ** 2 - n_a * n_b + n_b ** 2) / n ** 3
+          + 6 * delta2 * (n_a ** 2 * m2_b + n_b ** 2 * m2_a) / n ** 2
+          + 4 * delta * (n_a * m3_b - n_b * m3_a) / n)
+
+    return n, mean, m2, m3, m4, np.maximum(max_a, max_b)
+
+class StreamingFeatureEngine:
+    """
+    Per-connection sliding window over a live EEG stream.
+
+    push() appends [n_samples, n_channels] blocks as they arrive; features()
+    returns the same feature vector as extract_features_from_segment on the
+    last window_size_sec of data (up to floating point rounding).
+    """
+
+    def __init__(self, n_channels: int = 16, fs: int = 256, window_size_sec: int = 4):
+        self.n_channels = n_channels
+        self.fs = fs
+        self.window_size = window_size_sec * fs
+        self.nperseg = fs * 2 # 2 second window for Welch, as in compute_bandpower
+        self.segment_step = self.nperseg // 2 # welch's default 50% overlap
+        self.total_samples = 0
+
+        # Welch defaults: periodic Hann taper, constant detrend
+        self._taper = get_window("hann", self.nperseg)
+
+        # Linear buffer of twice the window: writes append, and the last window is
+        # moved back to the front when it fills up, so the current window is
+        # always one contiguous slice without copying on every push.
+        self._buffer = np.zeros((2 * self.window_size, n_channels))
+        self._pos = 0
+
+        # Keyed by absolute sample index of the segment/block start
+        self._spectra: Dict[int, np.ndarray] = {}
+        self._block_stats: Dict[int, BlockMoments] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.total_samples >= self.window_size
+
+    def push(self, samples: np.ndarray):
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.ndim != 2 or samples.shape[1] != self.n_channels:
+            raise ValueError(f"Expected samples of shape [n, {self.n_channels}], got {samples.shape}")
+
+        n = len(samples)
+        if n >= self.window_size:
+            self._buffer[:self.window_size] = samples[-self.window_size:]
+            self._pos = self.window_size
+        else:
+            if self._pos + n > len(self._buffer):
+                keep = min(self._pos, self.window_size)
+                self._buffer[:keep] = self._buffer[self._pos - keep:self._pos]
+                self._pos = keep
+            self._buffer[self._pos:self._pos + n] = samples
+            self._pos += n
+
+        self.total_samples += n
+
+    def _spectrum(self, segment: np.ndarray) -> np.ndarray:
+        """FFT of one tapered Welch segment of a [n_channels, nperseg] array."""
+        detrended = segment - segment.mean(axis=-1, keepdims=True)
+        return np.fft.rfft(detrended * self._taper, axis=-1)
+
+    def window(self) -> np.ndarray:
+        """The current window as a [window_size, n_channels] view."""
+        filled = min(self.total_samples, self.window_size)
+        return self._buffer[self._pos - filled:self._pos]
+
+    def features(self, feature_set: int = DEFAULT_FEATURE_SET) -> np.ndarray:
+        check_feature_set(feature_set)
+        if not self.ready:
+            raise ValueError(f"Need {self.window_size} samples before extracting features, have {self.total_samples}")
+
+        window = self.window()
+        start = self.total_samples - self.window_size
+
+        # Welch PSD = mean of the per-segment periodograms; only new segments are transformed
+        spectra = []
+        for offset in range(0, self.window_size - self.nperseg + 1, self.segment_step):
+            key = start + offset
+            if key not in self._spectra:
+                segment = np.ascontiguousarray(window[offset:offset + self.nperseg].T)
+                self._spectra[key] = self._spectrum(segment)
+            spectra.append(self._spectra[key])
+        spectra = np.stack(spectra, axis=-2) # [n_channels, n_segments, n_freqs]
+        psd = psd_from_spectra(spectra, self.fs, self.nperseg)
+
+        # Window moments merged from per-block sums; only new blocks are computed
+        stats = None
+        for offset in range(0, self.window_size, self.segment_step):
+            key = start + offset
+            if key not in self._block_stats:
+                self._block_stats[key] = _block_moments(window[offset:offset + self.segment_step])
+            block = self._block_stats[key]
+            stats = block if stats is None else _combine_moments(stats, block)
+
+        # Drop cache entries that slid out of the window
+        for cache in (self._spectra, self._block_stats):
+            for key in [k for k in cache if k < start]:
+                del cache[key]
+
+        features = np.concatenate([
+            moments_from_sums(*stats),
+            bandpowers_from_psd(psd, self.fs, self.nperseg),
+        ], axis=-1).reshape(self.n_channels * FEATURES_PER_CHANNEL)
+        if feature_set == 1:
+            return features
+
+        return np.concatenate([
+            features,
+            correlation_features(np.ascontiguousarray(window.T)[np.newaxis])[0],
+            coherence_from_spectra(spectra[np.newaxis], self.fs, self.nperseg)[0],
+        ])
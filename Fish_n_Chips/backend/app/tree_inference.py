@@ -0,0 +1,171 @@
+"""
+Compiled inference for the tree-ensemble models (RandomForest, ExtraTrees,
+GradientBoosting) used by the EEG and speech scorers.
+
+sklearn's predict/predict_proba pay input validation and, for forests,
+joblib dispatch on every call, which dominates single-row latency. At load
+time the fitted trees are flattened into one set of contiguous node arrays
+(feature, threshold, children, leaf values); all trees are then walked
+together, one NumPy step per tree level, and probabilities come out of a
+single pass. The predicted class is the argmax of those probabilities, as
+in sklearn.
+
+Models that are not tree ensembles (e.g. the LogisticRegression pipeline)
+are returned unchanged by compile_model, so callers can use the result the
+same way either way. So are gradient boosting models whose probabilities
+are not the sigmoid/softmax of the raw score (any loss but log_loss) or
+whose init estimator depends on the input (a custom init).
+"""
+import numpy as np
+from scipy.special import expit, softmax
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+
+FOREST_TYPES = (RandomForestClassifier, ExtraTreesClassifier)
+# Losses whose predict_proba is expit (binary) / softmax (multiclass) of the raw score
+GRADIENT_BOOSTING_LOSSES = ("log_loss", "deviance")
+# Init estimators whose raw score is a constant (class prior or zero)
+GRADIENT_BOOSTING_INITS = (None, "zero")
+
+class CompiledTreeEnsemble:
+    """
+    Flattened tree ensemble with the predict/predict_proba/classes_ interface of
+    the sklearn model it was built from.
+
+    Node arrays are indexed by a global node id; every tree's root id is kept in
+    roots. Leaves point to themselves, so walking max_depth levels leaves each
+    tree at its leaf whatever its own depth.
+    """
+
+    def __init__(self, trees, leaf_values, n_outputs: int, classes, n_features: int, kind: str, init_raw=None):
+        """
+        leaf_values[i](tree) gives tree i's [node_count, n_outputs] contribution
+        per node (only leaf rows are ever used).
+        """
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        n_nodes = sum(tree.node_count for tree in trees)
+
+        self.feature = np.zeros(n_nodes, dtype=np.intp)
+        self.threshold = np.full(n_nodes, np.inf)
+        self.children = np.empty((n_nodes, 2), dtype=np.intp)
+        self.values = np.zeros((n_nodes, n_outputs))
+        self.roots = offsets.astype(np.intp)
+
+        for tree, offset, leaf_value in zip(trees, offsets, leaf_values):
+            nodes = slice(offset, offset + tree.node_count)
+            is_leaf = tree.children_left < 0
+            own = np.arange(offset, offset + tree.node_count)
+
+            self.feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            self.threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+            self.children[nodes, 0] = np.where(is_leaf, own, tree.children_left + offset)
+            self.children[nodes, 1] = np.where(is_leaf, own, tree.children_right + offset)
+            self.values[nodes] = leaf_value(tree)
+
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.kind = kind
+        self.init_raw = init_raw
+
+    @classmethod
+    def from_forest(cls, model) -> "CompiledTreeEnsemble":
+        n_classes = len(model.classes_)
+
+        def leaf_proba(tree):
+            # Per-leaf class distribution, as DecisionTreeClassifier.predict_proba normalises it
+            value = tree.value[:, 0, :n_classes]
+            total = value.sum(axis=1, keepdims=True)
+            return value / np.where(total == 0, 1, total)
+
+        trees = [est.tree_ for est in model.estimators_]
+        return cls(trees, [leaf_proba] * len(trees), n_classes, model.classes_, model.n_features_in_, "forest")
+
+    @staticmethod
+    def supports_gradient_boosting(model) -> bool:
+        """True if the compiled sigmoid/softmax gives model's probabilities."""
+        return model.loss in GRADIENT_BOOSTING_LOSSES and any(model.init is init or model.init == init
+                                                              for init in GRADIENT_BOOSTING_INITS)
+
+    @classmethod
+    def from_gradient_boosting(cls, model) -> "CompiledTreeEnsemble":
+        if not cls.supports_gradient_boosting(model):
+            raise ValueError(f"only loss in {GRADIENT_BOOSTING_LOSSES} with init in {GRADIENT_BOOSTING_INITS} can be compiled")
+        n_stages, n_columns = model.estimators_.shape
+        rate = model.learning_rate
+
+        def stage_value(k):
+            def value(tree):
+                out = np.zeros((tree.node_count, n_columns))
+                out[:, k] = rate * tree.value[:, 0, 0]
+                return out
+            return value
+
+        trees, leaf_values = [], []
+        for stage in range(n_stages):
+            for k in range(n_columns):
+                trees.append(model.estimators_[stage, k].tree_)
+                leaf_values.append(stage_value(k))
+
+        compiled = cls(trees, leaf_values, n_columns, model.classes_, model.n_features_in_, "gradient_boosting",
+                       np.zeros(n_columns))
+        # The init estimator's raw score does not depend on the input (class prior or zero),
+        # so it is the public decision_function minus the summed tree outputs at any point
+        probe = np.zeros((1, model.n_features_in_), dtype=np.float32)
+        tree_raw = compiled.values[compiled.leaves(probe)].sum(axis=1)[0]
+        compiled.init_raw = np.reshape(model.decision_function(probe), -1) - tree_raw
+        return compiled
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Global leaf id reached by every row in every tree, [n_rows, n_trees]."""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape [n, {self.n_features_in_}], got {X.shape}")
+
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_right = X[rows, self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[nodes, go_right.view(np.int8)]
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        total = self.values[self.leaves(X)].sum(axis=1)
+        if self.kind == "forest":
+            return total / len(self.roots)
+
+        raw = total + self.init_raw
+        if raw.shape[1] == 1:
+            positive = expit(raw[:, 0])
+            return np.column_stack([1 - positive, positive])
+        return softmax(raw, axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def compile_model(model):
+    """
+    Compile a fitted tree ensemble for fast inference. Anything else (or an
+    ensemble that cannot be flattened) is returned as is.
+    """
+    try:
+        if isinstance(model, FOREST_TYPES) and model.n_outputs_ == 1:
+            return CompiledTreeEnsemble.from_forest(model)
+        if isinstance(model, GradientBoostingClassifier) and CompiledTreeEnsemble.supports_gradient_boosting(model):
+            return CompiledTreeEnsemble.from_gradient_boosting(model)
+    except Exception as e:
+        print(f"⚠️ Could not compile {type(model).__name__}, using sklearn inference: {e}")
+    return model
+
+def check_parity(model, X: np.ndarray, atol: float = 1e-9) -> float:
+    """
+    Compare compiled and sklearn probabilities on X. Returns the largest absolute
+    difference; raises AssertionError if it exceeds atol or a class differs.
+    """
+    compiled = compile_model(model)
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    diff = float(np.max(np.abs(actual - expected)))
+    assert diff <= atol, f"probabilities differ by {diff}"
+    assert np.array_equal(compiled.predict(X), model.predict(X)), "predicted classes differ"
+    return diff
@@ -0,0 +1,173 @@
+"""
+Benchmark the EEG pipeline stage by stage on a synthetic recording.
+
+Generates a recording with generate_test_eeg (16 channels, as the model
+expects), writes it as CSV, EDF and NumPy, and times each stage the
+upload endpoints go through:
+
+    load_npy          np.load of the float32 recording (I/O reference)
+    parse_csv         parse_csv on the CSV text
+    parse_edf         parse_edf on an EDF already at 256 Hz
+    parse_edf_resample  parse_edf on an EDF at --source-fs (decode + resampling)
+    resample          polyphase resampling of the --source-fs array to 256 Hz
+    features          extract_features_from_segment on every 4 s window (2 s step)
+    features_batch    extract_features_batch on the same windows
+    inference         one registry score call for all window features
+
+Throughput is reported in samples/sec, where a sample is one time point
+of the 256 Hz recording across all channels (so stages that resample are
+credited with their output, not their input). Each stage is timed
+best-of --repeat.
+
+Baselines: --save-baseline writes the throughputs to --baseline (JSON).
+Later runs with the same configuration compare against it and exit with
+status 1 if any stage is slower than the baseline by more than
+--tolerance. Baselines are machine specific; save one on the machine
+that runs the comparison.
+
+The benchmark times the modules of the tree it runs in, so it can only
+judge changes made after it was added (older trees lack the modules it
+imports). To judge a change, save a baseline on its parent commit, then
+check out the change and compare; the baseline file is untracked, so it
+survives the checkout:
+
+    git checkout <change>~1
+    python bench_eeg_pipeline.py --save-baseline
+    git checkout <change>
+    python bench_eeg_pipeline.py
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.app.data_processing import TARGET_SFREQ, parse_csv, parse_edf
+from backend.app.feature_extraction import extract_features_batch, extract_features_from_segment, sliding_windows
+from backend.app.model_registry import eeg_registry
+from backend.app.resampling import resample
+from generate_test_eeg import channel_names, synthetic_eeg, write_csv, write_edf, write_npy
+
+N_CHANNELS = 16
+WINDOW_SIZE_SEC = 4
+STEP_SIZE_SEC = 2
+DEFAULT_BASELINE = "bench_eeg_baseline.json"
+
+def best_of(fn, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def run_stages(minutes: float, source_fs: int, repeat: int, workdir: str) -> dict:
+    """seconds per stage, plus the number of samples each stage processed."""
+    duration = minutes * 60
+    data = synthetic_eeg(duration, TARGET_SFREQ, N_CHANNELS)
+    source = synthetic_eeg(duration, source_fs, N_CHANNELS)
+    names = channel_names(N_CHANNELS)
+    n_samples = len(data)
+
+    csv_path = os.path.join(workdir, "eeg.csv")
+    edf_path = os.path.join(workdir, "eeg.edf")
+    source_edf_path = os.path.join(workdir, f"eeg_{source_fs}.edf")
+    npy_path = os.path.join(workdir, "eeg.npy")
+    write_csv(csv_path, data, names)
+    write_edf(edf_path, data, TARGET_SFREQ, names)
+    write_edf(source_edf_path, source, source_fs, names)
+    write_npy(npy_path, data)
+
+    with open(csv_path) as f:
+        csv_text = f.read()
+    with open(edf_path, "rb") as f:
+        edf_bytes = f.read()
+    with open(source_edf_path, "rb") as f:
+        source_edf_bytes = f.read()
+
+    results = {}
+
+    def stage(name: str, fn, samples: int = n_samples):
+        seconds, result = best_of(fn, repeat)
+        results[name] = {"seconds": seconds, "samples": samples}
+        return result
+
+    stage("load_npy", lambda: np.load(npy_path))
+    recording = stage("parse_csv", lambda: parse_csv(csv_text))
+    stage("parse_edf", lambda: parse_edf(edf_bytes))
+    stage("parse_edf_resample", lambda: parse_edf(source_edf_bytes))
+    stage("resample", lambda: resample(source, source_fs, TARGET_SFREQ))
+
+    windows = sliding_windows(recording, WINDOW_SIZE_SEC, STEP_SIZE_SEC, TARGET_SFREQ)
+    stage("features", lambda: np.stack([extract_features_from_segment(w, fs=TARGET_SFREQ) for w in windows]))
+    features = stage("features_batch", lambda: extract_features_batch(windows, fs=TARGET_SFREQ))
+
+    if eeg_registry.ensure_loaded() is not None:
+        stage("inference", lambda: eeg_registry.score(features))
+    else:
+        print(f"⚠️ No EEG model in {eeg_registry.directory} or at {eeg_registry.legacy_path}, skipping inference")
+
+    return results
+
+def throughput(stage: dict) -> float:
+    return stage["samples"] / stage["seconds"]
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Names of the stages slower than baseline by more than tolerance."""
+    regressions = []
+    for name, stage in results.items():
+        expected = baseline.get(name)
+        if expected is not None and throughput(stage) < expected * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the EEG pipeline stages on a synthetic recording")
+    parser.add_argument("--minutes", type=float, default=10, help="Recording length")
+    parser.add_argument("--source-fs", type=int, default=512, help="Sampling rate of the EDF that needs resampling")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a stage fails (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    config = {"minutes": args.minutes, "source_fs": args.source_fs, "channels": N_CHANNELS}
+    print(f"📊 EEG pipeline: {args.minutes:g} min x {N_CHANNELS} ch at {TARGET_SFREQ} Hz "
+          f"(resampling from {args.source_fs} Hz), best of {args.repeat}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_stages(args.minutes, args.source_fs, args.repeat, workdir)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get("config") == config:
+            baseline = stored["throughput"]
+        else:
+            print(f"⚠️ Baseline in {args.baseline} was recorded with {stored.get('config')}, not comparing")
+
+    print(f"\n   {'stage':<20}{'ms':>10}{'samples/sec':>16}{'vs baseline':>14}")
+    for name, stage in results.items():
+        line = f"   {name:<20}{stage['seconds'] * 1000:10.1f}{throughput(stage):16,.0f}"
+        if baseline and name in baseline:
+            line += f"{throughput(stage) / baseline[name]:13.2f}x"
+        print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "throughput": {name: throughput(stage) for name, stage in results.items()}}, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        raise SystemExit(0)
+
+    if baseline is None:
+        print(f"\nℹ️ No baseline to compare against; run with --save-baseline to create {args.baseline}")
+        raise SystemExit(0)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        raise SystemExit(1)
+    print(f"\n✅ No stage slower than baseline by more than {args.tolerance:.0%}")
@@ -0,0 +1,146 @@
+"""
+Benchmark and accuracy check of the pitch engines (backend/app/services/speech/pitch.py).
+
+Each stimulus sentence is synthesized as a voiced utterance with a known F0
+contour: one harmonic syllable per word (a falling, slightly wobbling
+contour between --f0-low and --f0-high), short pauses between words and a
+noise floor. Every engine is timed on every sentence and scored against the
+true F0:
+
+    voicing recall   true voiced frames the engine also calls voiced
+    false voicing    true unvoiced frames the engine calls voiced
+    median error     median |error| in cents on frames voiced in both
+    gross errors     frames off by more than 20% (octave jumps and the like)
+    pitch_mean       the value extract_acoustic_features reports, vs the truth
+
+With --audio-dir, real recordings (wav/webm/...) are also compared, with
+pyin as the reference since their true F0 is unknown.
+
+Usage:
+    python bench_pitch.py
+    python bench_pitch.py --audio-dir recordings/ --repeat 3
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from backend.app.services.speech.audio_context import CANONICAL_SAMPLE_RATE, AudioContext
+from backend.app.services.speech.pitch import HOP_LENGTH, PITCH_ENGINES, estimate_pitch
+from backend.app.services.speech.stimuli import STIMULUS_SENTENCES
+
+def synthesize(sentence: str, f0_low: float, f0_high: float, rng, sr: int = CANONICAL_SAMPLE_RATE):
+    """(audio, true F0 per sample with NaN when unvoiced) for one spoken-like sentence."""
+    words = sentence.split()
+    pieces, contour = [], []
+
+    def silence(seconds: float):
+        n = int(seconds * sr)
+        pieces.append(np.zeros(n))
+        contour.append(np.full(n, np.nan))
+
+    silence(0.3)
+    start_f0 = rng.uniform(f0_low + 0.4 * (f0_high - f0_low), f0_high)
+    for i, word in enumerate(words):
+        n = int((0.12 + 0.045 * len(word)) * sr)
+        t = np.arange(n) / sr
+        # Declination across the sentence, a small rise-fall per word and some vibrato
+        base = start_f0 - (start_f0 - f0_low) * 0.6 * i / max(len(words) - 1, 1)
+        f0 = base * (1 + 0.06 * np.sin(np.pi * t / t[-1]) + 0.01 * np.sin(2 * np.pi * 5.5 * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        harmonics = sum(np.sin(k * phase + rng.uniform(0, 2 * np.pi)) / k ** 1.3 for k in range(1, 12))
+        envelope = np.sin(np.pi * np.arange(n) / n) ** 0.4
+        pieces.append(0.25 * harmonics * envelope)
+        contour.append(np.where(envelope > 0.3, f0, np.nan))
+        silence(rng.uniform(0.08, 0.25))
+    silence(0.3)
+
+    audio = np.concatenate(pieces)
+    audio += rng.normal(0, 0.002, size=len(audio))
+    return audio.astype(np.float32), np.concatenate(contour)
+
+def frame_truth(contour: np.ndarray, n_frames: int) -> np.ndarray:
+    """True F0 at each frame centre (centered frames, one per HOP_LENGTH samples)."""
+    centres = np.minimum(np.arange(n_frames) * HOP_LENGTH, len(contour) - 1)
+    return contour[centres]
+
+def compare(f0: np.ndarray, reference: np.ndarray) -> dict:
+    voiced, ref_voiced = ~np.isnan(f0), ~np.isnan(reference)
+    both = voiced & ref_voiced
+    cents = 1200 * np.abs(np.log2(f0[both] / reference[both]))
+    ratio = np.abs(f0[both] / reference[both] - 1)
+    return {
+        "recall": both.sum() / max(ref_voiced.sum(), 1),
+        "false": (voiced & ~ref_voiced).sum() / max((~ref_voiced).sum(), 1),
+        "median_cents": float(np.median(cents)) if len(cents) else float("nan"),
+        "gross": float(np.mean(ratio > 0.2)) if len(ratio) else float("nan"),
+    }
+
+def timed(audio: AudioContext, engine: str, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        f0, _ = estimate_pitch(audio, engine)
+        best = min(best, time.perf_counter() - started)
+    return best, f0
+
+def report(rows: dict, label: str):
+    print(f"\n   {label}")
+    print(f"   {'engine':<8}{'ms/sentence':>12}{'recall':>9}{'false':>8}{'median ¢':>10}{'gross':>8}{'pitch_mean Δ':>14}")
+    for engine, r in rows.items():
+        print(f"   {engine:<8}{np.mean(r['ms']):12.1f}{np.mean(r['recall']):9.1%}{np.mean(r['false']):8.1%}"
+              f"{np.nanmean(r['median_cents']):10.1f}{np.nanmean(r['gross']):8.1%}{np.mean(r['mean_diff']):13.2f}%")
+
+def new_rows():
+    return {engine: {key: [] for key in ("ms", "recall", "false", "median_cents", "gross", "mean_diff")}
+            for engine in PITCH_ENGINES}
+
+def record(row: dict, seconds: float, f0: np.ndarray, reference: np.ndarray):
+    row["ms"].append(seconds * 1000)
+    for key, value in compare(f0, reference).items():
+        row[key].append(value)
+    ref_mean = np.nanmean(reference)
+    row["mean_diff"].append(abs(np.nanmean(f0) - ref_mean) / ref_mean * 100 if np.any(~np.isnan(f0)) else 100.0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare pitch engines on the stimulus sentences")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per sentence (best is kept)")
+    parser.add_argument("--voices", type=int, default=3, help="Synthetic takes per sentence")
+    parser.add_argument("--f0-low", type=float, default=85, help="Lowest F0 of the synthetic voices (Hz)")
+    parser.add_argument("--f0-high", type=float, default=260, help="Highest F0 of the synthetic voices (Hz)")
+    parser.add_argument("--audio-dir", help="Directory of real recordings to compare against pyin")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # First call pays librosa's lazy imports and JIT compilation; keep it out of the timings
+    for engine in PITCH_ENGINES:
+        estimate_pitch(AudioContext(np.zeros(CANONICAL_SAMPLE_RATE, dtype=np.float32), CANONICAL_SAMPLE_RATE), engine)
+
+    print(f"📊 Pitch engines on {len(STIMULUS_SENTENCES)} stimulus sentences x {args.voices} synthetic voices "
+          f"({args.f0_low:g}-{args.f0_high:g} Hz, {CANONICAL_SAMPLE_RATE} Hz audio), best of {args.repeat}")
+
+    rows = new_rows()
+    for _ in range(args.voices):
+        for sentence in STIMULUS_SENTENCES:
+            y, contour = synthesize(sentence, args.f0_low, args.f0_high, rng)
+            audio = AudioContext(y, CANONICAL_SAMPLE_RATE)
+            for engine in PITCH_ENGINES:
+                seconds, f0 = timed(audio, engine, args.repeat)
+                record(rows[engine], seconds, f0, frame_truth(contour, len(f0)))
+    report(rows, "vs true F0")
+
+    if args.audio_dir:
+        paths = sorted(p for p in glob.glob(os.path.join(args.audio_dir, "*")) if os.path.isfile(p))
+        real = new_rows()
+        for path in paths:
+            audio = AudioContext.from_file(path)
+            _, reference = timed(audio, "pyin", 1)
+            for engine in PITCH_ENGINES:
+                seconds, f0 = timed(audio, engine, args.repeat)
+                record(real[engine], seconds, f0, reference)
+        report(real, f"vs pyin on {len(paths)} recordings from {args.audio_dir}")
+
+    speedup = np.mean(rows["pyin"]["ms"]) / np.mean(rows["yin"]["ms"])
+    print(f"\n⚡ yin is {speedup:.0f}x faster than pyin per sentence")
@@ -0,0 +1,75 @@
+"""
+Benchmark EDF resampling to 256 Hz: the previous FFT path (mne.filter.resample
+over the whole recording, as raw.resample does) against the polyphase
+resampler, both on the whole array and chunk-wise as parse_edf uses it.
+
+Usage:
+    python bench_resampling.py --minutes 30 --rates 500 1000
+"""
+import argparse
+import time
+
+import mne
+import numpy as np
+
+from backend.app.data_processing import TARGET_SFREQ
+from backend.app.resampling import StreamingResampler, design_filter, resample
+
+def fft_resample(data: np.ndarray, sfreq: float) -> np.ndarray:
+    return mne.filter.resample(np.ascontiguousarray(data.T), up=TARGET_SFREQ, down=sfreq, npad="auto", verbose=False).T
+
+def streaming_resample(data: np.ndarray, sfreq: float, chunk: int) -> np.ndarray:
+    resampler = StreamingResampler(sfreq, TARGET_SFREQ, data.shape[1])
+    parts = [resampler.push(data[i:i + chunk]) for i in range(0, len(data), chunk)]
+    parts.append(resampler.flush())
+    return np.concatenate(parts)
+
+def best_of(fn, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare FFT and polyphase resampling of EEG recordings")
+    parser.add_argument("--minutes", type=float, default=30, help="Recording length")
+    parser.add_argument("--channels", type=int, default=16)
+    parser.add_argument("--rates", type=float, nargs="+", default=[500, 1000], help="Source sampling rates (Hz)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for sfreq in args.rates:
+        n_samples = int(args.minutes * 60 * sfreq)
+        # EEG-like content: a few rhythms between 1 and 40 Hz per channel, so the
+        # exact 256 Hz signal is known and each method's error can be measured
+        freqs = rng.uniform(1, 40, size=(4, args.channels))
+        phases = rng.uniform(0, 2 * np.pi, size=(4, args.channels))
+
+        def rhythms(fs: float, n: int) -> np.ndarray:
+            t = np.arange(n)[:, None] / fs
+            return sum(np.sin(2 * np.pi * f * t + p) for f, p in zip(freqs, phases)) * 20e-6
+
+        data = rhythms(sfreq, n_samples)
+        up, down, _ = design_filter(sfreq, TARGET_SFREQ)
+        print(f"\n📊 {sfreq:g} Hz -> {TARGET_SFREQ} Hz ({args.minutes:g} min x {args.channels} ch, up={up} down={down})")
+
+        fft_time, reference = best_of(lambda: fft_resample(data, sfreq), args.repeat)
+        poly_time, poly = best_of(lambda: resample(data, sfreq, TARGET_SFREQ), args.repeat)
+        # One EDF data record per second, 64 records per chunk, as parse_edf decodes them
+        stream_time, streamed = best_of(lambda: streaming_resample(data, sfreq, 64 * int(sfreq)), args.repeat)
+
+        # Error against the exact signal, ignoring 2 s at each end where both methods see edge effects
+        exact = rhythms(TARGET_SFREQ, len(poly))
+        interior = slice(2 * TARGET_SFREQ, -2 * TARGET_SFREQ)
+
+        def error(result: np.ndarray) -> float:
+            return np.max(np.abs(result[interior] - exact[interior])) / np.max(np.abs(exact))
+
+        print(f"   FFT (mne)          {fft_time * 1000:9.1f} ms")
+        print(f"   polyphase          {poly_time * 1000:9.1f} ms  ({fft_time / poly_time:.1f}x)")
+        print(f"   polyphase chunked  {stream_time * 1000:9.1f} ms  ({fft_time / stream_time:.1f}x)")
+        print(f"   chunked == whole: {np.allclose(streamed, poly, rtol=0, atol=1e-12)}")
+        print(f"   max relative error vs exact signal: FFT {error(reference):.2e}, polyphase {error(poly):.2e}")
@@ -0,0 +1,101 @@
+"""
+Startup-time report for the speech linguistic stage (spaCy).
+
+Each measurement runs in a fresh interpreter so import costs are real:
+
+    import     importing feature_extractor (spaCy is no longer imported here)
+    eager      the old start-up: import spaCy and load the full pipeline
+    lazy       the first extract_linguistic_features call (trimmed pipeline)
+    per call   extract_linguistic_features on the stimulus sentences, full vs trimmed
+    batch      extract_linguistic_features_batch (nlp.pipe) vs one call per text
+
+Usage:
+    python bench_speech_startup.py [--texts 2000] [--model en_core_web_sm]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROBES = {
+    "import": """
+started = time.perf_counter()
+import backend.app.services.speech.feature_extractor as fe
+result = {"ms": (time.perf_counter() - started) * 1000, "spacy_imported": "spacy" in sys.modules}
+""",
+    "eager": """
+started = time.perf_counter()
+import spacy
+try:
+    nlp = spacy.load(MODEL)
+except OSError:
+    nlp = spacy.blank("en")
+loaded = time.perf_counter()
+docs = [nlp(text) for text in STIMULUS_SENTENCES]
+best = min(timed(lambda: [nlp(text) for text in STIMULUS_SENTENCES]) for _ in range(5))
+result = {"ms": (loaded - started) * 1000, "components": nlp.pipe_names,
+          "per_call_ms": best * 1000 / len(STIMULUS_SENTENCES)}
+""",
+    "lazy": """
+import backend.app.services.speech.feature_extractor as fe
+started = time.perf_counter()
+fe.extract_linguistic_features(STIMULUS_SENTENCES[0])
+first = time.perf_counter()
+best = min(timed(lambda: [fe.extract_linguistic_features(text) for text in STIMULUS_SENTENCES]) for _ in range(5))
+result = {"ms": (first - started) * 1000, "components": fe.get_nlp().pipe_names,
+          "per_call_ms": best * 1000 / len(STIMULUS_SENTENCES)}
+""",
+    "batch": """
+import backend.app.services.speech.feature_extractor as fe
+texts = (STIMULUS_SENTENCES * (N_TEXTS // len(STIMULUS_SENTENCES) + 1))[:N_TEXTS]
+fe.get_nlp()
+single = timed(lambda: [fe.extract_linguistic_features(text) for text in texts])
+batched = timed(lambda: fe.extract_linguistic_features_batch(texts))
+assert fe.extract_linguistic_features_batch(texts[:10]) == [fe.extract_linguistic_features(t) for t in texts[:10]]
+result = {"single_ms": single * 1000, "batch_ms": batched * 1000}
+""",
+}
+
+PRELUDE = """
+import contextlib, io, json, sys, time
+from backend.app.services.speech.stimuli import STIMULUS_SENTENCES
+MODEL, N_TEXTS = {model!r}, {n_texts}
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+with contextlib.redirect_stdout(io.StringIO()):
+{body}
+print(json.dumps(result))
+"""
+
+def probe(name: str, model: str, n_texts: int) -> dict:
+    body = "\n".join("    " + line for line in PROBES[name].strip().splitlines())
+    code = PRELUDE.format(model=model, n_texts=n_texts, body=body)
+    env = {**os.environ, "SPEECH_SPACY_MODEL": model}
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if output.returncode != 0:
+        raise RuntimeError(f"{name} probe failed:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the spaCy start-up cost of the speech pipeline")
+    parser.add_argument("--model", default=os.getenv("SPEECH_SPACY_MODEL", "en_core_web_sm"))
+    parser.add_argument("--texts", type=int, default=2000, help="Texts for the batch comparison")
+    args = parser.parse_args()
+
+    imported, eager, lazy, batch = (probe(name, args.model, args.texts) for name in ("import", "eager", "lazy", "batch"))
+
+    print(f"📊 spaCy start-up report ({args.model})")
+    print(f"   Import feature_extractor:   {imported['ms']:8.0f} ms (spaCy imported: {imported['spacy_imported']})")
+    print(f"   Old eager import + load:    {eager['ms']:8.0f} ms  [{', '.join(eager['components']) or 'tokenizer only'}]")
+    print(f"   Lazy first call (trimmed):  {lazy['ms']:8.0f} ms  [{', '.join(lazy['components']) or 'tokenizer only'}]")
+    print(f"   ⚡ Start-up saved: {eager['ms']:.0f} ms per process; "
+          f"first linguistic call saves {eager['ms'] - lazy['ms']:.0f} ms")
+    print(f"   Per call: full {eager['per_call_ms']:.2f} ms, trimmed {lazy['per_call_ms']:.2f} ms")
+    print(f"   {args.texts} texts: one call each {batch['single_ms']:.0f} ms, "
+          f"nlp.pipe batch {batch['batch_ms']:.0f} ms ({batch['single_ms'] / batch['batch_ms']:.1f}x)")
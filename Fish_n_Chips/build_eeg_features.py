@@ -0,0 +1,47 @@
+"""
+Build the EEG training feature store without loading EEG_data_set.csv into memory.
+
+Streams the CSV in chunks, segments it into 4 s windows with a 2 s step
+(carrying the overlap across chunk boundaries) and fans blocks of windows
+out to a process pool. Each block is written to a content-addressed float32
+shard, so re-running after an interruption or a partial dataset change only
+recomputes the missing shards. Load the result with load_feature_shards.
+
+Usage:
+    python build_eeg_features.py --csv EEG_data_set.csv --out models/eeg_features --workers 8
+"""
+import argparse
+
+from backend.app.feature_extraction import DEFAULT_FEATURE_SET, FEATURE_SETS
+from backend.app.feature_store import build_feature_store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream EEG_data_set.csv into a sharded float32 feature store")
+    parser.add_argument("--csv", default="EEG_data_set.csv", help="Labelled EEG CSV (channels + status column)")
+    parser.add_argument("--out", default="models/eeg_features", help="Output directory for the manifest and shards")
+    parser.add_argument("--window-sec", type=int, default=4)
+    parser.add_argument("--step-sec", type=int, default=2)
+    parser.add_argument("--fs", type=int, default=256)
+    parser.add_argument("--chunksize", type=int, default=100_000, help="CSV rows read per chunk")
+    parser.add_argument("--block-windows", type=int, default=512, help="Windows per shard")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--feature-set", type=int, choices=FEATURE_SETS, default=DEFAULT_FEATURE_SET,
+                        help="Feature-set version (2 adds inter-channel correlation and band coherence)")
+    args = parser.parse_args()
+
+    manifest = build_feature_store(
+        args.csv, args.out,
+        window_size_sec=args.window_sec,
+        step_size_sec=args.step_sec,
+        fs=args.fs,
+        windows_per_block=args.block_windows,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        feature_set=args.feature_set
+    )
+
+    build = manifest["last_build"]
+    print(f"✅ {manifest['n_windows']} windows in {len(manifest['shards'])} shards at {args.out}")
+    print(f"   Computed: {build['shards_computed']}, reused: {build['shards_reused']} ({build['seconds']:.1f}s)")
+    for pid, stats in build["workers"].items():
+        print(f"   Worker {pid}: {stats['windows']} windows, {stats['windows_per_sec']:.1f} windows/sec")
@@ -0,0 +1,92 @@
+"""
+Parity check for the streaming pause detector (backend/app/services/speech/pause_analyzer.py).
+
+Synthesizes recordings with known speech/silence layouts, including ones
+that open with speech, and compares StreamingPauseDetector with
+detect_pauses_from_audio:
+
+    chunking   the streaming result must be identical for every chunk size
+    batch      recordings no longer than the warm-up must give exactly the
+               batch pauses; longer ones (thresholded block by block)
+               must match them within --tolerance seconds per boundary
+               (steady background noise; when the noise level changes the
+               adaptive floor is meant to differ from the batch one)
+
+Exits with status 1 on any mismatch.
+
+Usage:
+    python check_pause_parity.py [--tolerance 0.05]
+"""
+import argparse
+import contextlib
+import io
+import sys
+
+import numpy as np
+
+from backend.app.services.speech.audio_context import CANONICAL_SAMPLE_RATE, AudioContext
+from backend.app.services.speech.pause_analyzer import StreamingPauseDetector, detect_pauses_from_audio
+
+SR = CANONICAL_SAMPLE_RATE
+CHUNK_SECONDS = (0.01, 0.1, 0.5, 1.0, 3.7, 60.0)
+
+def recording(speech_spans, duration: float, rng, noise: float = 0.002) -> np.ndarray:
+    """Background noise with voiced, amplitude-modulated bursts over speech_spans (seconds)."""
+    y = rng.normal(0, noise, int(duration * SR))
+    for start, end in speech_spans:
+        t = np.arange(int((end - start) * SR)) / SR
+        phase = 2 * np.pi * np.cumsum(130 + 20 * np.sin(2 * np.pi * 1.3 * t)) / SR
+        voice = sum(np.sin(k * phase) / k for k in range(1, 8)) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t) ** 2)
+        y[int(start * SR):int(start * SR) + len(t)] += 0.3 * voice
+    return y.astype(np.float32)
+
+def spans(pauses):
+    return [(round(p["start"], 2), round(p["end"], 2)) for p in pauses]
+
+def streamed(y: np.ndarray, chunk_seconds: float, **kwargs):
+    detector = StreamingPauseDetector(SR, **kwargs)
+    step = max(1, int(chunk_seconds * SR))
+    for i in range(0, len(y), step):
+        detector.feed(y[i:i + step])
+    return detector.finish()["pause_locations"]
+
+def within(a, b, tolerance: float) -> bool:
+    return len(a) == len(b) and all(abs(x["start"] - y["start"]) <= tolerance and abs(x["end"] - y["end"]) <= tolerance
+                                    for x, y in zip(a, b))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the streaming pause detector against the batch one")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Boundary tolerance (s) past the warm-up")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cases = {
+        "opens with speech (6 s)": recording([(0, 2), (3, 4), (5, 6)], 6, rng),
+        "opens with silence (5 s)": recording([(0.6, 1.8), (2.4, 4.6)], 5, rng),
+        "speech only (4 s)": recording([(0, 4)], 4, rng),
+        "conversation (60 s)": recording([(s, s + rng.uniform(0.8, 3)) for s in np.arange(0, 57, 4.0)], 60, rng),
+        "opens with speech (180 s)": recording([(s, s + rng.uniform(1, 3.5)) for s in np.arange(0, 177, 4.5)], 180, rng),
+    }
+
+    failures = 0
+    for name, y in cases.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = detect_pauses_from_audio(AudioContext(y, SR))["pause_locations"]
+            results = {chunk: streamed(y, chunk) for chunk in CHUNK_SECONDS}
+            no_decay = streamed(y, 0.5, noise_floor_halflife=float("inf"))
+
+        same_across_chunks = all(r == results[CHUNK_SECONDS[0]] for r in results.values())
+        short = len(y) / SR <= 10.0
+        matches_batch = results[0.5] == batch if short else within(results[0.5], batch, args.tolerance)
+        matches_no_decay = no_decay == batch if short else within(no_decay, batch, args.tolerance)
+        ok = same_across_chunks and matches_batch and matches_no_decay
+        failures += not ok
+
+        print(f"{'✅' if ok else '❌'} {name}: {len(batch)} batch pauses, "
+              f"chunk-independent={same_across_chunks}, "
+              f"{'exact' if short else f'±{args.tolerance}s'} batch match={matches_batch} (no decay: {matches_no_decay})")
+        if not ok:
+            print(f"   batch     {spans(batch)}")
+            print(f"   streaming {spans(results[0.5])}")
+
+    sys.exit(1 if failures else 0)
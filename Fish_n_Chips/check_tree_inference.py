@@ -0,0 +1,78 @@
+"""
+Parity check for the compiled tree-ensemble inference (backend/app/tree_inference.py).
+
+Loads the trained EEG and speech models, compiles them and compares
+probabilities and classes with sklearn on inputs that exercise both sides
+of the models' splits: the saved training features when available
+(models/X_features.joblib), otherwise values sampled across the range of
+each feature's split thresholds. Also reports single-row latency.
+
+Usage:
+    python check_tree_inference.py
+"""
+import os
+import time
+
+import joblib
+import numpy as np
+
+from backend.app.tree_inference import CompiledTreeEnsemble, check_parity, compile_model
+
+MODELS = {
+    "EEG": os.path.join("models", "eeg_best_model.joblib"),
+    "Speech": os.path.join("models", "speech_ml_model.joblib"),
+}
+EEG_FEATURES_PATH = os.path.join("models", "X_features.joblib")
+
+def threshold_samples(compiled: CompiledTreeEnsemble, n_rows: int, rng) -> np.ndarray:
+    """Rows drawn uniformly between each feature's smallest and largest split threshold."""
+    split = np.isfinite(compiled.threshold)
+    low = np.zeros(compiled.n_features_in_)
+    high = np.ones(compiled.n_features_in_)
+    for f in np.unique(compiled.feature[split]):
+        thresholds = compiled.threshold[split & (compiled.feature == f)]
+        margin = 0.1 * (thresholds.max() - thresholds.min()) + 1e-3
+        low[f], high[f] = thresholds.min() - margin, thresholds.max() + margin
+    return rng.uniform(low, high, size=(n_rows, compiled.n_features_in_))
+
+def single_row_latency_us(fn, row: np.ndarray, repeat: int = 200) -> float:
+    fn(row)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(row)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    failed = False
+
+    for name, path in MODELS.items():
+        if not os.path.exists(path):
+            print(f"⚠️ {name} model not found at {path}, skipping")
+            continue
+
+        model = joblib.load(path)
+        compiled = compile_model(model)
+        if compiled is model:
+            print(f"ℹ️ {name}: {type(model).__name__} is not a tree ensemble, sklearn inference is used as is")
+            continue
+
+        if name == "EEG" and os.path.exists(EEG_FEATURES_PATH):
+            X = np.asarray(joblib.load(EEG_FEATURES_PATH))[:5000]
+        else:
+            X = threshold_samples(compiled, 5000, rng)
+
+        try:
+            diff = check_parity(model, X)
+            print(f"✅ {name} ({type(model).__name__}, {len(compiled.roots)} trees): "
+                  f"{len(X)} rows match sklearn, max |Δp| = {diff:.2e}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {name}: {e}")
+
+        row = X[:1]
+        sklearn_us = single_row_latency_us(lambda r: (model.predict(r), model.predict_proba(r)), row)
+        compiled_us = single_row_latency_us(compiled.predict_proba, row)
+        print(f"   single row: sklearn predict + predict_proba {sklearn_us:,.0f} µs, compiled {compiled_us:,.0f} µs")
+
+    raise SystemExit(1 if failed else 0)
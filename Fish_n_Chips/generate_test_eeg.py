@@ -1,53 +1,115 @@
 """
-Generate a sample EEG CSV file for testing
-Creates 4 seconds of synthetic EEG data (16 channels, 256 Hz)
+Generate synthetic EEG recordings for testing and benchmarking.
+
+Each channel is a mix of delta (2 Hz), theta (6 Hz), alpha (10 Hz, dominant)
+and beta (20 Hz) rhythms with a per-channel phase shift, plus background
+noise, in microvolts. Samples are generated with whole-array NumPy
+operations, so hours of data take about as long as writing them out.
+
+Written as CSV (one column per channel, as the upload endpoint expects),
+EDF (16-bit, 1 s data records) or NumPy (.npy, float32 [samples, channels]).
+
+Usage:
+    python generate_test_eeg.py                                  # 4 s sample_eeg_test.csv
+    python generate_test_eeg.py --duration 600 --format edf --fs 512
 """
+import argparse
+import os
+
 import numpy as np
-import csv
-
-# Parameters
-sampling_rate = 256  # Hz
-duration = 4  # seconds
-n_channels = 16
-n_samples = sampling_rate * duration  # 1024 samples
-
-# Channel names (standard 10-20 system)
-channel_names = ['Fp1', 'Fp2', 'F3', 'F4', 'C3', 'C4', 'P3', 'P4',
-                 'O1', 'O2', 'F7', 'F8', 'T3', 'T4', 'T5', 'T6']
-
-# Generate synthetic EEG data
-# Real EEG is typically in the range of -100 to +100 microvolts
-# We'll generate realistic-looking signals with multiple frequency components
-np.random.seed(42)  # For reproducibility
-
-eeg_data = []
-time = np.linspace(0, duration, n_samples)
-
-for i in range(n_samples):
-    sample = []
-    for ch in range(n_channels):
-        # Mix of different frequency bands (delta, theta, alpha, beta)
-        delta = 20 * np.sin(2 * np.pi * 2 * time[i] + ch * 0.5)  # 2 Hz
-        theta = 15 * np.sin(2 * np.pi * 6 * time[i] + ch * 0.3)  # 6 Hz
-        alpha = 25 * np.sin(2 * np.pi * 10 * time[i] + ch * 0.2)  # 10 Hz (dominant)
-        beta = 10 * np.sin(2 * np.pi * 20 * time[i] + ch * 0.1)  # 20 Hz
-        noise = np.random.normal(0, 5)  # Background noise
-
-        # Combine all components
-        signal = delta + theta + alpha + beta + noise
-        sample.append(round(signal, 2))
-
-    eeg_data.append(sample)
-
-# Save to CSV
-output_file = 'sample_eeg_test.csv'
-with open(output_file, 'w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(channel_names)  # Header
-    writer.writerows(eeg_data)
-
-print(f"✅ Generated {output_file}")
-print(f"   - Channels: {n_channels}")
-print(f"   - Samples: {n_samples} ({duration} seconds at {sampling_rate} Hz)")
-print(f"   - File size: ~{len(eeg_data) * len(eeg_data[0]) * 6 / 1024:.1f} KB")
-print(f"\nYou can now upload this file to test the EEG analysis!")
+import pandas as pd
+
+from backend.app.data_processing import REQUIRED_CHANNELS
+
+# (amplitude uV, frequency Hz, phase shift per channel index)
+BANDS = [
+    (20, 2, 0.5),   # delta
+    (15, 6, 0.3),   # theta
+    (25, 10, 0.2),  # alpha (dominant)
+    (10, 20, 0.1),  # beta
+]
+NOISE_UV = 5
+
+def channel_names(n_channels: int) -> list:
+    """The model's channels in training order, then generic names for any extra channels."""
+    return REQUIRED_CHANNELS[:n_channels] + [f"EEG{i + 1}" for i in range(len(REQUIRED_CHANNELS), n_channels)]
+
+def synthetic_eeg(duration: float, fs: float = 256, n_channels: int = 16, seed: int = 42) -> np.ndarray:
+    """[samples, channels] float64 EEG-like signal in microvolts."""
+    n_samples = int(round(duration * fs))
+    rng = np.random.RandomState(seed)
+
+    time = np.linspace(0, duration, n_samples)[:, None]
+    channels = np.arange(n_channels)
+    data = rng.normal(0, NOISE_UV, size=(n_samples, n_channels)) # Background noise
+    for amplitude, freq, shift in BANDS:
+        data += amplitude * np.sin(2 * np.pi * freq * time + channels * shift)
+    return data
+
+def write_csv(path: str, data: np.ndarray, names: list):
+    pd.DataFrame(data, columns=names).to_csv(path, index=False, float_format="%.2f")
+
+def write_edf(path: str, data: np.ndarray, fs: int, names: list, unit: str = "uV"):
+    """
+    Write a 16-bit EDF file with 1 s data records (trailing partial second dropped).
+    Each channel's physical range is its own min/max, so quantization stays small.
+    """
+    n_channels = data.shape[1]
+    samples_per_record = int(fs)
+    n_records = len(data) // samples_per_record
+    data = data[:n_records * samples_per_record]
+
+    physical_min = np.floor(data.min(axis=0)) - 1
+    physical_max = np.ceil(data.max(axis=0)) + 1
+    digital = (data - physical_min) / (physical_max - physical_min) * 65535 - 32768
+    digital = np.round(digital).clip(-32768, 32767).astype("<i2")
+
+    def field(value, size: int) -> bytes:
+        return str(value)[:size].ljust(size).encode("latin-1")
+
+    def per_signal(values, size: int) -> bytes:
+        return b"".join(field(v, size) for v in values)
+
+    header = (field(0, 8) + field("X X X X", 80) + field("Startdate X X X X", 80)
+              + field("01.01.20", 8) + field("00.00.00", 8) + field(256 * (n_channels + 1), 8)
+              + field("", 44) + field(n_records, 8) + field(1, 8) + field(n_channels, 4)
+              + per_signal(names, 16) + per_signal([""] * n_channels, 80) + per_signal([unit] * n_channels, 8)
+              + per_signal([f"{v:g}" for v in physical_min], 8) + per_signal([f"{v:g}" for v in physical_max], 8)
+              + per_signal([-32768] * n_channels, 8) + per_signal([32767] * n_channels, 8)
+              + per_signal([""] * n_channels, 80) + per_signal([samples_per_record] * n_channels, 8)
+              + per_signal([""] * n_channels, 32))
+
+    # Data records store each signal's samples contiguously: [record, channel, sample]
+    records = digital.reshape(n_records, samples_per_record, n_channels).transpose(0, 2, 1)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(records.tobytes())
+
+def write_npy(path: str, data: np.ndarray):
+    np.save(path, data.astype(np.float32))
+
+WRITERS = {
+    "csv": lambda path, data, fs, names: write_csv(path, data, names),
+    "edf": lambda path, data, fs, names: write_edf(path, data, fs, names),
+    "npy": lambda path, data, fs, names: write_npy(path, data),
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic EEG recording")
+    parser.add_argument("--duration", type=float, default=4, help="Length in seconds")
+    parser.add_argument("--fs", type=int, default=256, help="Sampling rate (Hz)")
+    parser.add_argument("--channels", type=int, default=16)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Output path (default sample_eeg_test.<format>)")
+    args = parser.parse_args()
+
+    output_file = args.output or f"sample_eeg_test.{args.format}"
+    eeg_data = synthetic_eeg(args.duration, args.fs, args.channels, args.seed)
+    WRITERS[args.format](output_file, eeg_data, args.fs, channel_names(args.channels))
+
+    print(f"✅ Generated {output_file}")
+    print(f"   - Channels: {args.channels}")
+    print(f"   - Samples: {len(eeg_data)} ({args.duration:g} seconds at {args.fs} Hz)")
+    print(f"   - File size: ~{os.path.getsize(output_file) / 1024:.1f} KB")
+    print(f"\nYou can now upload this file to test the EEG analysis!")
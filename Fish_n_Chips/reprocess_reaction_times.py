@@ -0,0 +1,48 @@
+"""
+Re-measure reaction times of stored speech recordings with server-side VAD.
+
+Recordings are decoded once each (to 16 kHz, as in /api/speech/analyze) and
+run through WebRTC VAD (vad_service.detect_speech_starts), split across
+worker processes.
+
+    python reprocess_reaction_times.py --audio-dir recordings/ [--offset-ms 0]
+
+--offset-ms is the time from the end of the stimulus to the start of the
+recording (the recording_offset_ms form field of /api/speech/analyze).
+
+/api/speech/analyze deletes each upload once it is analysed, so this works
+on recordings kept elsewhere, not on the database.
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.app.services.speech.vad_service import detect_speech_starts
+
+def onsets(paths, workers: int):
+    """VAD speech onsets (ms, -1 when none) of paths, in order."""
+    if workers <= 1 or len(paths) <= 1:
+        return detect_speech_starts(paths)
+    shares = [paths[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(detect_speech_starts, shares))
+    # Undo the round-robin split
+    ordered = [None] * len(paths)
+    for i, share in enumerate(results):
+        ordered[i::workers] = share
+    return ordered
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-measure reaction times of stored recordings with VAD")
+    parser.add_argument("--audio-dir", required=True, help="Directory of recordings")
+    parser.add_argument("--offset-ms", type=float, default=0.0, help="Stimulus end to recording start (ms)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in glob.glob(os.path.join(args.audio_dir, "*")) if os.path.isfile(p))
+    started = time.perf_counter()
+    for path, onset in zip(paths, onsets(paths, args.workers)):
+        print(f"   {os.path.basename(path)}: " + (f"{onset + args.offset_ms:.0f} ms" if onset >= 0 else "no speech"))
+    print(f"✅ {len(paths)} recordings in {time.perf_counter() - started:.1f}s")
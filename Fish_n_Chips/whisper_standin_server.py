@@ -0,0 +1,96 @@
+"""
+Local stand-in for the OpenAI transcription endpoint, for tests and demos.
+
+It serves POST /v1/audio/transcriptions with the verbose_json shape that
+whisper-1 returns. Point the openai transcriber at it and the speech
+pipeline runs end to end with no network and no model:
+
+    python whisper_standin_server.py --port 9000 --text "The cat is on the mat"
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=test SPEECH_TRANSCRIBER=openai \\
+        uvicorn backend.app.main:app
+
+The transcript is looked up by the sha256 of the uploaded audio in
+--transcripts (a JSON object of {sha256: text}), falling back to --text.
+Word timestamps are spread evenly over the non-silent part of the audio,
+so they are plausible but not real alignments. --delay-ms adds a fixed
+latency to imitate the API round trip. Tests can mount create_app()
+in-process instead (e.g. as the http_client of an OpenAI client).
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+
+import librosa
+import numpy as np
+from fastapi import FastAPI, File, Form, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+def spread_words(text: str, y: np.ndarray, sr: int):
+    """Word timestamps evenly spaced over the audio's non-silent span."""
+    words = text.split()
+    intervals = librosa.effects.split(y, top_db=35) if len(y) else np.empty((0, 2))
+    start, end = (intervals[0][0] / sr, intervals[-1][1] / sr) if len(intervals) else (0.0, len(y) / sr)
+    step = (end - start) / max(len(words), 1)
+    return [
+        {"word": word, "start": round(start + i * step, 3), "end": round(start + (i + 0.85) * step, 3)}
+        for i, word in enumerate(words)
+    ]
+
+def verbose_transcript(text: str, content: bytes) -> dict:
+    """The verbose_json body for one upload; decodes the audio, so call it off the event loop."""
+    y, sr = librosa.load(io.BytesIO(content), sr=16000, mono=True)
+    return {
+        "task": "transcribe",
+        "language": "english",
+        "duration": len(y) / sr,
+        "text": text,
+        "words": spread_words(text, y, sr),
+        "segments": [],
+    }
+
+def create_app(default_text: str, transcripts: dict, delay_ms: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Whisper stand-in")
+    app.state.requests = 0
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(file: UploadFile = File(...), model: str = Form("whisper-1"),
+                             response_format: str = Form("json")):
+        content = await file.read()
+        app.state.requests += 1
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+
+        text = transcripts.get(hashlib.sha256(content).hexdigest(), default_text)
+        if response_format != "verbose_json":
+            return {"text": text}
+
+        # Decoding blocks; on the loop it would serialize concurrent requests and skew --delay-ms
+        return await run_in_threadpool(verbose_transcript, text, content)
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI transcription endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--text", default="The quick brown fox jumps over the lazy dog",
+                        help="Transcript returned for audio not listed in --transcripts")
+    parser.add_argument("--transcripts", help="JSON file mapping audio sha256 to transcript text")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Added latency per request")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    transcripts = {}
+    if args.transcripts:
+        with open(args.transcripts) as f:
+            transcripts = json.load(f)
+
+    print(f"🎙️ Whisper stand-in on http://{args.host}:{args.port}/v1 ({len(transcripts)} known transcripts)")
+    uvicorn.run(create_app(args.text, transcripts, args.delay_ms), host=args.host, port=args.port)